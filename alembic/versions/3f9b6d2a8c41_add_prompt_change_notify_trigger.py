@@ -0,0 +1,42 @@
+"""Notify on prompt_changes for every prompt insert/update/delete
+
+Revision ID: 3f9b6d2a8c41
+Revises: e8a5f3c27b10
+Create Date: 2026-10-18 11:30:08.774512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f9b6d2a8c41'
+down_revision = 'e8a5f3c27b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Notifications are delivered when the writing transaction commits
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_prompt_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('prompt_changes', json_build_object('op', 'delete', 'id', OLD.id)::text);
+            ELSE
+                PERFORM pg_notify('prompt_changes', json_build_object('op', lower(TG_OP), 'id', NEW.id)::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_notify_change
+        AFTER INSERT OR UPDATE OR DELETE ON prompts
+        FOR EACH ROW EXECUTE FUNCTION notify_prompt_change()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS prompts_notify_change ON prompts")
+    op.execute("DROP FUNCTION IF EXISTS notify_prompt_change()")
@@ -0,0 +1,41 @@
+"""Add prompt version history
+
+Revision ID: 5a7d3e9c1f28
+Revises: c6e2a8f41b93
+Create Date: 2026-10-18 15:11:36.902714
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7d3e9c1f28'
+down_revision = 'c6e2a8f41b93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('prompts', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.create_table('prompt_versions',
+    sa.Column('prompt_id', sa.UUID(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('base_version', sa.Integer(), nullable=True),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('description', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['prompt_id'], ['prompts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('prompt_id', 'version')
+    )
+    # Current content becomes the first snapshot of every existing prompt
+    op.execute("""
+        INSERT INTO prompt_versions (prompt_id, version, data, content_hash, description, created_at)
+        SELECT id, 1, content, content_hash, description, updated_at FROM prompts
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('prompt_versions')
+    op.drop_column('prompts', 'version')
@@ -0,0 +1,30 @@
+"""Add content_hash to prompts for conditional GET
+
+Revision ID: 7c2e9a4b1d3f
+Revises: 58153b757495
+Create Date: 2026-10-18 09:12:40.118302
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e9a4b1d3f'
+down_revision = '58153b757495'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('prompts', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    # Backfill existing rows with the same SHA-256 hex digest the app computes
+    op.execute(
+        "UPDATE prompts "
+        "SET content_hash = encode(sha256(convert_to(content, 'UTF8')), 'hex')"
+    )
+    op.alter_column('prompts', 'content_hash', nullable=False)
+
+
+def downgrade() -> None:
+    op.drop_column('prompts', 'content_hash')
@@ -0,0 +1,136 @@
+"""Allow zstd-compressed prompt blobs
+
+Revision ID: 8b3e5d1a7c94
+Revises: e1f4c7a2b5d8
+Create Date: 2026-10-18 17:40:12.664091
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '8b3e5d1a7c94'
+down_revision = 'e1f4c7a2b5d8'
+branch_labels = None
+depends_on = None
+
+# Blobs updated per committed batch
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.create_table('prompt_blob_dictionaries',
+    sa.Column('id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.alter_column('prompt_blobs', 'content', nullable=True)
+    op.add_column('prompt_blobs', sa.Column('compressed', sa.LargeBinary(), nullable=True))
+    op.add_column('prompt_blobs', sa.Column('dictionary_id', sa.BigInteger(), nullable=True))
+    op.add_column('prompt_blobs', sa.Column('size', sa.Integer(), nullable=True))
+    op.add_column('prompt_blobs', sa.Column('content_vector', postgresql.TSVECTOR(), nullable=True))
+    op.create_foreign_key(
+        'prompt_blobs_dictionary_id_fkey', 'prompt_blobs', 'prompt_blob_dictionaries',
+        ['dictionary_id'], ['id']
+    )
+
+    # Fill size and content_vector for text bodies; the app supplies both
+    # for compressed ones, which Postgres cannot read
+    op.execute("""
+        CREATE OR REPLACE FUNCTION fill_prompt_blob_columns() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.content IS NOT NULL THEN
+                NEW.size := coalesce(NEW.size, octet_length(NEW.content));
+                NEW.content_vector := coalesce(NEW.content_vector, to_tsvector('english', NEW.content));
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER prompt_blobs_fill_columns
+        BEFORE INSERT ON prompt_blobs
+        FOR EACH ROW EXECUTE FUNCTION fill_prompt_blob_columns()
+    """)
+
+    # Backfill existing blobs in committed batches
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        while True:
+            updated = conn.execute(sa.text("""
+                UPDATE prompt_blobs
+                SET size = octet_length(content), content_vector = to_tsvector('english', content)
+                WHERE content_hash IN (
+                    SELECT content_hash FROM prompt_blobs WHERE size IS NULL LIMIT :batch_size
+                )
+            """), {"batch_size": BATCH_SIZE}).rowcount
+            if not updated:
+                break
+
+        # Validated constraints let SET NOT NULL skip its table scan, and
+        # validation does not block reads or writes
+        op.execute("ALTER TABLE prompt_blobs ADD CONSTRAINT ck_prompt_blobs_size_not_null CHECK (size IS NOT NULL) NOT VALID")
+        op.execute("ALTER TABLE prompt_blobs ADD CONSTRAINT ck_prompt_blobs_vector_not_null CHECK (content_vector IS NOT NULL) NOT VALID")
+        op.execute("ALTER TABLE prompt_blobs ADD CONSTRAINT ck_prompt_blobs_one_body CHECK (num_nonnulls(content, compressed) = 1) NOT VALID")
+        op.execute("ALTER TABLE prompt_blobs VALIDATE CONSTRAINT ck_prompt_blobs_size_not_null")
+        op.execute("ALTER TABLE prompt_blobs VALIDATE CONSTRAINT ck_prompt_blobs_vector_not_null")
+        op.execute("ALTER TABLE prompt_blobs VALIDATE CONSTRAINT ck_prompt_blobs_one_body")
+
+    op.alter_column('prompt_blobs', 'size', nullable=False)
+    op.alter_column('prompt_blobs', 'content_vector', nullable=False)
+    op.drop_constraint('ck_prompt_blobs_size_not_null', 'prompt_blobs', type_='check')
+    op.drop_constraint('ck_prompt_blobs_vector_not_null', 'prompt_blobs', type_='check')
+
+    # Build search vectors from the stored content vector rather than the text
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_prompt_search_vector() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT'
+               OR NEW.content_hash IS DISTINCT FROM OLD.content_hash
+               OR NEW.description IS DISTINCT FROM OLD.description THEN
+                NEW.search_vector :=
+                    setweight(to_tsvector('english', coalesce(NEW.description, '')), 'A') ||
+                    setweight((
+                        SELECT content_vector FROM prompt_blobs WHERE content_hash = NEW.content_hash
+                    ), 'B');
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.execute(sa.text("SELECT count(*) FROM prompt_blobs WHERE compressed IS NOT NULL")).scalar():
+        raise RuntimeError("Compressed prompt blobs exist; run `python manage.py decompress-blobs` first")
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_prompt_search_vector() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT'
+               OR NEW.content_hash IS DISTINCT FROM OLD.content_hash
+               OR NEW.description IS DISTINCT FROM OLD.description THEN
+                NEW.search_vector :=
+                    setweight(to_tsvector('english', coalesce(NEW.description, '')), 'A') ||
+                    setweight(to_tsvector('english', (
+                        SELECT content FROM prompt_blobs WHERE content_hash = NEW.content_hash
+                    )), 'B');
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("DROP TRIGGER IF EXISTS prompt_blobs_fill_columns ON prompt_blobs")
+    op.execute("DROP FUNCTION IF EXISTS fill_prompt_blob_columns()")
+    op.drop_constraint('ck_prompt_blobs_one_body', 'prompt_blobs', type_='check')
+    op.drop_constraint('prompt_blobs_dictionary_id_fkey', 'prompt_blobs', type_='foreignkey')
+    op.drop_column('prompt_blobs', 'content_vector')
+    op.drop_column('prompt_blobs', 'size')
+    op.drop_column('prompt_blobs', 'dictionary_id')
+    op.drop_column('prompt_blobs', 'compressed')
+    op.alter_column('prompt_blobs', 'content', nullable=False)
+    op.drop_table('prompt_blob_dictionaries')
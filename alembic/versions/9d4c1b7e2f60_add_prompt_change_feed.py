@@ -0,0 +1,81 @@
+"""Add change_seq sequence and tombstones for the prompt change feed
+
+Revision ID: 9d4c1b7e2f60
+Revises: 3f9b6d2a8c41
+Create Date: 2026-10-18 13:05:42.316870
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4c1b7e2f60'
+down_revision = '3f9b6d2a8c41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE SEQUENCE prompt_change_seq")
+
+    op.add_column('prompts', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    # Number existing rows in update order so a first sync sees them oldest first
+    op.execute("""
+        UPDATE prompts SET change_seq = numbered.seq
+        FROM (
+            SELECT id, nextval('prompt_change_seq') AS seq
+            FROM (SELECT id FROM prompts ORDER BY updated_at, id) AS ordered
+        ) AS numbered
+        WHERE prompts.id = numbered.id
+    """)
+    op.alter_column('prompts', 'change_seq', nullable=False)
+    op.create_index('ix_prompts_change_seq', 'prompts', ['change_seq'], unique=True)
+
+    op.create_table('prompt_tombstones',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('change_seq', sa.BigInteger(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_prompt_tombstones_change_seq', 'prompt_tombstones', ['change_seq'], unique=True)
+
+    # Every write takes a transaction-scoped advisory lock before drawing a
+    # sequence number, so numbers become visible in commit order and a reader
+    # never skips a lower number that commits late. Prompt writes are rare,
+    # so serializing them is cheap.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION stamp_prompt_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('prompt_change_seq'));
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO prompt_tombstones (id, change_seq)
+                VALUES (OLD.id, nextval('prompt_change_seq'))
+                ON CONFLICT (id) DO UPDATE
+                SET change_seq = EXCLUDED.change_seq, deleted_at = now();
+                RETURN OLD;
+            END IF;
+            IF TG_OP = 'INSERT' THEN
+                -- A prompt re-created under a deleted id is live again
+                DELETE FROM prompt_tombstones WHERE id = NEW.id;
+            END IF;
+            NEW.change_seq := nextval('prompt_change_seq');
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_stamp_change
+        BEFORE INSERT OR UPDATE OR DELETE ON prompts
+        FOR EACH ROW EXECUTE FUNCTION stamp_prompt_change()
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS prompts_stamp_change ON prompts")
+    op.execute("DROP FUNCTION IF EXISTS stamp_prompt_change()")
+    op.drop_index('ix_prompt_tombstones_change_seq', table_name='prompt_tombstones')
+    op.drop_table('prompt_tombstones')
+    op.drop_index('ix_prompts_change_seq', table_name='prompts')
+    op.drop_column('prompts', 'change_seq')
+    op.execute("DROP SEQUENCE IF EXISTS prompt_change_seq")
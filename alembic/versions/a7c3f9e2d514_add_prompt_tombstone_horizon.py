@@ -0,0 +1,34 @@
+"""Add prompt_tombstone_horizon for pruning change feed tombstones
+
+Pruned tombstones raise the horizon, and change feed cursors below it are
+answered with "resync required" instead of silently missing deletions.
+
+Revision ID: a7c3f9e2d514
+Revises: 8b3e5d1a7c94
+Create Date: 2026-10-18 16:42:10.583127
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3f9e2d514'
+down_revision = '8b3e5d1a7c94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('prompt_tombstone_horizon',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pruned_through', sa.BigInteger(), server_default='0', nullable=False),
+    sa.Column('pruned_at', sa.DateTime(timezone=True), nullable=True),
+    sa.CheckConstraint('id = 1', name='ck_prompt_tombstone_horizon_single_row'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO prompt_tombstone_horizon (id) VALUES (1)")
+
+
+def downgrade() -> None:
+    op.drop_table('prompt_tombstone_horizon')
@@ -0,0 +1,26 @@
+"""Add (created_at, id) and (updated_at, id) indexes for dashboard paging
+
+Revision ID: b41d7e0c9a25
+Revises: 7c2e9a4b1d3f
+Create Date: 2026-10-18 10:02:17.540961
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b41d7e0c9a25'
+down_revision = '7c2e9a4b1d3f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_prompts_created_at_id', 'prompts', ['created_at', 'id'], unique=False)
+    op.create_index('ix_prompts_updated_at_id', 'prompts', ['updated_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_prompts_updated_at_id', table_name='prompts')
+    op.drop_index('ix_prompts_created_at_id', table_name='prompts')
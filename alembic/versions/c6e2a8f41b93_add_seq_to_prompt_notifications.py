@@ -0,0 +1,56 @@
+"""Include change_seq in prompt_changes notifications
+
+Revision ID: c6e2a8f41b93
+Revises: 9d4c1b7e2f60
+Create Date: 2026-10-18 14:02:17.508334
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6e2a8f41b93'
+down_revision = '9d4c1b7e2f60'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The tombstone for a delete is written by the BEFORE trigger of the same
+    # statement, so its sequence number is already visible here
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_prompt_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('prompt_changes', json_build_object(
+                    'op', 'delete',
+                    'id', OLD.id,
+                    'seq', (SELECT change_seq FROM prompt_tombstones WHERE id = OLD.id)
+                )::text);
+            ELSE
+                PERFORM pg_notify('prompt_changes', json_build_object(
+                    'op', lower(TG_OP),
+                    'id', NEW.id,
+                    'seq', NEW.change_seq
+                )::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_prompt_change() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                PERFORM pg_notify('prompt_changes', json_build_object('op', 'delete', 'id', OLD.id)::text);
+            ELSE
+                PERFORM pg_notify('prompt_changes', json_build_object('op', lower(TG_OP), 'id', NEW.id)::text);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
@@ -0,0 +1,166 @@
+"""Move prompt bodies into content-addressed prompt_blobs
+
+Revision ID: e1f4c7a2b5d8
+Revises: 5a7d3e9c1f28
+Create Date: 2026-10-18 16:24:51.117403
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1f4c7a2b5d8'
+down_revision = '5a7d3e9c1f28'
+branch_labels = None
+depends_on = None
+
+# Prompts copied per committed batch
+BATCH_SIZE = 1000
+
+
+def upgrade() -> None:
+    op.create_table('prompt_blobs',
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('refcount', sa.Integer(), server_default='0', nullable=False),
+    sa.PrimaryKeyConstraint('content_hash')
+    )
+
+    # Copy bodies in small committed batches; this only reads prompts, so
+    # the app keeps serving reads and writes meanwhile
+    conn = op.get_bind()
+    with op.get_context().autocommit_block():
+        last_id = '00000000-0000-0000-0000-000000000000'
+        while True:
+            last_id = conn.execute(sa.text("""
+                WITH batch AS (
+                    SELECT id, content_hash, content FROM prompts
+                    WHERE id > CAST(:last_id AS uuid) ORDER BY id LIMIT :batch_size
+                ), copied AS (
+                    INSERT INTO prompt_blobs (content_hash, content)
+                    SELECT DISTINCT ON (content_hash) content_hash, content FROM batch
+                    ON CONFLICT DO NOTHING
+                )
+                SELECT id FROM batch ORDER BY id DESC LIMIT 1
+            """), {"last_id": last_id, "batch_size": BATCH_SIZE}).scalar()
+            if last_id is None:
+                break
+
+        # Deleting a blob checks the foreign key added below against
+        # prompts.content_hash; built concurrently so writes continue
+        op.create_index(
+            'ix_prompts_content_hash', 'prompts', ['content_hash'], unique=False,
+            postgresql_concurrently=True, if_not_exists=True
+        )
+
+    # Short write lock (reads continue) to catch bodies written during the
+    # copy, count references and switch the schema over
+    op.execute("LOCK TABLE prompts IN SHARE ROW EXCLUSIVE MODE")
+    op.execute("""
+        INSERT INTO prompt_blobs (content_hash, content)
+        SELECT DISTINCT ON (content_hash) content_hash, content FROM prompts p
+        WHERE NOT EXISTS (SELECT 1 FROM prompt_blobs b WHERE b.content_hash = p.content_hash)
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("""
+        UPDATE prompt_blobs b SET refcount = refs.n
+        FROM (SELECT content_hash, count(*) AS n FROM prompts GROUP BY content_hash) AS refs
+        WHERE b.content_hash = refs.content_hash
+    """)
+    op.execute("DELETE FROM prompt_blobs WHERE refcount = 0")
+
+    # Validated after the lock is released
+    op.execute("""
+        ALTER TABLE prompts ADD CONSTRAINT fk_prompts_content_hash
+        FOREIGN KEY (content_hash) REFERENCES prompt_blobs (content_hash) NOT VALID
+    """)
+
+    # Generated columns cannot read other tables; keep the existing values
+    # and maintain search_vector with a trigger from now on
+    op.execute("ALTER TABLE prompts ALTER COLUMN search_vector DROP EXPRESSION")
+    op.execute("""
+        CREATE OR REPLACE FUNCTION update_prompt_search_vector() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT'
+               OR NEW.content_hash IS DISTINCT FROM OLD.content_hash
+               OR NEW.description IS DISTINCT FROM OLD.description THEN
+                NEW.search_vector :=
+                    setweight(to_tsvector('english', coalesce(NEW.description, '')), 'A') ||
+                    setweight(to_tsvector('english', (
+                        SELECT content FROM prompt_blobs WHERE content_hash = NEW.content_hash
+                    )), 'B');
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_search_vector
+        BEFORE INSERT OR UPDATE ON prompts
+        FOR EACH ROW EXECUTE FUNCTION update_prompt_search_vector()
+    """)
+
+    # Blobs are created by the app before the prompt row; references are
+    # counted here and unreferenced blobs removed
+    op.execute("""
+        CREATE OR REPLACE FUNCTION count_prompt_blob_refs() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' AND NEW.content_hash = OLD.content_hash THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                UPDATE prompt_blobs SET refcount = refcount + 1 WHERE content_hash = NEW.content_hash;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE prompt_blobs SET refcount = refcount - 1 WHERE content_hash = OLD.content_hash;
+                DELETE FROM prompt_blobs WHERE content_hash = OLD.content_hash AND refcount <= 0;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER prompts_count_blob_refs
+        AFTER INSERT OR DELETE OR UPDATE OF content_hash ON prompts
+        FOR EACH ROW EXECUTE FUNCTION count_prompt_blob_refs()
+    """)
+
+    # Metadata-only change; the old values are reclaimed as rows are rewritten
+    op.drop_column('prompts', 'content')
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE prompts VALIDATE CONSTRAINT fk_prompts_content_hash")
+
+
+def downgrade() -> None:
+    op.add_column('prompts', sa.Column('content', sa.Text(), nullable=True))
+    op.execute("""
+        UPDATE prompts p SET content = b.content
+        FROM prompt_blobs b WHERE b.content_hash = p.content_hash
+    """)
+    op.alter_column('prompts', 'content', nullable=False)
+
+    op.execute("DROP TRIGGER IF EXISTS prompts_count_blob_refs ON prompts")
+    op.execute("DROP FUNCTION IF EXISTS count_prompt_blob_refs()")
+    op.execute("DROP TRIGGER IF EXISTS prompts_search_vector ON prompts")
+    op.execute("DROP FUNCTION IF EXISTS update_prompt_search_vector()")
+
+    op.drop_index('ix_prompts_search_vector', table_name='prompts', postgresql_using='gin')
+    op.drop_column('prompts', 'search_vector')
+    op.add_column('prompts', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('english', coalesce(description, '')), 'A') || "
+            "setweight(to_tsvector('english', content), 'B')",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index('ix_prompts_search_vector', 'prompts', ['search_vector'], unique=False, postgresql_using='gin')
+
+    op.drop_constraint('fk_prompts_content_hash', 'prompts', type_='foreignkey')
+    op.drop_index('ix_prompts_content_hash', table_name='prompts')
+    op.drop_table('prompt_blobs')
@@ -0,0 +1,36 @@
+"""Add generated search_vector column with GIN index for full-text search
+
+Revision ID: e8a5f3c27b10
+Revises: b41d7e0c9a25
+Create Date: 2026-10-18 10:47:55.203114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a5f3c27b10'
+down_revision = 'b41d7e0c9a25'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('prompts', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed(
+            "setweight(to_tsvector('english', coalesce(description, '')), 'A') || "
+            "setweight(to_tsvector('english', content), 'B')",
+            persisted=True
+        ),
+        nullable=True
+    ))
+    op.create_index('ix_prompts_search_vector', 'prompts', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_prompts_search_vector', table_name='prompts', postgresql_using='gin')
+    op.drop_column('prompts', 'search_vector')
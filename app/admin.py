@@ -1,25 +1,90 @@
+import os
+import base64
 import uuid
+import zlib
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Request, Form
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Request, Form, Query
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .database import get_db
-from .models import Prompt
+from .storage import StoredPrompt, requires_postgres, store
+from .cache import prompt_cache, CachedPrompt
+from .compression import variant_cache
+from .rendering import template_cache
+from .replicas import replica_router
+from .search import SEARCH_PAGE_SIZE, search_prompts, highlight_snippet, plain_snippet
+from .changes import CHANGES_PAGE_SIZE, CursorExpired, list_changes, changes_response
+from .events import event_stream_response
+from .bulk import BulkImportError, export_prompts, import_prompts, gzip_chunks, gunzip_chunks, iter_lines
+from .versions import diff_lines
 from .auth import (
     verify_password, 
     login_user, 
     logout_user, 
     is_authenticated,
+    require_api_auth,
     redirect_if_not_authenticated
 )
 
+# Number of prompts shown per dashboard page
+DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", "50"))
+
+# Dashboard sort options: name -> (column, descending). Each column has a
+# (column, id) index, so every option is an index range scan in either direction.
+DASHBOARD_SORTS = {
+    "created_desc": ("created_at", True),
+    "created_asc": ("created_at", False),
+    "updated_desc": ("updated_at", True),
+    "updated_asc": ("updated_at", False),
+}
+
 router = APIRouter(prefix="/admin")
 templates = Jinja2Templates(directory="app/templates")
 
+def _encode_cursor(sort_value: datetime, prompt_id: uuid.UUID) -> str:
+    """Opaque keyset cursor for a (sort column, id) position"""
+    raw = f"{sort_value.isoformat()}|{prompt_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Inverse of _encode_cursor; raises 400 on a malformed cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        sort_value, prompt_id = raw.split("|")
+        return datetime.fromisoformat(sort_value), uuid.UUID(prompt_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid page cursor")
+
+def parse_prompt_id(prompt_id: str) -> uuid.UUID:
+    """Parse a prompt id path parameter; raises 404 on a malformed id.
+    
+    Shared by the admin pages and the admin JSON API.
+    """
+    try:
+        return uuid.UUID(prompt_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+
+def _cache_prompt(prompt: StoredPrompt, background_tasks: BackgroundTasks) -> None:
+    """Write a created or updated prompt through the caches"""
+    replica_router.note_write(prompt.id)
+    template_cache.invalidate(prompt.id)
+    prompt_cache.put(
+        prompt.id,
+        CachedPrompt(
+            content=prompt.content,
+            content_hash=prompt.content_hash,
+            updated_at=prompt.updated_at
+        )
+    )
+    # Precompress the public response after the redirect is sent
+    background_tasks.add_task(variant_cache.warm, prompt.content_hash, prompt.content)
+
 @router.get("/login", response_class=HTMLResponse)
-def login_page(request: Request):
+async def login_page(request: Request):
     """Login form page"""
     if is_authenticated(request):
         return RedirectResponse(url="/admin", status_code=302)
@@ -29,7 +94,7 @@ def login_page(request: Request):
     )
 
 @router.post("/login")
-def login(
+async def login(
     request: Request,
     password: str = Form(...)
 ):
@@ -44,32 +109,194 @@ def login(
         )
 
 @router.post("/logout")
-def logout(request: Request):
+async def logout(request: Request):
     """Handle logout"""
     logout_user(request)
     return RedirectResponse(url="/admin/login", status_code=302)
 
 @router.get("/", response_class=HTMLResponse)
-def admin_dashboard(
+async def admin_dashboard(
     request: Request,
-    db: Session = Depends(get_db)
+    sort: str = "created_desc",
+    after: Optional[str] = None,
+    before: Optional[str] = None
 ):
-    """Admin dashboard showing all prompts"""
+    """Admin dashboard listing prompts one keyset page at a time"""
     # Check authentication
     redirect_response = redirect_if_not_authenticated(request)
     if redirect_response:
         return redirect_response
     
-    # Get all prompts
-    prompts = db.query(Prompt).order_by(Prompt.created_at.desc()).all()
+    if sort not in DASHBOARD_SORTS:
+        sort = "created_desc"
+    column, descending = DASHBOARD_SORTS[sort]
+    
+    # Paging backwards walks the index in the opposite direction
+    backwards = before is not None and after is None
+    cursor = before if backwards else after
+    scan_descending = descending != backwards
+    
+    # Get one page of prompts, without loading their content
+    prompts = await store.list_prompts(
+        column,
+        scan_descending,
+        _decode_cursor(cursor) if cursor else None,
+        DASHBOARD_PAGE_SIZE + 1
+    )
+    has_more = len(prompts) > DASHBOARD_PAGE_SIZE
+    prompts = prompts[:DASHBOARD_PAGE_SIZE]
+    if backwards:
+        prompts.reverse()
+    
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else cursor is not None
+    next_cursor = None
+    prev_cursor = None
+    if prompts and has_next:
+        next_cursor = _encode_cursor(getattr(prompts[-1], column), prompts[-1].id)
+    if prompts and has_prev:
+        prev_cursor = _encode_cursor(getattr(prompts[0], column), prompts[0].id)
     
     return templates.TemplateResponse(
         "admin/dashboard.html",
-        {"request": request, "prompts": prompts}
+        {
+            "request": request,
+            "prompts": prompts,
+            "sort": sort,
+            "sorts": DASHBOARD_SORTS,
+            "paged": cursor is not None,
+            "next_cursor": next_cursor,
+            "prev_cursor": prev_cursor,
+        }
     )
 
+@router.get("/search", response_class=HTMLResponse, dependencies=[requires_postgres("Full-text search")])
+async def search_page(
+    request: Request,
+    q: str = "",
+    page: int = Query(1, ge=1),
+    db: AsyncSession = Depends(get_db)
+):
+    """Ranked full-text search over prompt descriptions and content"""
+    redirect_response = redirect_if_not_authenticated(request)
+    if redirect_response:
+        return redirect_response
+    
+    q = q.strip()
+    results = []
+    has_next = False
+    if q:
+        rows = await search_prompts(db, q, SEARCH_PAGE_SIZE + 1, (page - 1) * SEARCH_PAGE_SIZE)
+        has_next = len(rows) > SEARCH_PAGE_SIZE
+        results = [
+            {
+                "id": row.id,
+                "description": row.description,
+                "updated_at": row.updated_at,
+                "snippet": highlight_snippet(row.snippet),
+            }
+            for row in rows[:SEARCH_PAGE_SIZE]
+        ]
+    
+    return templates.TemplateResponse(
+        "admin/search.html",
+        {
+            "request": request,
+            "q": q,
+            "page": page,
+            "results": results,
+            "has_next": has_next,
+        }
+    )
+
+@router.get("/api/search", dependencies=[requires_postgres("Full-text search")])
+async def search_api(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(SEARCH_PAGE_SIZE, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    authenticated: bool = Depends(require_api_auth),
+    db: AsyncSession = Depends(get_db)
+):
+    """JSON full-text search, ranked best match first"""
+    rows = await search_prompts(db, q, limit + 1, offset)
+    return {
+        "query": q,
+        "results": [
+            {
+                "id": str(row.id),
+                "description": row.description,
+                "rank": row.rank,
+                "snippet": plain_snippet(row.snippet),
+                "created_at": row.created_at.isoformat(),
+                "updated_at": row.updated_at.isoformat(),
+            }
+            for row in rows[:limit]
+        ],
+        "next_offset": offset + limit if len(rows) > limit else None,
+    }
+
+@router.get("/api/changes", dependencies=[requires_postgres("The change feed")])
+async def changes_api(
+    since: int = Query(0, ge=0),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=CHANGES_PAGE_SIZE),
+    authenticated: bool = Depends(require_api_auth),
+    db: AsyncSession = Depends(get_db)
+):
+    """Change feed over every prompt, for mirrors that sync the whole library"""
+    try:
+        rows = await list_changes(db, since, limit + 1)
+    except CursorExpired as e:
+        raise HTTPException(status_code=410, detail=str(e))
+    return changes_response(rows, since, limit)
+
+@router.get("/api/events", dependencies=[requires_postgres("Prompt events")])
+async def events_api(
+    last_event_id: Optional[str] = Header(None),
+    authenticated: bool = Depends(require_api_auth)
+):
+    """Server-sent events for every prompt write"""
+    return event_stream_response(None, last_event_id)
+
+@router.get("/api/export", dependencies=[requires_postgres("Bulk export")])
+async def export_api(
+    gzip: bool = Query(False),
+    authenticated: bool = Depends(require_api_auth)
+):
+    """Every prompt as NDJSON, streamed from a server-side cursor"""
+    if gzip:
+        return StreamingResponse(
+            gzip_chunks(export_prompts()),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="prompts.ndjson.gz"'}
+        )
+    return StreamingResponse(
+        export_prompts(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="prompts.ndjson"'}
+    )
+
+@router.post("/api/import", dependencies=[requires_postgres("Bulk import")])
+async def import_api(
+    request: Request,
+    authenticated: bool = Depends(require_api_auth)
+):
+    """Upsert prompts by id from an NDJSON body, all or nothing.
+    
+    The body is read and written in batches as it arrives; send it with
+    ``Content-Encoding: gzip`` to upload it compressed.
+    """
+    chunks = request.stream()
+    if request.headers.get("content-encoding", "").lower() == "gzip":
+        chunks = gunzip_chunks(chunks)
+    try:
+        return await import_prompts(iter_lines(chunks))
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except zlib.error:
+        raise HTTPException(status_code=400, detail="Invalid gzip body")
+
 @router.get("/prompt/new", response_class=HTMLResponse)
-def new_prompt_form(request: Request):
+async def new_prompt_form(request: Request):
     """Form to create new prompt"""
     redirect_response = redirect_if_not_authenticated(request)
     if redirect_response:
@@ -81,11 +308,11 @@ def new_prompt_form(request: Request):
     )
 
 @router.post("/prompt/new")
-def create_prompt(
+async def create_prompt(
     request: Request,
+    background_tasks: BackgroundTasks,
     description: str = Form(...),
-    content: str = Form(...),
-    db: Session = Depends(get_db)
+    content: str = Form(...)
 ):
     """Handle prompt creation"""
     redirect_response = redirect_if_not_authenticated(request)
@@ -93,34 +320,24 @@ def create_prompt(
         return redirect_response
     
     # Create new prompt
-    new_prompt = Prompt(
-        description=description,
-        content=content
-    )
-    
-    db.add(new_prompt)
-    db.commit()
-    db.refresh(new_prompt)
+    new_prompt = await store.create(description, content)
+    _cache_prompt(new_prompt, background_tasks)
     
     return RedirectResponse(url="/admin", status_code=302)
 
 @router.get("/prompt/{prompt_id}/edit", response_class=HTMLResponse)
-def edit_prompt_form(
+async def edit_prompt_form(
     request: Request,
-    prompt_id: str,
-    db: Session = Depends(get_db)
+    prompt_id: str
 ):
     """Form to edit existing prompt"""
     redirect_response = redirect_if_not_authenticated(request)
     if redirect_response:
         return redirect_response
     
-    try:
-        prompt_uuid = uuid.UUID(prompt_id)
-    except ValueError:
-        raise HTTPException(status_code=404, detail="Prompt not found")
+    prompt_uuid = parse_prompt_id(prompt_id)
     
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_uuid).first()
+    prompt = await store.get(prompt_uuid, primary=True)
     
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
@@ -131,53 +348,128 @@ def edit_prompt_form(
     )
 
 @router.post("/prompt/{prompt_id}/edit")
-def update_prompt(
+async def update_prompt(
     request: Request,
     prompt_id: str,
+    background_tasks: BackgroundTasks,
     description: str = Form(...),
-    content: str = Form(...),
-    db: Session = Depends(get_db)
+    content: str = Form(...)
 ):
     """Handle prompt updates"""
     redirect_response = redirect_if_not_authenticated(request)
     if redirect_response:
         return redirect_response
     
-    try:
-        prompt_uuid = uuid.UUID(prompt_id)
-    except ValueError:
+    prompt_uuid = parse_prompt_id(prompt_id)
+    
+    # Saved as a new version, unless nothing changed
+    prompt = await store.update(prompt_uuid, description, content)
+    
+    if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
     
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_uuid).first()
+    _cache_prompt(prompt, background_tasks)
+    
+    return RedirectResponse(url="/admin", status_code=302)
+
+@router.get("/prompt/{prompt_id}/history", response_class=HTMLResponse)
+async def prompt_history(
+    request: Request,
+    prompt_id: str
+):
+    """Version history of a prompt"""
+    redirect_response = redirect_if_not_authenticated(request)
+    if redirect_response:
+        return redirect_response
+    
+    prompt_uuid = parse_prompt_id(prompt_id)
+    prompt = await store.get(prompt_uuid, primary=True)
     
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
     
-    # Update prompt
-    prompt.description = description
-    prompt.content = content
+    return templates.TemplateResponse(
+        "admin/history.html",
+        {
+            "request": request,
+            "prompt": prompt,
+            "versions": await store.list_versions(prompt_uuid),
+        }
+    )
+
+@router.get("/prompt/{prompt_id}/diff", response_class=HTMLResponse)
+async def prompt_diff(
+    request: Request,
+    prompt_id: str,
+    to_version: int = Query(..., alias="to", ge=1),
+    from_version: Optional[int] = Query(None, alias="from", ge=1)
+):
+    """Line diff between two versions (the previous one by default)"""
+    redirect_response = redirect_if_not_authenticated(request)
+    if redirect_response:
+        return redirect_response
+    
+    prompt_uuid = parse_prompt_id(prompt_id)
+    if from_version is None:
+        from_version = max(to_version - 1, 1)
     
-    db.commit()
+    old = await store.load_version(prompt_uuid, from_version, primary=True)
+    new = await store.load_version(prompt_uuid, to_version, primary=True)
+    if old is None or new is None:
+        raise HTTPException(status_code=404, detail="Version not found")
     
-    return RedirectResponse(url="/admin", status_code=302)
+    return templates.TemplateResponse(
+        "admin/diff.html",
+        {
+            "request": request,
+            "prompt_id": prompt_uuid,
+            "old": old[0],
+            "new": new[0],
+            "lines": diff_lines(old[1], new[1]),
+        }
+    )
 
-@router.post("/prompt/{prompt_id}/delete")
-def delete_prompt(
+@router.post("/prompt/{prompt_id}/versions/{version}/restore")
+async def restore_prompt_version(
     request: Request,
     prompt_id: str,
-    db: Session = Depends(get_db)
+    version: int,
+    background_tasks: BackgroundTasks
 ):
-    """Handle prompt deletion"""
+    """Roll a prompt back to an earlier version, recorded as a new version"""
     redirect_response = redirect_if_not_authenticated(request)
     if redirect_response:
         return redirect_response
     
-    try:
-        prompt_uuid = uuid.UUID(prompt_id)
-    except ValueError:
+    prompt_uuid = parse_prompt_id(prompt_id)
+    # Stored versions never change, so reading one outside the update is safe
+    restored = await store.load_version(prompt_uuid, version, primary=True)
+    if restored is None:
+        raise HTTPException(status_code=404, detail="Version not found")
+    
+    stored, content = restored
+    prompt = await store.update(prompt_uuid, stored.description, content)
+    if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
+    _cache_prompt(prompt, background_tasks)
+    
+    return RedirectResponse(url=f"/admin/prompt/{prompt_uuid}/history", status_code=302)
+
+@router.post("/prompt/{prompt_id}/delete")
+async def delete_prompt(
+    request: Request,
+    prompt_id: str
+):
+    """Handle prompt deletion"""
+    redirect_response = redirect_if_not_authenticated(request)
+    if redirect_response:
+        return redirect_response
+    
+    prompt_uuid = parse_prompt_id(prompt_id)
     
-    db.query(Prompt).filter(Prompt.id == prompt_uuid).delete()
-    db.commit()
+    await store.delete(prompt_uuid)
+    replica_router.note_write(prompt_uuid)
+    prompt_cache.invalidate(prompt_uuid)
+    template_cache.invalidate(prompt_uuid)
     
     return RedirectResponse(url="/admin", status_code=302) 
\ No newline at end of file
@@ -0,0 +1,195 @@
+import os
+import uuid
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from pydantic import BaseModel, Field
+
+from .storage import PromptWrite, PromptsNotFound, StoredPrompt, store
+from .cache import prompt_cache, CachedPrompt
+from .compression import variant_cache
+from .rendering import template_cache
+from .replicas import replica_router
+from .bulk import DESCRIPTION_MAX_LENGTH
+from .auth import require_api_auth
+from .admin import parse_prompt_id
+
+# Max prompts created, updated or deleted by one batch request
+ADMIN_API_BATCH_MAX = int(os.getenv("ADMIN_API_BATCH_MAX", "500"))
+
+router = APIRouter(prefix="/admin/api", dependencies=[Depends(require_api_auth)])
+
+class PromptInput(BaseModel):
+    description: str = Field(..., max_length=DESCRIPTION_MAX_LENGTH)
+    content: str
+
+class PromptUpdate(PromptInput):
+    id: str
+
+class PromptInfo(BaseModel):
+    id: str
+    description: Optional[str]
+    content_hash: str
+    version: int
+    created_at: datetime
+    updated_at: datetime
+    content: Optional[str] = None
+
+class BatchCreateRequest(BaseModel):
+    prompts: list[PromptInput] = Field(..., max_length=ADMIN_API_BATCH_MAX)
+
+class BatchUpdateRequest(BaseModel):
+    prompts: list[PromptUpdate] = Field(..., max_length=ADMIN_API_BATCH_MAX)
+
+class BatchDeleteRequest(BaseModel):
+    ids: list[str] = Field(..., max_length=ADMIN_API_BATCH_MAX)
+
+class BatchPromptsResponse(BaseModel):
+    prompts: list[PromptInfo]
+
+class BatchDeleteResponse(BaseModel):
+    deleted: list[str]
+    missing: list[str]
+
+def _parse_ids(ids: list[str]) -> list[uuid.UUID]:
+    """Parse request body ids; raises 422 on a malformed or repeated id"""
+    parsed = []
+    for prompt_id in ids:
+        try:
+            parsed.append(uuid.UUID(prompt_id))
+        except ValueError:
+            raise HTTPException(status_code=422, detail=f"Invalid prompt id: {prompt_id}")
+    if len(set(parsed)) != len(parsed):
+        raise HTTPException(status_code=422, detail="Each prompt id may only appear once")
+    return parsed
+
+def _prompt_info(prompt: StoredPrompt, content: bool = False) -> PromptInfo:
+    return PromptInfo(
+        id=str(prompt.id),
+        description=prompt.description,
+        content_hash=prompt.content_hash,
+        version=prompt.version,
+        created_at=prompt.created_at,
+        updated_at=prompt.updated_at,
+        content=prompt.content if content else None,
+    )
+
+def _cache_prompts(prompts: list[StoredPrompt], background_tasks: BackgroundTasks) -> None:
+    """Write created or updated prompts through the caches"""
+    for prompt in prompts:
+        replica_router.note_write(prompt.id)
+        template_cache.invalidate(prompt.id)
+        prompt_cache.put(
+            prompt.id,
+            CachedPrompt(
+                content=prompt.content,
+                content_hash=prompt.content_hash,
+                updated_at=prompt.updated_at
+            )
+        )
+    # Precompress each new body once, after the response is sent
+    bodies = {prompt.content_hash: prompt.content for prompt in prompts}
+    for content_hash, content in bodies.items():
+        background_tasks.add_task(variant_cache.warm, content_hash, content)
+
+async def _create_prompts(
+    prompts: list[PromptInput],
+    background_tasks: BackgroundTasks
+) -> list[PromptInfo]:
+    created = await store.create_many([
+        PromptWrite(uuid.uuid4(), prompt.description, prompt.content)
+        for prompt in prompts
+    ])
+    _cache_prompts(created, background_tasks)
+    return [_prompt_info(prompt) for prompt in created]
+
+async def _update_prompts(
+    prompts: list[PromptUpdate],
+    background_tasks: BackgroundTasks
+) -> list[PromptInfo]:
+    ids = _parse_ids([prompt.id for prompt in prompts])
+    try:
+        updated = await store.update_many([
+            PromptWrite(prompt_id, prompt.description, prompt.content)
+            for prompt_id, prompt in zip(ids, prompts)
+        ])
+    except PromptsNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    _cache_prompts(updated, background_tasks)
+    return [_prompt_info(prompt) for prompt in updated]
+
+async def _delete_prompts(ids: list[uuid.UUID]) -> list[uuid.UUID]:
+    deleted = await store.delete_many(ids)
+    for prompt_id in deleted:
+        replica_router.note_write(prompt_id)
+        prompt_cache.invalidate(prompt_id)
+        template_cache.invalidate(prompt_id)
+    return deleted
+
+@router.post("/prompts:batchCreate", response_model=BatchPromptsResponse, response_model_exclude_none=True)
+async def batch_create_prompts(
+    batch: BatchCreateRequest,
+    background_tasks: BackgroundTasks
+):
+    """Create many prompts in one transaction, returned in request order"""
+    return {"prompts": await _create_prompts(batch.prompts, background_tasks)}
+
+@router.post("/prompts:batchUpdate", response_model=BatchPromptsResponse, response_model_exclude_none=True)
+async def batch_update_prompts(
+    batch: BatchUpdateRequest,
+    background_tasks: BackgroundTasks
+):
+    """Replace the description and content of many prompts in one transaction.
+
+    If any id does not exist nothing is written. Prompts whose description
+    and content are unchanged keep their version.
+    """
+    return {"prompts": await _update_prompts(batch.prompts, background_tasks)}
+
+@router.post("/prompts:batchDelete", response_model=BatchDeleteResponse)
+async def batch_delete_prompts(
+    batch: BatchDeleteRequest
+):
+    """Delete many prompts with a single statement; unknown ids are listed in ``missing``"""
+    ids = _parse_ids(batch.ids)
+    deleted = set(await _delete_prompts(ids))
+    return {
+        "deleted": [str(prompt_id) for prompt_id in ids if prompt_id in deleted],
+        "missing": [str(prompt_id) for prompt_id in ids if prompt_id not in deleted],
+    }
+
+@router.post("/prompts", response_model=PromptInfo, status_code=201, response_model_exclude_none=True)
+async def create_prompt(
+    prompt: PromptInput,
+    background_tasks: BackgroundTasks
+):
+    """Create a prompt"""
+    return (await _create_prompts([prompt], background_tasks))[0]
+
+@router.get("/prompts/{prompt_id}", response_model=PromptInfo)
+async def get_prompt(
+    prompt_id: str
+):
+    """A prompt with its content and metadata, read from the primary"""
+    prompt = await store.get(parse_prompt_id(prompt_id), primary=True)
+    if not prompt:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return _prompt_info(prompt, content=True)
+
+@router.put("/prompts/{prompt_id}", response_model=PromptInfo, response_model_exclude_none=True)
+async def update_prompt(
+    prompt_id: str,
+    prompt: PromptInput,
+    background_tasks: BackgroundTasks
+):
+    """Replace a prompt's description and content"""
+    update = PromptUpdate(id=str(parse_prompt_id(prompt_id)), description=prompt.description, content=prompt.content)
+    return (await _update_prompts([update], background_tasks))[0]
+
+@router.delete("/prompts/{prompt_id}", status_code=204)
+async def delete_prompt(
+    prompt_id: str
+):
+    """Delete a prompt"""
+    if not await _delete_prompts([parse_prompt_id(prompt_id)]):
+        raise HTTPException(status_code=404, detail="Prompt not found")
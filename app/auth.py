@@ -1,5 +1,6 @@
 import os
 import hashlib
+import hmac
 import secrets
 from typing import Optional
 from fastapi import Request, HTTPException, status, Depends
@@ -9,6 +10,9 @@ from starlette.responses import RedirectResponse
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
 SECRET_KEY = os.getenv("SECRET_KEY", secrets.token_urlsafe(32))
 
+# Comma-separated bearer tokens accepted by the admin JSON API
+ADMIN_API_TOKENS = [token.strip() for token in os.getenv("ADMIN_API_TOKENS", "").split(",") if token.strip()]
+
 def verify_password(password: str) -> bool:
     """Verify admin password"""
     return password == ADMIN_PASSWORD
@@ -19,6 +23,9 @@ def create_session_token() -> str:
 
 def is_authenticated(request: Request) -> bool:
     """Check if user is authenticated via session"""
+    # Sessions are only decoded for admin routes
+    if "session" not in request.scope:
+        return False
     return request.session.get("authenticated", False)
 
 def require_auth(request: Request):
@@ -30,6 +37,28 @@ def require_auth(request: Request):
         )
     return True
 
+def verify_api_token(token: str) -> bool:
+    """Check a bearer token against ADMIN_API_TOKENS in constant time"""
+    # Compare against every token so timing does not reveal which matched
+    valid = False
+    for expected in ADMIN_API_TOKENS:
+        valid |= hmac.compare_digest(token.encode(), expected.encode())
+    return valid
+
+def require_api_auth(request: Request):
+    """Dependency for admin JSON routes: an API token or an admin session"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and verify_api_token(token.strip()):
+            return True
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return require_auth(request)
+
 def optional_auth(request: Request) -> bool:
     """Optional authentication check"""
     return is_authenticated(request)
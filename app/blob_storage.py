@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import os
+import threading
+from typing import NamedTuple, Optional
+
+from sqlalchemy import LargeBinary, text
+from sqlalchemy.types import TypeDecorator
+
+from .database import engine, async_engine
+
+# Optional codec; without it bodies are always stored as text
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Compressed-at-rest settings from environment variables
+BLOB_COMPRESSION = os.getenv("BLOB_COMPRESSION", "off").lower()
+BLOB_COMPRESSION_MIN_BYTES = int(os.getenv("BLOB_COMPRESSION_MIN_BYTES", "4096"))
+BLOB_COMPRESSION_LEVEL = int(os.getenv("BLOB_COMPRESSION_LEVEL", "9"))
+BLOB_COMPRESSION_DICTIONARY_ID = (
+    int(os.getenv("BLOB_COMPRESSION_DICTIONARY_ID"))
+    if os.getenv("BLOB_COMPRESSION_DICTIONARY_ID") else None
+)
+
+# Every zstd frame starts with these bytes; UTF-8 text never does, since
+# 0xB5 cannot follow an ASCII byte
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class EncodedBody(NamedTuple):
+    """Column values for one prompt_blobs row"""
+    content: Optional[str]
+    compressed: Optional[bytes]
+    dictionary_id: Optional[int]
+    size: int
+
+
+class BodyCodec:
+    """Compresses prompt bodies for storage and decompresses them on read.
+
+    Bodies of at least ``min_bytes`` are zstd-compressed when ``mode`` is
+    "zstd", optionally with a trained dictionary. Frames record the id of
+    their dictionary, so reads never need to know how a body was written.
+    """
+
+    def __init__(self, mode: str, min_bytes: int, level: int, dictionary_id: Optional[int]):
+        if mode not in ("off", "zstd"):
+            raise ValueError(f"Unknown BLOB_COMPRESSION mode: {mode!r}")
+        if mode == "zstd" and zstandard is None:
+            raise RuntimeError("BLOB_COMPRESSION=zstd requires the zstandard package")
+        self.mode = mode
+        self.min_bytes = min_bytes
+        self.level = level
+        self.dictionary_id = dictionary_id
+        self._dictionaries: dict = {}
+        self._lock = threading.Lock()
+
+    def encode(self, content: str) -> EncodedBody:
+        """Storage form of ``content`` under the configured mode"""
+        if self.mode == "off":
+            return EncodedBody(content, None, None, len(content.encode("utf-8")))
+        return self.compress(content, self.dictionary_id)
+
+    def compress(self, content: str, dictionary_id: Optional[int] = None) -> EncodedBody:
+        """Compressed form of ``content``, or text if it is small or incompressible"""
+        data = content.encode("utf-8")
+        if len(data) < self.min_bytes or zstandard is None:
+            return EncodedBody(content, None, None, len(data))
+
+        if dictionary_id is None:
+            compressor = zstandard.ZstdCompressor(level=self.level)
+        else:
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=self.dictionary(dictionary_id))
+        compressed = compressor.compress(data)
+        if len(compressed) >= len(data):
+            return EncodedBody(content, None, None, len(data))
+        return EncodedBody(None, compressed, dictionary_id, len(data))
+
+    def decode(self, data: bytes) -> str:
+        """Text of a stored body: a zstd frame, or UTF-8 text"""
+        if not data.startswith(ZSTD_MAGIC):
+            return data.decode("utf-8")
+        if zstandard is None:
+            raise RuntimeError("Reading compressed prompt bodies requires the zstandard package")
+
+        dictionary_id = zstandard.get_frame_parameters(data).dict_id
+        if dictionary_id:
+            decompressor = zstandard.ZstdDecompressor(dict_data=self.dictionary(dictionary_id))
+        else:
+            decompressor = zstandard.ZstdDecompressor()
+        return decompressor.decompress(data).decode("utf-8")
+
+    async def preload(self) -> None:
+        """Load every trained dictionary, so reads never query for one.
+        
+        Bodies are decoded while SQLAlchemy processes results on the event
+        loop, where a blocking query would stall every request.
+        """
+        if zstandard is None:
+            return
+        async with async_engine.connect() as conn:
+            rows = (await conn.execute(text("SELECT id, data FROM prompt_blob_dictionaries"))).all()
+        loaded = {row.id: zstandard.ZstdCompressionDict(bytes(row.data)) for row in rows}
+        with self._lock:
+            self._dictionaries.update(loaded)
+        if self.mode == "zstd" and self.dictionary_id is not None and self.dictionary_id not in loaded:
+            raise LookupError(f"Unknown prompt blob dictionary: {self.dictionary_id}")
+        if loaded:
+            logger.info(f"Loaded prompt blob dictionaries {sorted(loaded)}")
+
+    def dictionary(self, dictionary_id: int):
+        """Trained dictionary by id, from ``preload`` or loaded on first use"""
+        with self._lock:
+            dictionary = self._dictionaries.get(dictionary_id)
+        if dictionary is not None:
+            return dictionary
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise LookupError(
+                f"Prompt blob dictionary {dictionary_id} was not preloaded; restart to load new dictionaries"
+            )
+
+        # Off the event loop a one-off blocking read is fine
+        with engine.connect() as conn:
+            data = conn.execute(
+                text("SELECT data FROM prompt_blob_dictionaries WHERE id = :id"),
+                {"id": dictionary_id}
+            ).scalar()
+        if data is None:
+            raise LookupError(f"Unknown prompt blob dictionary: {dictionary_id}")
+
+        dictionary = zstandard.ZstdCompressionDict(bytes(data))
+        with self._lock:
+            self._dictionaries[dictionary_id] = dictionary
+        logger.info(f"Loaded prompt blob dictionary {dictionary_id} ({len(data)} bytes)")
+        return dictionary
+
+
+class StoredBody(TypeDecorator):
+    """Read-only type decoding a stored body (zstd frame or UTF-8 bytes) to text"""
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return body_codec.decode(bytes(value))
+
+
+# Shared codec used when writing and reading prompt_blobs
+body_codec = BodyCodec(
+    mode=BLOB_COMPRESSION,
+    min_bytes=BLOB_COMPRESSION_MIN_BYTES,
+    level=BLOB_COMPRESSION_LEVEL,
+    dictionary_id=BLOB_COMPRESSION_DICTIONARY_ID,
+)
@@ -0,0 +1,266 @@
+import json
+import os
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import AsyncIterable, AsyncIterator, Optional
+
+from sqlalchemy import DateTime, String, bindparam, select, or_, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
+
+from .database import AsyncSessionLocal, async_engine
+from .models import Prompt, hash_content, upsert_blobs
+from .cache import prompt_cache
+from .rendering import template_cache
+from .replicas import replica_router
+from .versions import record_snapshot_versions, record_versions
+
+# Prompts per export fetch and per import statement
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+
+# Fields of one exported line; import reads id, description, content,
+# content_hash (checked if given) and created_at (kept for new prompts)
+EXPORT_COLUMNS = (
+    Prompt.id,
+    Prompt.description,
+    Prompt.content.label("content"),
+    Prompt.content_hash,
+    Prompt.version,
+    Prompt.created_at,
+    Prompt.updated_at,
+)
+
+# prompts.description is VARCHAR(255)
+DESCRIPTION_MAX_LENGTH = 255
+
+
+class BulkImportError(ValueError):
+    """An import line is malformed; nothing from the import is committed"""
+
+    def __init__(self, line: int, message: str):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+
+async def export_prompts(batch_size: int = BULK_BATCH_SIZE) -> AsyncIterator[bytes]:
+    """Every prompt as NDJSON, one line per prompt in id order.
+
+    Rows come from a server-side cursor inside one REPEATABLE READ
+    transaction, so the export is a consistent point-in-time copy and
+    memory stays bounded by ``batch_size`` whatever the table size.
+    """
+    async with async_engine.connect() as conn:
+        await conn.execution_options(isolation_level="REPEATABLE READ")
+        result = await conn.stream(
+            select(*EXPORT_COLUMNS)
+            .order_by(Prompt.id)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in result.partitions():
+            yield "".join(
+                json.dumps({
+                    "id": str(row.id),
+                    "description": row.description,
+                    "content": row.content,
+                    "content_hash": row.content_hash,
+                    "version": row.version,
+                    "created_at": row.created_at.isoformat(),
+                    "updated_at": row.updated_at.isoformat(),
+                }, ensure_ascii=False) + "\n"
+                for row in rows
+            ).encode("utf-8")
+
+
+async def gzip_chunks(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Compress a byte stream into one gzip member as it is produced"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def gunzip_chunks(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Inverse of gzip_chunks"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = decompressor.decompress(chunk)
+        if data:
+            yield data
+    yield decompressor.flush()
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """Split a byte stream into lines, whatever the chunk boundaries"""
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+
+def prompt_record(
+    prompt_id: uuid.UUID,
+    description: Optional[str],
+    content: str,
+    created_at: Optional[datetime] = None
+) -> dict:
+    """A prompt as accepted by upsert_prompts"""
+    if created_at is None:
+        created_at = datetime.now(timezone.utc)
+    elif created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return {
+        "id": prompt_id,
+        "description": description,
+        "content": content,
+        "content_hash": hash_content(content),
+        "created_at": created_at,
+    }
+
+
+def _parse_record(line: bytes, number: int) -> dict:
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        raise BulkImportError(number, f"invalid JSON: {e}")
+    if not isinstance(record, dict):
+        raise BulkImportError(number, "expected a JSON object")
+
+    content = record.get("content")
+    if not isinstance(content, str):
+        raise BulkImportError(number, "content must be a string")
+    description = record.get("description")
+    if description is not None and (not isinstance(description, str) or len(description) > DESCRIPTION_MAX_LENGTH):
+        raise BulkImportError(number, f"description must be a string of at most {DESCRIPTION_MAX_LENGTH} characters")
+
+    try:
+        prompt_id = uuid.UUID(record["id"]) if record.get("id") is not None else uuid.uuid4()
+    except (TypeError, ValueError):
+        raise BulkImportError(number, "id must be a UUID")
+
+    created_at = record.get("created_at")
+    try:
+        created_at = datetime.fromisoformat(created_at) if created_at is not None else None
+    except (TypeError, ValueError):
+        raise BulkImportError(number, "created_at must be an ISO 8601 timestamp")
+
+    parsed = prompt_record(prompt_id, description, content, created_at)
+    if record.get("content_hash") not in (None, parsed["content_hash"]):
+        raise BulkImportError(number, "content_hash does not match content")
+    return parsed
+
+
+async def upsert_prompts(db, records: dict[uuid.UUID, dict], deltas: bool = False) -> list:
+    """Create or update prompts by id with one statement per table.
+
+    Prompts that already hold a record's content and description are left
+    alone. New versions are full snapshots, or with ``deltas`` are stored
+    against each prompt's latest snapshot at the cost of one more read.
+    Returns ``(id, version, created_at, updated_at)`` rows for the
+    prompts that were written; the caller commits.
+    """
+    # Skip prompts that are already current without writing anything:
+    # BEFORE INSERT triggers run even for rows ON CONFLICT leaves alone
+    current = (await db.execute(
+        select(Prompt.id, Prompt.content_hash, Prompt.description)
+        .where(Prompt.id.in_(list(records)))
+    )).all()
+    records = dict(records)
+    for row in current:
+        record = records[row.id]
+        if (row.content_hash, row.description) == (record["content_hash"], record["description"]):
+            del records[row.id]
+    if not records:
+        return []
+
+    await db.execute(upsert_blobs({record["content_hash"]: record["content"] for record in records.values()}))
+
+    # Sorted so concurrent writers lock rows in the same order
+    ordered = sorted(records.values(), key=lambda record: record["id"])
+    rows = func.unnest(
+        bindparam("prompt_ids", [record["id"] for record in ordered], type_=ARRAY(UUID(as_uuid=True))),
+        bindparam("prompt_hashes", [record["content_hash"] for record in ordered], type_=ARRAY(String)),
+        bindparam("prompt_descriptions", [record["description"] for record in ordered], type_=ARRAY(String)),
+        bindparam("prompt_created", [record["created_at"] for record in ordered], type_=ARRAY(DateTime(timezone=True))),
+    ).table_valued("id", "content_hash", "description", "created_at").render_derived(name="prompt_rows")
+    stmt = pg_insert(Prompt).from_select(
+        ["id", "content_hash", "description", "created_at"],
+        select(rows.c.id, rows.c.content_hash, rows.c.description, rows.c.created_at),
+        include_defaults=False
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Prompt.id],
+        set_={
+            "content_hash": stmt.excluded.content_hash,
+            "description": stmt.excluded.description,
+            "version": Prompt.version + 1,
+            "updated_at": func.now(),
+        },
+        # Prompts already holding this content and description keep their version
+        where=or_(
+            Prompt.content_hash != stmt.excluded.content_hash,
+            Prompt.description.is_distinct_from(stmt.excluded.description),
+        )
+    ).returning(Prompt.id, Prompt.version, Prompt.created_at, Prompt.updated_at)
+    written = (await db.execute(stmt)).all()
+
+    versions = [{**records[row.id], "version": row.version} for row in written]
+    if deltas:
+        await record_versions(db, versions)
+    else:
+        await record_snapshot_versions(db, versions)
+    return written
+
+
+async def _import_batch(db, records: dict[uuid.UUID, dict], totals: dict) -> list[uuid.UUID]:
+    """Upsert one batch of prompts by id; returns the ids that were written"""
+    written = await upsert_prompts(db, records)
+    created = sum(1 for row in written if row.version == 1)
+    totals["created"] += created
+    totals["updated"] += len(written) - created
+    totals["unchanged"] += len(records) - len(written)
+    return [row.id for row in written]
+
+
+async def import_prompts(lines: AsyncIterable[bytes], batch_size: int = BULK_BATCH_SIZE) -> dict:
+    """Upsert NDJSON prompts by id in a single transaction.
+
+    Lines are written as they are read, in batches of ``batch_size`` with
+    one INSERT ... ON CONFLICT per table over ``unnest``-ed arrays, so
+    memory is bounded by the batch. A line without an id creates a new
+    prompt; when an id repeats within a batch the last line wins. Any
+    malformed line raises BulkImportError and rolls the whole import back.
+    """
+    started = time.perf_counter()
+    totals = {"lines": 0, "created": 0, "updated": 0, "unchanged": 0}
+    written: list[uuid.UUID] = []
+    async with AsyncSessionLocal() as db:
+        batch: dict[uuid.UUID, dict] = {}
+        number = 0
+        async for line in lines:
+            number += 1
+            if not line.strip():
+                continue
+            record = _parse_record(line, number)
+            totals["lines"] += 1
+            batch[record["id"]] = record
+            if len(batch) >= batch_size:
+                written.extend(await _import_batch(db, batch, totals))
+                batch = {}
+        if batch:
+            written.extend(await _import_batch(db, batch, totals))
+        await db.commit()
+
+    # Other workers drop their copies on the change notifications
+    for prompt_id in written:
+        replica_router.note_write(prompt_id)
+        prompt_cache.invalidate(prompt_id)
+        template_cache.invalidate(prompt_id)
+    totals["seconds"] = round(time.perf_counter() - started, 3)
+    return totals
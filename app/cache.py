@@ -0,0 +1,171 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+# Cache limits from environment variables
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "1024"))
+PROMPT_CACHE_MAX_BYTES = int(os.getenv("PROMPT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+PROMPT_CACHE_TTL_SECONDS = float(os.getenv("PROMPT_CACHE_TTL_SECONDS", "300"))
+
+
+class CachedPrompt(NamedTuple):
+    """Snapshot of the prompt fields served by the public API"""
+    content: str
+    content_hash: str
+    updated_at: datetime
+
+
+class _Entry(NamedTuple):
+    value: CachedPrompt
+    size: int
+    expires_at: float
+
+
+class PromptCache:
+    """Bounded in-process LRU cache of prompts keyed by UUID.
+
+    Entries are evicted when they are older than ``ttl`` seconds, or in
+    least-recently-used order once either ``max_entries`` or ``max_bytes``
+    would be exceeded. A ``max_entries`` of 0 disables the cache.
+
+    Bodies are held once per content hash, so prompts with identical
+    content share memory and count against ``max_bytes`` once.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[uuid.UUID, _Entry]" = OrderedDict()
+        # content_hash -> [content, number of entries sharing it]
+        self._bodies: dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, prompt_id: uuid.UUID) -> Optional[CachedPrompt]:
+        """Return the cached prompt, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(prompt_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(prompt_id)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(prompt_id)
+            self.hits += 1
+            return entry.value
+
+    def put(self, prompt_id: uuid.UUID, value: CachedPrompt) -> None:
+        """Store a prompt, evicting least recently used entries as needed"""
+        self._store(prompt_id, value, only_if_newer=False)
+
+    def fill(self, prompt_id: uuid.UUID, value: CachedPrompt) -> None:
+        """Store a prompt read from the database unless a newer one is cached.
+        
+        A read that started before a write-through (or came from a lagging
+        replica) must not replace the entry that write put in the cache.
+        """
+        self._store(prompt_id, value, only_if_newer=True)
+
+    def _store(self, prompt_id: uuid.UUID, value: CachedPrompt, only_if_newer: bool) -> None:
+        if not self.enabled:
+            return
+        size = sys.getsizeof(value.content)
+        with self._lock:
+            entry = self._entries.get(prompt_id)
+            if entry is not None:
+                if (
+                    only_if_newer
+                    and entry.value.updated_at >= value.updated_at
+                    and entry.expires_at > time.monotonic()
+                ):
+                    return
+                self._remove(prompt_id)
+            # Too large to cache; the older body above is dropped all the same
+            if size > self.max_bytes:
+                return
+            body = self._bodies.get(value.content_hash)
+            if body is None:
+                self._bodies[value.content_hash] = [value.content, 1]
+                self._bytes += size
+            else:
+                body[1] += 1
+                value = value._replace(content=body[0])
+            self._entries[prompt_id] = _Entry(value, size, time.monotonic() + self.ttl)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, prompt_id: uuid.UUID) -> None:
+        """Drop a single prompt from the cache"""
+        with self._lock:
+            if prompt_id in self._entries:
+                self._remove(prompt_id)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every cached prompt"""
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._bodies.clear()
+            self._bytes = 0
+
+    def versions(self) -> dict:
+        """Map of cached prompt id -> (content_hash, updated_at)"""
+        with self._lock:
+            return {
+                prompt_id: (entry.value.content_hash, entry.value.updated_at)
+                for prompt_id, entry in self._entries.items()
+            }
+
+    def stats(self) -> dict:
+        """Counters and current usage, for sizing the cache"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bodies": len(self._bodies),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _remove(self, prompt_id: uuid.UUID) -> None:
+        entry = self._entries.pop(prompt_id)
+        body = self._bodies[entry.value.content_hash]
+        body[1] -= 1
+        if body[1] == 0:
+            del self._bodies[entry.value.content_hash]
+            self._bytes -= entry.size
+
+
+# Shared cache used by the public and admin routers
+prompt_cache = PromptCache(
+    max_entries=PROMPT_CACHE_MAX_ENTRIES,
+    max_bytes=PROMPT_CACHE_MAX_BYTES,
+    ttl=PROMPT_CACHE_TTL_SECONDS,
+)
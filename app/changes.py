@@ -0,0 +1,117 @@
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, union_all, literal, null, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Prompt, PromptTombstone, PromptTombstoneHorizon
+
+# Maximum number of changes returned by one change feed request
+CHANGES_PAGE_SIZE = int(os.getenv("CHANGES_PAGE_SIZE", "500"))
+# Days a deletion stays in the change feed before prune-tombstones removes it
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+class CursorExpired(Exception):
+    """A change feed cursor predates pruned tombstones, so deletions may be missing"""
+    
+    def __init__(self, since: int, horizon: int):
+        super().__init__(
+            f"Cursor {since} is older than the retained change history ({horizon}); "
+            "resync from cursor 0"
+        )
+        self.since = since
+        self.horizon = horizon
+
+async def tombstone_horizon(db: AsyncSession) -> int:
+    """Newest change_seq whose tombstone has been pruned, or 0"""
+    return await db.scalar(select(PromptTombstoneHorizon.pruned_through)) or 0
+
+async def list_changes(
+    db: AsyncSession,
+    since: int,
+    limit: int,
+    ids: Optional[list[uuid.UUID]] = None
+) -> list:
+    """Prompt upserts and deletions with change_seq greater than ``since``.
+
+    Rows come back oldest first. Each write draws change_seq under a
+    transaction-scoped advisory lock, so sequence order is commit order and
+    the largest seq returned is a safe cursor for the next call. Both halves
+    of the union are range scans on a unique change_seq index, or primary key
+    lookups when ``ids`` is given.
+
+    Raises CursorExpired when ``since`` is before the tombstone horizon;
+    a cursor of 0 is a full sync and needs no deletions.
+    """
+    upserts = select(
+        Prompt.id,
+        Prompt.change_seq,
+        literal("upsert").label("op"),
+        Prompt.content_hash,
+        Prompt.updated_at.label("changed_at"),
+    ).where(Prompt.change_seq > since)
+    deletes = select(
+        PromptTombstone.id,
+        PromptTombstone.change_seq,
+        literal("delete").label("op"),
+        null().label("content_hash"),
+        PromptTombstone.deleted_at.label("changed_at"),
+    ).where(PromptTombstone.change_seq > since)
+
+    if ids is not None:
+        upserts = upserts.where(Prompt.id.in_(ids))
+        deletes = deletes.where(PromptTombstone.id.in_(ids))
+
+    feed = union_all(upserts, deletes).subquery()
+    result = await db.execute(
+        select(feed).order_by(feed.c.change_seq).limit(limit)
+    )
+    rows = result.all()
+    if since > 0:
+        # Read after the feed, so a prune that committed before it is always seen
+        horizon = await tombstone_horizon(db)
+        if since < horizon:
+            raise CursorExpired(since, horizon)
+    return rows
+
+async def prune_tombstones(db: AsyncSession, retention_days: int = TOMBSTONE_RETENTION_DAYS) -> dict:
+    """Delete tombstones older than ``retention_days`` and move the horizon past them.
+
+    Both happen in one statement, so no reader sees the tombstones gone
+    without the horizon that reports them as missing. The caller commits.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+    row = (await db.execute(
+        text("""
+            WITH pruned AS (
+                DELETE FROM prompt_tombstones WHERE deleted_at < :cutoff RETURNING change_seq
+            )
+            UPDATE prompt_tombstone_horizon
+            SET pruned_through = greatest(pruned_through, (SELECT max(change_seq) FROM pruned)),
+                pruned_at = now()
+            WHERE id = 1
+            RETURNING pruned_through, (SELECT count(*) FROM pruned) AS pruned
+        """),
+        {"cutoff": cutoff}
+    )).one()
+    return {"pruned": row.pruned, "pruned_through": row.pruned_through, "cutoff": cutoff.isoformat()}
+
+def changes_response(rows: list, since: int, limit: int) -> dict:
+    """JSON body for a page of at most ``limit`` changes fetched with ``limit + 1``"""
+    page = rows[:limit]
+    return {
+        "changes": [
+            {
+                "id": str(row.id),
+                "op": row.op,
+                "seq": row.change_seq,
+                "content_hash": row.content_hash,
+                "changed_at": row.changed_at.isoformat(),
+            }
+            for row in page
+        ],
+        # Unchanged when nothing happened, so clients can keep polling with it
+        "cursor": page[-1].change_seq if page else since,
+        "has_more": len(rows) > limit,
+    }
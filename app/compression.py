@@ -0,0 +1,159 @@
+import asyncio
+import gzip
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+# Optional codecs; gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression settings from environment variables
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Variants are built once per content version, so use high compression levels
+ENCODERS = {}
+if brotli is not None:
+    ENCODERS["br"] = lambda data: brotli.compress(data, quality=11, mode=brotli.MODE_TEXT)
+if zstandard is not None:
+    ENCODERS["zstd"] = lambda data: zstandard.ZstdCompressor(level=19).compress(data)
+ENCODERS["gzip"] = lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+
+# Server preference when the client accepts several encodings equally
+ENCODING_PREFERENCE = list(ENCODERS)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best available content-coding for an Accept-Encoding header.
+
+    Returns None when the identity encoding should be used.
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding] = weight
+
+    wildcard = weights.get("*", 0.0)
+    best = None
+    best_weight = 0.0
+    for coding in ENCODING_PREFERENCE:
+        weight = weights.get(coding, wildcard)
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+class VariantCache:
+    """LRU cache of compressed bodies keyed by (content_hash, encoding).
+
+    Keys are content hashes, so a variant is compressed once per content
+    version and shared by every prompt with the same body.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._variants: "OrderedDict[tuple[str, str], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, str], asyncio.Future] = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get(self, content_hash: str, encoding: str, content: str) -> bytes:
+        """Compressed ``content``, encoding and compressing in a worker thread on a miss"""
+        key = (content_hash, encoding)
+        with self._lock:
+            body = self._variants.get(key)
+            if body is not None:
+                self._variants.move_to_end(key)
+                self.hits += 1
+                return body
+            self.misses += 1
+
+        # Concurrent misses for the same variant wait on one compression
+        pending = self._pending.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            body = await run_in_threadpool(
+                lambda: ENCODERS[encoding](content.encode("utf-8"))
+            )
+            self._put(key, body)
+            future.set_result(body)
+            return body
+        except BaseException as e:
+            future.set_exception(e)
+            # Nobody else may be waiting on the future
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+
+    def warm(self, content_hash: str, content: str) -> None:
+        """Compress every available variant of ``content`` (blocking)"""
+        data = content.encode("utf-8")
+        if len(data) < COMPRESSION_MIN_BYTES:
+            return
+        for encoding, encode in ENCODERS.items():
+            with self._lock:
+                if (content_hash, encoding) in self._variants:
+                    continue
+            self._put((content_hash, encoding), encode(data))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "variants": len(self._variants),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "encodings": ENCODING_PREFERENCE,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _put(self, key: tuple[str, str], body: bytes) -> None:
+        size = sys.getsizeof(body)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._variants.pop(key, None)
+            if old is not None:
+                self._bytes -= sys.getsizeof(old)
+            self._variants[key] = body
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._variants.popitem(last=False)
+                self._bytes -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+
+# Shared compressed-variant cache used by the public router
+variant_cache = VariantCache(max_bytes=COMPRESSION_CACHE_MAX_BYTES)
@@ -0,0 +1,141 @@
+import logging
+import os
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+# Profiling settings from environment variables
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "50"))
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+
+class QueryStats:
+    """Query count and time spent in the database"""
+
+    __slots__ = ("queries", "query_seconds", "slow_queries", "pool_checkouts", "pool_wait_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.slow_queries = 0
+        self.pool_checkouts = 0
+        self.pool_wait_seconds = 0.0
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+# Process-wide totals, and the stats of the request being served (if any)
+totals = QueryStats()
+slow_query_log: deque = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_request_stats: ContextVar[Optional[QueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def _record_query(statement: str, duration: float) -> None:
+    request_stats = _request_stats.get()
+    for stats in (totals, request_stats):
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += duration
+
+    if duration * 1000 >= SLOW_QUERY_MS:
+        for stats in (totals, request_stats):
+            if stats is not None:
+                stats.slow_queries += 1
+        # Statements only; parameters may hold prompt content
+        sql = " ".join(statement.split())[:500]
+        slow_query_log.append({
+            "at": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "statement": sql,
+        })
+        logger.warning(f"Slow query ({duration * 1000:.1f} ms): {sql}")
+
+
+def _record_pool_wait(duration: float) -> None:
+    for stats in (totals, _request_stats.get()):
+        if stats is not None:
+            stats.pool_checkouts += 1
+            stats.pool_wait_seconds += duration
+
+
+def install_query_profiling(engine: Engine) -> None:
+    """Time every statement run through ``engine`` (pass ``sync_engine`` for async engines)"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        _record_query(statement, time.perf_counter() - start)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # Keep the start-time stack balanced when a statement fails
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(time.perf_counter() - start)
+
+
+def pool_status(pool) -> dict:
+    """Current usage of a QueuePool against its configured limits"""
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+    }
+
+
+class QueryProfilingMiddleware:
+    """Collects per-request DB stats and reports them in a Server-Timing header"""
+
+    def __init__(self, app: ASGIApp, server_timing: bool = SERVER_TIMING_ENABLED):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.server_timing:
+                timing = (
+                    f'db;dur={stats.query_seconds * 1000:.2f};desc="queries: {stats.queries}", '
+                    f"db-pool;dur={stats.pool_wait_seconds * 1000:.2f}"
+                )
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", timing.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
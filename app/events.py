@@ -0,0 +1,267 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import AsyncIterator, NamedTuple, Optional
+
+import asyncpg
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from .database import AsyncSessionLocal
+from .changes import CHANGES_PAGE_SIZE, CursorExpired, list_changes
+from .notify import prompt_listener, PROMPT_NOTIFY_ENABLED
+
+# Event stream settings from environment variables
+EVENTS_MAX_SUBSCRIBERS = int(os.getenv("EVENTS_MAX_SUBSCRIBERS", "10000"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+
+# Reconnect delay suggested to EventSource clients, in milliseconds
+EVENTS_RETRY_MS = 3000
+
+
+class PromptEvent(NamedTuple):
+    op: str  # "upsert" or "delete", as in the change feed
+    id: uuid.UUID
+    seq: Optional[int]
+
+
+class Subscriber:
+    """One stream's bounded event queue, optionally limited to some prompt ids"""
+
+    __slots__ = ("ids", "queue", "active")
+
+    def __init__(self, ids: Optional[frozenset], queue_size: int):
+        self.ids = ids
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.active = True
+
+
+class PromptEventBroker:
+    """Fans prompt change notifications out to event stream subscribers.
+
+    Each subscriber is a bounded asyncio queue, so idle streams cost a queue
+    and a suspended coroutine rather than a thread. Publishing never waits:
+    a subscriber whose queue is full is cut off and its stream ends, and the
+    client resumes from its last event id, replayed from the change feed.
+    Delivery is at least once; ``seq`` identifies duplicates.
+
+    Notifications that arrive while ``resync`` is querying are held back
+    and delivered together with the resynced rows in seq order, so live
+    traffic cannot move ``last_seq`` past changes the resync recovers.
+    """
+
+    def __init__(self, max_subscribers: int, queue_size: int):
+        self.max_subscribers = max_subscribers
+        self.queue_size = queue_size
+        self._by_id: dict[uuid.UUID, set[Subscriber]] = {}
+        self._all: set[Subscriber] = set()
+        self._count = 0
+        self.last_seq: Optional[int] = None
+        # Live events held while a resync is running
+        self._held: Optional[list[PromptEvent]] = None
+        self.published = 0
+        self.overflows = 0
+
+    def subscribe(self, ids: Optional[list[uuid.UUID]] = None) -> Optional[Subscriber]:
+        """New subscriber for ``ids`` (every prompt if None), or None when full"""
+        if self.is_full():
+            return None
+        subscriber = Subscriber(frozenset(ids) if ids is not None else None, self.queue_size)
+        if subscriber.ids is None:
+            self._all.add(subscriber)
+        else:
+            for prompt_id in subscriber.ids:
+                self._by_id.setdefault(prompt_id, set()).add(subscriber)
+        self._count += 1
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        if not subscriber.active:
+            return
+        subscriber.active = False
+        if subscriber.ids is None:
+            self._all.discard(subscriber)
+        else:
+            for prompt_id in subscriber.ids:
+                subscribers = self._by_id[prompt_id]
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._by_id[prompt_id]
+        self._count -= 1
+
+    def is_full(self) -> bool:
+        return self._count >= self.max_subscribers
+
+    def publish(self, event: PromptEvent) -> None:
+        """Queue ``event`` for every interested subscriber without blocking"""
+        if self._held is not None:
+            self._held.append(event)
+            return
+        self._deliver(event)
+
+    def _deliver(self, event: PromptEvent) -> None:
+        if event.seq is not None:
+            if self.last_seq is not None and event.seq <= self.last_seq:
+                return
+            self.last_seq = event.seq
+        self.published += 1
+
+        for subscriber in (*self._all, *self._by_id.get(event.id, ())):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self._overflow(subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": self._count,
+            "max_subscribers": self.max_subscribers,
+            "last_seq": self.last_seq,
+            "published": self.published,
+            "overflows": self.overflows,
+        }
+
+    def _overflow(self, subscriber: Subscriber) -> None:
+        # Drop the backlog and leave only the end-of-stream marker
+        self.unsubscribe(subscriber)
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        self.overflows += 1
+
+    async def resync(self, conn: asyncpg.Connection) -> None:
+        """Publish changes whose notifications were missed while disconnected"""
+        if self._held is not None:
+            return
+        self._held = []
+        missed: list[PromptEvent] = []
+        try:
+            if self.last_seq is None:
+                self.last_seq = await conn.fetchval(
+                    "SELECT greatest((SELECT max(change_seq) FROM prompts),"
+                    " (SELECT max(change_seq) FROM prompt_tombstones),"
+                    " (SELECT pruned_through FROM prompt_tombstone_horizon))"
+                )
+            else:
+                rows = await conn.fetch(
+                    "SELECT id, change_seq, 'upsert' AS op FROM prompts WHERE change_seq > $1"
+                    " UNION ALL"
+                    " SELECT id, change_seq, 'delete' AS op FROM prompt_tombstones WHERE change_seq > $1"
+                    " ORDER BY change_seq",
+                    self.last_seq
+                )
+                missed = [PromptEvent(row["op"], row["id"], row["change_seq"]) for row in rows]
+        finally:
+            held, self._held = self._held, None
+            # A change seen both ways is delivered once, by its seq
+            merged = {event.seq: event for event in (*missed, *held) if event.seq is not None}
+            for seq in sorted(merged):
+                self._deliver(merged[seq])
+            for event in held:
+                if event.seq is None:
+                    self._deliver(event)
+
+
+def format_event(event: PromptEvent) -> str:
+    data = json.dumps({"id": str(event.id), "op": event.op, "seq": event.seq})
+    lines = f"event: {event.op}\ndata: {data}\n\n"
+    if event.seq is not None:
+        lines = f"id: {event.seq}\n" + lines
+    return lines
+
+
+async def stream_events(
+    ids: Optional[list[uuid.UUID]],
+    since: Optional[int],
+    heartbeat: float = EVENTS_HEARTBEAT_SECONDS
+) -> AsyncIterator[str]:
+    """Server-sent event stream of changes to ``ids`` (every prompt if None).
+
+    When ``since`` is given (the client's Last-Event-ID), changes after it are
+    replayed from the change feed first; the subscription is taken before the
+    replay so nothing falls in between. The database session is released
+    before live streaming starts, so idle streams hold no connection. If
+    ``since`` predates the retained deletions a "resync" event ends the
+    stream; the client reloads and reconnects without Last-Event-ID.
+    """
+    subscriber = event_broker.subscribe(ids)
+    if subscriber is None:
+        yield "event: overflow\ndata: {}\n\n"
+        return
+    try:
+        yield f"retry: {EVENTS_RETRY_MS}\n\n"
+
+        replayed = since
+        if since is not None:
+            while True:
+                # One short session per page, released before writing to the client
+                try:
+                    async with AsyncSessionLocal() as db:
+                        rows = await list_changes(db, replayed, CHANGES_PAGE_SIZE, ids)
+                except CursorExpired:
+                    yield "event: resync\ndata: {}\n\n"
+                    return
+                for row in rows:
+                    yield format_event(PromptEvent(row.op, row.id, row.change_seq))
+                    replayed = row.change_seq
+                if len(rows) < CHANGES_PAGE_SIZE:
+                    break
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing idle connections
+                yield ": ping\n\n"
+                continue
+            if event is None:
+                # Too slow to keep up; the client reconnects with Last-Event-ID
+                yield "event: overflow\ndata: {}\n\n"
+                return
+            if replayed is not None and event.seq is not None and event.seq <= replayed:
+                continue
+            yield format_event(event)
+    finally:
+        event_broker.unsubscribe(subscriber)
+
+
+def event_stream_response(
+    ids: Optional[list[uuid.UUID]],
+    since: Optional[str]
+) -> StreamingResponse:
+    """text/event-stream response resuming after ``since`` (a Last-Event-ID)"""
+    # Events come from the change listener; without it nothing would be sent
+    if not PROMPT_NOTIFY_ENABLED or event_broker.is_full():
+        raise HTTPException(status_code=503, detail="Event stream unavailable")
+    try:
+        since_seq = int(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return StreamingResponse(
+        stream_events(ids, since_seq),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop nginx from buffering the stream
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+# Shared broker fed by the prompt change listener
+event_broker = PromptEventBroker(
+    max_subscribers=EVENTS_MAX_SUBSCRIBERS,
+    queue_size=EVENTS_QUEUE_SIZE,
+)
+
+
+@prompt_listener.on_change
+def _publish_prompt_event(op: str, prompt_id: uuid.UUID, seq: Optional[int]) -> None:
+    event_broker.publish(PromptEvent("delete" if op == "delete" else "upsert", prompt_id, seq))
+
+
+@prompt_listener.on_resync
+async def _resync_prompt_events(conn: asyncpg.Connection) -> None:
+    await event_broker.resync(conn)
@@ -3,17 +3,27 @@ import pathlib
 
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, RedirectResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response, PlainTextResponse
 from fastapi.templating import Jinja2Templates
-from starlette.middleware.sessions import SessionMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from dotenv import load_dotenv
 
-from .database import create_tables, close_db
+from .database import async_engine
+from .storage import store
 from .admin import router as admin_router
+from .admin_api import router as admin_api_router
 from .public import router as public_router
 from .auth import SECRET_KEY
+from .cache import prompt_cache
+from .compression import variant_cache
+from .rendering import template_cache
+from .notify import prompt_listener, PROMPT_NOTIFY_ENABLED
+from .events import event_broker
+from .replicas import replica_router
+from .snapshot import snapshot_store
+from .middleware import AdminSessionMiddleware, SecurityHeadersMiddleware
+from .metrics import MetricsMiddleware, request_metrics
+from . import db_profiling
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,20 +32,50 @@ logger = logging.getLogger(__name__)
 # Load environment variables
 load_dotenv()
 
-def startup_event():
+async def startup_event():
     """Startup event handler"""
     logger.info("Starting up...")
+    if not store.postgres:
+        # Replicas, snapshots and change notifications all read Postgres
+        if replica_router.enabled or snapshot_store.enabled:
+            raise RuntimeError("DATABASE_REPLICA_URLS and SNAPSHOT_MODE require STORAGE_BACKEND=postgres")
+        await store.start()
+        logger.info(f"Storing prompts in {store.name}")
+        return
+    
+    # An existing snapshot lets the public API serve before the database is up
+    snapshot_loaded = snapshot_store.enabled and snapshot_store.load()
     try:
-        create_tables()
-        logger.info("Database tables created/verified")
+        await store.start()
+        logger.info("Database schema verified")
     except Exception as e:
-        logger.error(f"Failed to create tables: {e}")
-        raise
+        logger.error(f"Database schema check failed: {e}")
+        if not snapshot_loaded:
+            raise
+        logger.warning("Database unavailable; serving prompts from the snapshot")
+    
+    # Keep in-process caches in step with writes made by other workers
+    if PROMPT_NOTIFY_ENABLED:
+        prompt_listener.start()
+    
+    # Public reads go to replicas once they pass a health check
+    if replica_router.enabled:
+        await replica_router.check()
+        replica_router.start()
+    
+    if snapshot_store.enabled:
+        if not snapshot_loaded:
+            # Nothing to serve from until the first export
+            await snapshot_store.refresh()
+        snapshot_store.start()
 
-def shutdown_event():
+async def shutdown_event():
     """Shutdown event handler"""
     logger.info("Shutting down...")
-    close_db()
+    await prompt_listener.stop()
+    await replica_router.stop()
+    await snapshot_store.stop()
+    await store.close()
 
 # Create FastAPI app
 app = FastAPI(
@@ -48,27 +88,24 @@ app = FastAPI(
 app.add_event_handler("startup", startup_event)
 app.add_event_handler("shutdown", shutdown_event)
 
-# Add session middleware
+# Add session middleware (admin routes only; public routes skip cookie work)
 app.add_middleware(
-    SessionMiddleware,
+    AdminSessionMiddleware,
     secret_key=SECRET_KEY,
     max_age=86400,  # 24 hours
     same_site="lax",
     https_only=False  # Set to True in production with HTTPS
 )
 
-# Security headers middleware
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        response = await call_next(request)
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
-        return response
-
+# Security headers middleware (raw ASGI, no response wrapping)
 app.add_middleware(SecurityHeadersMiddleware)
 
+# Per-request DB query stats and Server-Timing header
+app.add_middleware(db_profiling.QueryProfilingMiddleware)
+
+# Request metrics middleware (outermost, so it times the whole stack)
+app.add_middleware(MetricsMiddleware, metrics=request_metrics)
+
 # Get the base directory (where this file is located)
 BASE_DIR = pathlib.Path(__file__).parent
 
@@ -82,11 +119,19 @@ templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 
 # Include routers
 app.include_router(admin_router)
+app.include_router(admin_api_router)
 app.include_router(public_router)
 
 # Error handlers
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: StarletteHTTPException):
+    # Token clients of the JSON admin API get JSON errors, not HTML pages
+    if request.url.path.startswith(f"{admin_api_router.prefix}/"):
+        return JSONResponse(
+            {"detail": exc.detail},
+            status_code=exc.status_code,
+            headers=getattr(exc, "headers", None)
+        )
     if exc.status_code == 404:
         return templates.TemplateResponse(
             "404.html",
@@ -103,7 +148,8 @@ async def http_exception_handler(request: Request, exc: StarletteHTTPException):
         return templates.TemplateResponse(
             "error.html",
             {"request": request, "error": exc.detail, "status_code": exc.status_code},
-            status_code=exc.status_code
+            status_code=exc.status_code,
+            headers=getattr(exc, "headers", None)
         )
 
 # Root redirect
@@ -118,6 +164,67 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy"}
 
+# Prometheus metrics
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request, cache and listener metrics in Prometheus text format"""
+    return PlainTextResponse(
+        request_metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+@request_metrics.collector
+def _cache_metrics():
+    stats = prompt_cache.stats()
+    yield "prompt_cache_entries", "gauge", "Prompts held in the cache", stats["entries"]
+    yield "prompt_cache_bytes", "gauge", "Bytes of prompt content held in the cache", stats["bytes"]
+    for counter in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        yield f"prompt_cache_{counter}_total", "counter", f"Prompt cache {counter}", stats[counter]
+    variants = variant_cache.stats()
+    yield "compressed_variant_bytes", "gauge", "Bytes of precompressed prompt bodies held in memory", variants["bytes"]
+    for counter in ("hits", "misses", "evictions"):
+        yield f"compressed_variant_{counter}_total", "counter", f"Compressed variant cache {counter}", variants[counter]
+    templates = template_cache.stats()
+    yield "prompt_template_cache_entries", "gauge", "Compiled prompt templates held in memory", templates["templates"]
+    for counter in ("hits", "misses", "evictions", "renders", "errors"):
+        yield f"prompt_template_{counter}_total", "counter", f"Prompt template {counter}", templates[counter]
+    snapshot = snapshot_store.stats()
+    yield "prompt_snapshot_prompts", "gauge", "Prompts in the loaded snapshot", snapshot["prompts"]
+    yield "prompt_snapshot_age_seconds", "gauge", "Seconds since the loaded snapshot was exported", snapshot["age_seconds"] or 0
+    yield "prompt_snapshot_hits_total", "counter", "Prompts served from the snapshot", snapshot["hits"]
+    yield "prompt_snapshot_fallbacks_total", "counter", "Database reads replaced by the snapshot", snapshot["fallbacks"]
+
+@request_metrics.collector
+def _db_metrics():
+    totals = db_profiling.totals
+    pool = db_profiling.pool_status(async_engine.pool)
+    yield "db_queries_total", "counter", "SQL statements executed", totals.queries
+    yield "db_query_seconds_total", "counter", "Time spent executing SQL", totals.query_seconds
+    yield "db_slow_queries_total", "counter", "Statements slower than SLOW_QUERY_MS", totals.slow_queries
+    yield "db_pool_checkouts_total", "counter", "Connection pool checkouts", totals.pool_checkouts
+    yield "db_pool_wait_seconds_total", "counter", "Time spent waiting for a pooled connection", totals.pool_wait_seconds
+    yield "db_pool_size", "gauge", "Configured connection pool size", pool["pool_size"]
+    yield "db_pool_max_overflow", "gauge", "Configured connection pool max overflow", pool["max_overflow"]
+    yield "db_pool_checked_out", "gauge", "Connections currently checked out", pool["checked_out"]
+    yield "db_pool_overflow", "gauge", "Overflow connections currently open", pool["overflow"]
+    replicas = replica_router.stats()
+    yield "db_replicas", "gauge", "Configured read replicas", len(replicas["replicas"])
+    yield "db_replicas_healthy", "gauge", "Read replicas currently in rotation", sum(r["healthy"] for r in replicas["replicas"])
+    yield "db_replica_reads_total", "counter", "Public reads served by a replica", replicas["replica_reads"]
+    yield "db_primary_reads_total", "counter", "Public reads served by the primary", replicas["primary_reads"]
+    yield "db_replica_failovers_total", "counter", "Public reads moved to the primary after a replica connect failure", replicas["failovers"]
+
+@request_metrics.collector
+def _listener_metrics():
+    stats = prompt_listener.stats()
+    yield "prompt_listener_connected", "gauge", "Whether the change listener is connected", int(stats["connected"])
+    yield "prompt_listener_notifications_total", "counter", "Change notifications received", stats["notifications"]
+    yield "prompt_listener_reconnects_total", "counter", "Change listener reconnects", stats["reconnects"]
+    events = event_broker.stats()
+    yield "prompt_event_subscribers", "gauge", "Open prompt event streams", events["subscribers"]
+    yield "prompt_events_published_total", "counter", "Prompt events fanned out to subscribers", events["published"]
+    yield "prompt_event_overflows_total", "counter", "Event streams cut off for falling behind", events["overflows"]
+
 # Debug endpoint for checking static files
 @app.get("/debug/static")
 async def debug_static():
@@ -144,6 +251,35 @@ async def debug_static():
         "static_files": [f.name for f in static_dir.rglob("*") if f.is_file()] if static_dir.exists() else []
     }
 
+# Prompt cache counters
+@app.get("/debug/cache")
+async def debug_cache():
+    """Prompt cache, compressed-variant cache, template cache and snapshot counters"""
+    return {
+        "prompts": prompt_cache.stats(),
+        "compressed_variants": variant_cache.stats(),
+        "templates": template_cache.stats(),
+        "snapshot": snapshot_store.stats(),
+    }
+
+# Database query profiling
+@app.get("/debug/db")
+async def debug_db():
+    """Query totals, connection pool usage, replica health and recent slow queries"""
+    return {
+        "totals": db_profiling.totals.as_dict(),
+        "pool": db_profiling.pool_status(async_engine.pool),
+        "replicas": replica_router.stats(),
+        "slow_query_ms": db_profiling.SLOW_QUERY_MS,
+        "slow_queries": list(db_profiling.slow_query_log),
+    }
+
+# Cross-worker invalidation listener and event stream status
+@app.get("/debug/notify")
+async def debug_notify():
+    """LISTEN/NOTIFY listener status and event stream subscribers"""
+    return {**prompt_listener.stats(), "events": event_broker.stats()}
+
 # Direct CSS endpoint for testing
 @app.get("/test-css")
 async def test_css():
@@ -0,0 +1,141 @@
+import bisect
+import time
+from typing import Callable, Iterable
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (128, 512, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Prometheus-style histogram with fixed buckets"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterable[tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield str(bound), total
+        yield "+Inf", total + self.counts[-1]
+
+
+class RequestMetrics:
+    """Per-process HTTP request metrics, labelled by method and route template"""
+
+    def __init__(self):
+        self.in_flight = 0
+        self.requests: dict[tuple[str, str, int], int] = {}
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.response_size: dict[tuple[str, str], Histogram] = {}
+        # Extra gauge/counter sources rendered with the request metrics
+        self.collectors: list[Callable[[], Iterable[tuple[str, str, str, float]]]] = []
+
+    def record(self, method: str, route: str, status: int, duration: float, size: int) -> None:
+        key = (method, route, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        label = (method, route)
+        latency = self.latency.get(label)
+        if latency is None:
+            latency = self.latency[label] = Histogram(LATENCY_BUCKETS)
+            self.response_size[label] = Histogram(SIZE_BUCKETS)
+        latency.observe(duration)
+        self.response_size[label].observe(size)
+
+    def collector(self, func: Callable[[], Iterable[tuple[str, str, str, float]]]):
+        """Register a function yielding (name, type, help, value) samples"""
+        self.collectors.append(func)
+        return func
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            "# HELP http_requests_in_flight Requests currently being served",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {self.in_flight}",
+            "# HELP http_requests_total Completed requests",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(self.requests.items()):
+            lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        for name, help_text, histograms in (
+            ("http_request_duration_seconds", "Request latency", self.latency),
+            ("http_response_size_bytes", "Response body size", self.response_size),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (method, route), histogram in sorted(histograms.items()):
+                labels = f'method="{method}",route="{route}"'
+                for bound, count in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        for collect in self.collectors:
+            for name, metric_type, help_text, value in collect():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {metric_type}")
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def route_label(scope: Scope) -> str:
+    """Route template for a handled request, to keep label cardinality bounded"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounted apps (static files) set root_path to the mount prefix
+    if "endpoint" in scope:
+        return scope.get("root_path") or "/"
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Records request counts, latency, response size and in-flight requests"""
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+
+        async def send_and_measure(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics = self.metrics
+        metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            metrics.in_flight -= 1
+            metrics.record(scope["method"], route_label(scope), status, time.perf_counter() - start, size)
+
+
+# Shared registry exposed at /metrics
+request_metrics = RequestMetrics()
@@ -0,0 +1,52 @@
+from starlette.middleware.sessions import SessionMiddleware
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Path prefix of the routes that use cookie sessions
+ADMIN_PATH_PREFIX = "/admin"
+
+def is_admin_path(path: str) -> bool:
+    return path == ADMIN_PATH_PREFIX or path.startswith(ADMIN_PATH_PREFIX + "/")
+
+class AdminSessionMiddleware(SessionMiddleware):
+    """SessionMiddleware that only decodes and signs cookies for admin routes.
+    
+    Every other request goes straight to the app with no session in scope.
+    """
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket") or not is_admin_path(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+class SecurityHeadersMiddleware:
+    """Adds security headers at response start, as plain ASGI middleware.
+    
+    Unlike BaseHTTPMiddleware this never wraps or buffers the response body.
+    """
+    
+    headers = [
+        (b"x-content-type-options", b"nosniff"),
+        (b"x-frame-options", b"DENY"),
+        (b"x-xss-protection", b"1; mode=block"),
+        (b"referrer-policy", b"strict-origin-when-cross-origin"),
+    ]
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                # Keep any value the response already set, e.g. a framing policy
+                present = {name.lower() for name, _ in headers}
+                headers.extend(header for header in self.headers if header[0] not in present)
+                message["headers"] = headers
+            await send(message)
+        
+        await self.app(scope, receive, send_with_headers)
@@ -1,11 +1,119 @@
+import hashlib
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, DateTime, func
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import Column, String, Text, DateTime, BigInteger, Integer, LargeBinary, ForeignKey, Index, CheckConstraint, FetchedValue, bindparam, event, func, inspect, select, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, TSVECTOR, insert as pg_insert
+from sqlalchemy.orm import Session, column_property, deferred, validates
 from .database import Base
+from .blob_storage import StoredBody, body_codec
+
+# Text search configuration used for the search_vector column and queries
+SEARCH_CONFIG = "english"
+
+def hash_content(content: str) -> str:
+    """SHA-256 hex digest of prompt content, used as its strong ETag"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class PromptBlobDictionary(Base):
+    """Trained zstd dictionary; ``id`` is also the dictionary id in its frames"""
+    __tablename__ = "prompt_blob_dictionaries"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+
+class PromptBlob(Base):
+    """Prompt body stored once per distinct content, keyed by its SHA-256"""
+    __tablename__ = "prompt_blobs"
+    __table_args__ = (
+        CheckConstraint("num_nonnulls(content, compressed) = 1", name="ck_prompt_blobs_one_body"),
+    )
+    
+    content_hash = Column(String(64), primary_key=True)
+    # Exactly one of content and compressed (a zstd frame) holds the body
+    content = Column(Text, nullable=True)
+    compressed = deferred(Column(LargeBinary, nullable=True))
+    dictionary_id = Column(BigInteger, ForeignKey("prompt_blob_dictionaries.id"), nullable=True)
+    # Uncompressed UTF-8 length
+    size = Column(Integer, nullable=False)
+    # Content half of prompts.search_vector; computed from the text even
+    # when the body is stored compressed
+    content_vector = deferred(Column(TSVECTOR, nullable=False))
+    # Prompts referencing this body; maintained by a trigger on prompts,
+    # which deletes the blob when the count reaches zero
+    refcount = Column(Integer, default=0, server_default="0", nullable=False)
+    
+    def __repr__(self):
+        return f"<PromptBlob(content_hash={self.content_hash}, refcount={self.refcount})>"
+
+def upsert_blobs(bodies: dict[str, str]):
+    """INSERT for blobs keyed by content hash, leaving existing blobs as they are.
+    
+    Existing rows are touched rather than skipped so they stay locked until
+    commit, and a concurrent delete of their last reference cannot remove
+    them before the new reference is written. Rows are passed as arrays to
+    ``unnest``, so the statement compiles once whatever the number of blobs.
+    """
+    columns = {
+        "content_hash": ([], String),
+        "content": ([], Text),
+        "compressed": ([], LargeBinary),
+        "dictionary_id": ([], BigInteger),
+        "size": ([], Integer),
+        # Postgres cannot read compressed bodies, so their vector is
+        # computed from this text; a trigger fills it in for text ones
+        "vector_source": ([], Text),
+    }
+    # Sorted so concurrent upserts lock rows in the same order
+    for content_hash in sorted(bodies):
+        encoded = body_codec.encode(bodies[content_hash])
+        for name, value in (
+            ("content_hash", content_hash),
+            ("content", encoded.content),
+            ("compressed", encoded.compressed),
+            ("dictionary_id", encoded.dictionary_id),
+            ("size", encoded.size),
+            ("vector_source", bodies[content_hash] if encoded.compressed is not None else None),
+        ):
+            columns[name][0].append(value)
+    rows = func.unnest(*(
+        bindparam(f"blob_{name}", values, type_=ARRAY(column_type))
+        for name, (values, column_type) in columns.items()
+    )).table_valued(*columns).render_derived(name="blob_rows")
+    stmt = pg_insert(PromptBlob).from_select(
+        ["content_hash", "content", "compressed", "dictionary_id", "size", "content_vector"],
+        select(
+            rows.c.content_hash,
+            rows.c.content,
+            rows.c.compressed,
+            rows.c.dictionary_id,
+            rows.c.size,
+            func.to_tsvector(SEARCH_CONFIG, rows.c.vector_source),
+        ),
+        include_defaults=False
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[PromptBlob.content_hash],
+        set_={"refcount": PromptBlob.refcount}
+    )
 
 class Prompt(Base):
     __tablename__ = "prompts"
+    __table_args__ = (
+        # Keyset pagination for the admin dashboard
+        Index("ix_prompts_created_at_id", "created_at", "id"),
+        Index("ix_prompts_updated_at_id", "updated_at", "id"),
+        # Full-text search
+        Index("ix_prompts_search_vector", "search_vector", postgresql_using="gin"),
+        # Change feed
+        Index("ix_prompts_change_seq", "change_seq", unique=True),
+        # Foreign key checks when a blob loses its last reference
+        Index("ix_prompts_content_hash", "content_hash"),
+    )
     
     id = Column(
         UUID(as_uuid=True), 
@@ -13,8 +121,35 @@ class Prompt(Base):
         default=uuid.uuid4,
         nullable=False
     )
-    content = Column(Text, nullable=False)
+    content_hash = Column(
+        String(64),
+        ForeignKey("prompt_blobs.content_hash", name="fk_prompts_content_hash"),
+        nullable=False
+    )
+    # Body from prompt_blobs, decompressed on load. Assigning it sets
+    # content_hash, and the blob is written on flush; the in-memory value is
+    # kept across flushes.
+    content = column_property(
+        select(type_coerce(
+            func.coalesce(PromptBlob.compressed, func.convert_to(PromptBlob.content, "UTF8")),
+            StoredBody()
+        ))
+        .where(PromptBlob.content_hash == content_hash)
+        .correlate_except(PromptBlob)
+        .scalar_subquery(),
+        expire_on_flush=False
+    )
+    # Uncompressed body size, without loading the body
+    content_size = column_property(
+        select(PromptBlob.size)
+        .where(PromptBlob.content_hash == content_hash)
+        .correlate_except(PromptBlob)
+        .scalar_subquery(),
+        deferred=True
+    )
     description = Column(String(255), nullable=True)
+    # Current version number; every version is kept in prompt_versions
+    version = Column(Integer, default=1, server_default="1", nullable=False)
     created_at = Column(
         DateTime(timezone=True), 
         server_default=func.now(),
@@ -26,6 +161,93 @@ class Prompt(Base):
         onupdate=func.now(),
         nullable=False
     )
+    # Drawn from prompt_change_seq by a trigger on every insert and update
+    change_seq = Column(
+        BigInteger,
+        server_default=FetchedValue(),
+        server_onupdate=FetchedValue(),
+        nullable=False
+    )
+    # Weighted description (A) and content (B) vector, maintained by a
+    # trigger on every write; deferred so it is never loaded
+    search_vector = deferred(Column(TSVECTOR))
+    
+    @validates("content")
+    def _update_content_hash(self, key, content):
+        """Keep content_hash in step with content"""
+        self.content_hash = hash_content(content)
+        return content
+    
+    def __repr__(self):
+        return f"<Prompt(id={self.id}, description='{self.description}')>"
+
+@event.listens_for(Session, "before_flush")
+def _store_prompt_blobs(session, flush_context, instances):
+    """Write the blobs of new and edited prompts before their rows"""
+    bodies = {}
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Prompt) and inspect(obj).attrs.content.history.added:
+            bodies[obj.content_hash] = obj.content
+    if bodies:
+        session.execute(upsert_blobs(bodies))
+
+class PromptVersion(Base):
+    """One version of a prompt, stored whole or as a delta against a snapshot"""
+    __tablename__ = "prompt_versions"
+    
+    prompt_id = Column(
+        UUID(as_uuid=True),
+        ForeignKey("prompts.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    version = Column(Integer, primary_key=True)
+    # Version of the snapshot ``data`` is a delta against; None for snapshots
+    base_version = Column(Integer, nullable=True)
+    # Full content for snapshots, JSON line delta otherwise
+    data = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    description = Column(String(255), nullable=True)
+    created_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    def __repr__(self):
+        return f"<PromptVersion(prompt_id={self.prompt_id}, version={self.version})>"
+
+class PromptTombstone(Base):
+    """Marker left by a trigger when a prompt is deleted, for the change feed"""
+    __tablename__ = "prompt_tombstones"
+    __table_args__ = (
+        Index("ix_prompt_tombstones_change_seq", "change_seq", unique=True),
+    )
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False
+    )
+    
+    def __repr__(self):
+        return f"<PromptTombstone(id={self.id}, change_seq={self.change_seq})>"
+
+class PromptTombstoneHorizon(Base):
+    """Single row recording the newest change_seq whose tombstone was pruned.
+    
+    Change feed cursors before it may have missed deletions, so clients
+    holding one must resync.
+    """
+    __tablename__ = "prompt_tombstone_horizon"
+    __table_args__ = (
+        CheckConstraint("id = 1", name="ck_prompt_tombstone_horizon_single_row"),
+    )
+    
+    id = Column(Integer, primary_key=True, default=1)
+    pruned_through = Column(BigInteger, nullable=False, server_default="0")
+    pruned_at = Column(DateTime(timezone=True), nullable=True)
     
     def __repr__(self):
-        return f"<Prompt(id={self.id}, description='{self.description}')>" 
\ No newline at end of file
+        return f"<PromptTombstoneHorizon(pruned_through={self.pruned_through})>"
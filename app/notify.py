@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Awaitable, Callable, Optional
+
+import asyncpg
+
+from .database import ASYNCPG_DSN
+from .cache import prompt_cache
+from .rendering import template_cache
+
+logger = logging.getLogger(__name__)
+
+# Channel the prompts table trigger notifies on every insert/update/delete
+PROMPT_CHANNEL = "prompt_changes"
+
+# Listener settings from environment variables
+PROMPT_NOTIFY_ENABLED = os.getenv("PROMPT_NOTIFY_ENABLED", "true").lower() == "true"
+PROMPT_RESYNC_SECONDS = float(os.getenv("PROMPT_RESYNC_SECONDS", "60"))
+PROMPT_RECONNECT_MAX_SECONDS = float(os.getenv("PROMPT_RECONNECT_MAX_SECONDS", "30"))
+
+ChangeCallback = Callable[[str, uuid.UUID, Optional[int]], None]
+ResyncCallback = Callable[[asyncpg.Connection], Awaitable[None]]
+
+
+class PromptChangeListener:
+    """Background LISTEN on the prompt change channel.
+
+    Change callbacks receive ``(op, prompt_id, seq)`` for every committed
+    write on any worker, where ``op`` is ``insert``, ``update`` or ``delete``
+    and ``seq`` is the write's change_seq. Resync
+    callbacks get the listener connection after every (re)connect and then
+    every ``resync_interval`` seconds, to repair local state in case a
+    notification was missed.
+    """
+
+    def __init__(self, dsn: str, resync_interval: float, reconnect_max: float):
+        self.dsn = dsn
+        self.resync_interval = resync_interval
+        self.reconnect_max = reconnect_max
+        self._change_callbacks: list[ChangeCallback] = []
+        self._resync_callbacks: list[ResyncCallback] = []
+        self._task = None
+        self._backoff = 1.0
+        self.connected = False
+        self.notifications = 0
+        self.resyncs = 0
+        self.reconnects = 0
+
+    def on_change(self, callback: ChangeCallback) -> ChangeCallback:
+        """Register a callback for prompt change notifications"""
+        self._change_callbacks.append(callback)
+        return callback
+
+    def on_resync(self, callback: ResyncCallback) -> ResyncCallback:
+        """Register a coroutine run on every full resync"""
+        self._resync_callbacks.append(callback)
+        return callback
+
+    def start(self) -> None:
+        """Start listening in a background task"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and close its connection"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "connected": self.connected,
+            "notifications": self.notifications,
+            "resyncs": self.resyncs,
+            "reconnects": self.reconnects,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Prompt change listener disconnected: {e}")
+            self.reconnects += 1
+            await asyncio.sleep(self._backoff)
+            self._backoff = min(self._backoff * 2, self.reconnect_max)
+
+    async def _listen(self) -> None:
+        conn = await asyncpg.connect(
+            self.dsn,
+            server_settings={"application_name": "prompt-cms-listener"}
+        )
+        lost = asyncio.Event()
+        conn.add_termination_listener(lambda _conn: lost.set())
+        try:
+            await conn.add_listener(PROMPT_CHANNEL, self._handle_notification)
+            self.connected = True
+            self._backoff = 1.0
+            logger.info(f"Listening for prompt changes on '{PROMPT_CHANNEL}'")
+            
+            # Anything may have changed while we were not listening
+            await self._resync(conn)
+            while True:
+                try:
+                    await asyncio.wait_for(lost.wait(), timeout=self.resync_interval)
+                except asyncio.TimeoutError:
+                    await self._resync(conn)
+                else:
+                    raise ConnectionError("Listener connection terminated")
+        finally:
+            self.connected = False
+            if not conn.is_closed():
+                await conn.close(timeout=5)
+
+    async def _resync(self, conn: asyncpg.Connection) -> None:
+        for callback in self._resync_callbacks:
+            await callback(conn)
+        self.resyncs += 1
+
+    def _handle_notification(self, conn, pid, channel, payload) -> None:
+        self.notifications += 1
+        try:
+            change = json.loads(payload)
+            op = change["op"]
+            prompt_id = uuid.UUID(change["id"])
+            seq = change.get("seq")
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed prompt notification: {payload!r}")
+            return
+        for callback in self._change_callbacks:
+            try:
+                callback(op, prompt_id, seq)
+            except Exception as e:
+                logger.error(f"Prompt change callback failed: {e}")
+
+
+prompt_listener = PromptChangeListener(
+    dsn=ASYNCPG_DSN,
+    resync_interval=PROMPT_RESYNC_SECONDS,
+    reconnect_max=PROMPT_RECONNECT_MAX_SECONDS,
+)
+
+
+@prompt_listener.on_change
+def _invalidate_cached_prompt(op: str, prompt_id: uuid.UUID, seq: Optional[int]) -> None:
+    prompt_cache.invalidate(prompt_id)
+    template_cache.invalidate(prompt_id)
+
+
+@prompt_listener.on_resync
+async def _resync_prompt_cache(conn: asyncpg.Connection) -> None:
+    """Drop cached prompts that changed or disappeared since they were cached"""
+    cached = prompt_cache.versions()
+    if not cached:
+        return
+    rows = await conn.fetch(
+        "SELECT id, content_hash, updated_at FROM prompts WHERE id = ANY($1::uuid[])",
+        list(cached)
+    )
+    current = {row["id"]: (row["content_hash"], row["updated_at"]) for row in rows}
+    for prompt_id, version in cached.items():
+        if current.get(prompt_id) != version:
+            prompt_cache.invalidate(prompt_id)
@@ -1,31 +1,416 @@
+import os
 import uuid
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
-from .database import get_db
-from .models import Prompt
+from datetime import datetime, timezone
+from typing import Any, Optional
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from .replicas import replica_router
+from .snapshot import SnapshotFallback, snapshot_store
+from .storage import requires_postgres, store
+from .cache import prompt_cache, CachedPrompt
+from .compression import COMPRESSION_MIN_BYTES, negotiate_encoding, variant_cache
+from .changes import CHANGES_PAGE_SIZE, CursorExpired, list_changes, changes_response
+from .events import event_stream_response
+from .rendering import RENDER_MAX_VARIABLE_SETS, RenderError, template_cache
+from .streaming import STREAM_CHUNK_BYTES, UNSATISFIABLE, content_range, iter_utf8, parse_range, utf8_length
+
+# Maximum number of ids accepted by one batch request
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", "100"))
 
 router = APIRouter()
 
-@router.get("/prompt/{prompt_id}")
-def get_prompt(
+class BatchGetRequest(BaseModel):
+    ids: list[str] = Field(..., max_length=BATCH_GET_MAX_IDS)
+
+class BatchGetResponse(BaseModel):
+    prompts: dict[str, str]
+    missing: list[str]
+
+class RenderRequest(BaseModel):
+    variables: Optional[dict[str, Any]] = None
+    variable_sets: Optional[list[dict[str, Any]]] = Field(None, max_length=RENDER_MAX_VARIABLE_SETS)
+
+class RenderResult(BaseModel):
+    content: Optional[str] = None
+    error: Optional[str] = None
+
+class RenderResponse(BaseModel):
+    id: str
+    content_hash: str
+    content: Optional[str] = None
+    results: Optional[list[RenderResult]] = None
+
+def _etag(content_hash: str, encoding: Optional[str] = None) -> str:
+    """Strong entity tag for a content hash, distinct per content-coding"""
+    if encoding:
+        return f'"{content_hash}-{encoding}"'
+    return f'"{content_hash}"'
+
+def _negotiate(request: Request, size: int) -> Optional[str]:
+    """Content-coding for a body of ``size`` bytes, or None for identity"""
+    if size < COMPRESSION_MIN_BYTES:
+        return None
+    return negotiate_encoding(request.headers.get("accept-encoding"))
+
+def _validator_headers(content_hash: str, updated_at: datetime, encoding: Optional[str]) -> dict:
+    """ETag/Last-Modified headers; clients must revalidate before reuse"""
+    return {
+        "ETag": _etag(content_hash, encoding),
+        "Last-Modified": format_datetime(updated_at.astimezone(timezone.utc), usegmt=True),
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+def _parse_ids(prompt_ids: list[str]) -> list[uuid.UUID]:
+    """Parse ``id`` query parameters; raises 400 on a malformed id"""
+    try:
+        return [uuid.UUID(prompt_id) for prompt_id in prompt_ids]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid prompt id")
+
+def _has_validators(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+def _is_not_modified(request: Request, content_hash: str, updated_at: datetime) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since (RFC 9110 section 13.2.2)"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # If-None-Match uses the weak comparison function; any content-coding
+        # of the same content matches
+        for tag in if_none_match.split(","):
+            opaque = tag.strip().removeprefix("W/").strip('"')
+            if opaque.partition("-")[0] == content_hash:
+                return True
+        return False
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have one-second resolution
+        return updated_at.replace(microsecond=0) <= since
+    return False
+
+@router.api_route("/prompt/{prompt_id}", methods=["GET", "HEAD"])
+async def get_prompt(
     prompt_id: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    version: Optional[int] = Query(None, ge=1)
 ):
-    """Get raw markdown content by UUID"""
+    """Get raw markdown content by UUID, optionally at an earlier version.
+    
+    Supports HEAD, and single byte ranges (206) guarded by If-Range.
+    """
     try:
         # Parse UUID
         prompt_uuid = uuid.UUID(prompt_id)
     except ValueError:
         raise HTTPException(status_code=404, detail="Prompt not found")
     
-    # Query database
-    prompt = db.query(Prompt).filter(Prompt.id == prompt_uuid).first()
+    if version is not None:
+        # Snapshots only hold current versions
+        cached = await _load_prompt_version(prompt_uuid, version)
+    else:
+        cached = await _current_prompt(prompt_uuid, request)
+        if isinstance(cached, Response):
+            return cached
+    
+    return await _prompt_response(request, cached, immutable=version is not None)
+
+async def _current_prompt(prompt_uuid: uuid.UUID, request: Optional[Request] = None):
+    """Current prompt from the snapshot or cache, loading it on a miss.
+    
+    Returns a 304 response instead when ``request`` carries validators
+    that match; raises 404 if the prompt does not exist.
+    """
+    if snapshot_store.exclusive:
+        cached = snapshot_store.get(prompt_uuid)
+        if cached is None:
+            raise HTTPException(status_code=404, detail="Prompt not found")
+        return cached
+    
+    cached = prompt_cache.get(prompt_uuid)
+    if cached is None:
+        try:
+            cached = await snapshot_store.guard(_load_prompt(request, prompt_uuid))
+        except SnapshotFallback:
+            cached = snapshot_store.get(prompt_uuid)
+            if cached is None:
+                raise HTTPException(status_code=404, detail="Prompt not found")
+    return cached
+
+async def _prompt_response(request: Request, cached: CachedPrompt, immutable: bool) -> Response:
+    """Full, partial (206) or empty (304, 416, HEAD) response for a prompt.
+    
+    Large bodies are streamed in STREAM_CHUNK_BYTES chunks, so concurrent
+    requests do not each hold an encoded copy of the content.
+    """
+    size = utf8_length(cached.content)
+    byte_range = None
+    if "range" in request.headers and _if_range_matches(request, cached):
+        byte_range = parse_range(request.headers["range"], size)
+    # Ranges address the identity representation
+    encoding = None if byte_range is not None else _negotiate(request, size)
+    headers = _validator_headers(cached.content_hash, cached.updated_at, encoding)
+    headers["Accept-Ranges"] = "bytes"
+    if immutable:
+        # A stored version never changes
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    if _is_not_modified(request, cached.content_hash, cached.updated_at):
+        return Response(status_code=304, headers=headers)
+    
+    if byte_range == UNSATISFIABLE:
+        headers["Content-Range"] = content_range(None, size)
+        return Response(status_code=416, headers=headers)
+    
+    is_head = request.method == "HEAD"
+    if encoding:
+        # Compressed once per content version, then served from memory
+        body = await variant_cache.get(cached.content_hash, encoding, cached.content)
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(body))
+        return Response(
+            content=b"" if is_head else body,
+            media_type="text/plain; charset=utf-8",
+            headers=headers
+        )
+    
+    status_code = 200
+    start, end = 0, size
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = content_range(byte_range, size)
+    headers["Content-Length"] = str(end - start)
+    
+    if is_head or end - start <= STREAM_CHUNK_BYTES:
+        body = b""
+        if not is_head:
+            body = b"".join([chunk async for chunk in iter_utf8(cached.content, start, end)])
+        # Return raw markdown content
+        return Response(
+            content=body,
+            status_code=status_code,
+            media_type="text/plain; charset=utf-8",
+            headers=headers
+        )
+    return StreamingResponse(
+        iter_utf8(cached.content, start, end),
+        status_code=status_code,
+        media_type="text/plain; charset=utf-8",
+        headers=headers
+    )
+
+def _if_range_matches(request: Request, cached: CachedPrompt) -> bool:
+    """Evaluate If-Range (RFC 9110 section 13.1.5); True when absent"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        # Strong comparison against the identity representation
+        return if_range == _etag(cached.content_hash)
+    try:
+        since = parsedate_to_datetime(if_range)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return cached.updated_at.replace(microsecond=0) == since
+
+async def _load_prompt(request: Optional[Request], prompt_uuid: uuid.UUID):
+    """Current prompt as a cache entry, or a 304 if the client's copy is current"""
+    if request is not None and _has_validators(request):
+        # Revalidate without loading the content
+        meta = await store.get_meta(prompt_uuid)
+        
+        if not meta:
+            raise HTTPException(status_code=404, detail="Prompt not found")
+        
+        if _is_not_modified(request, meta.content_hash, meta.updated_at):
+            encoding = _negotiate(request, meta.size)
+            return Response(
+                status_code=304,
+                headers=_validator_headers(meta.content_hash, meta.updated_at, encoding)
+            )
+    
+    prompt = await store.get(prompt_uuid)
     
     if not prompt:
         raise HTTPException(status_code=404, detail="Prompt not found")
     
-    # Return raw markdown content
-    return Response(
+    cached = CachedPrompt(
         content=prompt.content,
-        media_type="text/plain; charset=utf-8"
-    ) 
\ No newline at end of file
+        content_hash=prompt.content_hash,
+        updated_at=prompt.updated_at
+    )
+    prompt_cache.fill(prompt_uuid, cached)
+    return cached
+
+async def _load_prompt_version(prompt_uuid: uuid.UUID, version: int) -> CachedPrompt:
+    """A stored version shaped like a cache entry; raises 404 if it does not exist"""
+    loaded = await store.load_version(prompt_uuid, version)
+    if loaded is None:
+        raise HTTPException(status_code=404, detail="Prompt version not found")
+    stored, content = loaded
+    return CachedPrompt(
+        content=content,
+        content_hash=stored.content_hash,
+        updated_at=stored.created_at
+    )
+
+@router.post("/prompts:batchGet", response_model=BatchGetResponse)
+async def batch_get_prompts(batch: BatchGetRequest):
+    """Get raw markdown content for many UUIDs in one request.
+    
+    Accepts at most BATCH_GET_MAX_IDS ids. Unknown or malformed ids are
+    listed in ``missing``; cached prompts are served without a query and
+    the rest are resolved with a single ``IN`` query.
+    """
+    prompts = {}
+    missing = []
+    # UUID -> every spelling of it in the request, so each is answered
+    spellings: dict[uuid.UUID, list[str]] = {}
+    
+    for prompt_id in dict.fromkeys(batch.ids):
+        try:
+            prompt_uuid = uuid.UUID(prompt_id)
+        except ValueError:
+            missing.append(prompt_id)
+            continue
+        spellings.setdefault(prompt_uuid, []).append(prompt_id)
+    
+    to_fetch = []
+    found = {}
+    for prompt_uuid in spellings:
+        if snapshot_store.exclusive:
+            cached = snapshot_store.get(prompt_uuid)
+        else:
+            cached = prompt_cache.get(prompt_uuid)
+        if cached is not None:
+            found[prompt_uuid] = cached
+        elif not snapshot_store.exclusive:
+            to_fetch.append(prompt_uuid)
+    
+    if to_fetch:
+        try:
+            found.update(await snapshot_store.guard(_fetch_prompts(to_fetch)))
+        except SnapshotFallback:
+            for prompt_uuid in to_fetch:
+                cached = snapshot_store.get(prompt_uuid)
+                if cached is not None:
+                    found[prompt_uuid] = cached
+    
+    for prompt_uuid, prompt_ids in spellings.items():
+        cached = found.get(prompt_uuid)
+        for prompt_id in prompt_ids:
+            if cached is None:
+                missing.append(prompt_id)
+            else:
+                prompts[prompt_id] = cached.content
+    
+    return BatchGetResponse(prompts=prompts, missing=missing)
+
+async def _fetch_prompts(prompt_ids) -> dict[uuid.UUID, CachedPrompt]:
+    """Load and cache prompts by id with one ``IN`` query"""
+    found = {}
+    for prompt in await store.get_many(list(prompt_ids)):
+        found[prompt.id] = CachedPrompt(
+            content=prompt.content,
+            content_hash=prompt.content_hash,
+            updated_at=prompt.updated_at
+        )
+        prompt_cache.fill(prompt.id, found[prompt.id])
+    return found
+
+@router.post("/prompt/{prompt_id}/render", response_model=RenderResponse, response_model_exclude_none=True)
+async def render_prompt(
+    prompt_id: str,
+    render: RenderRequest,
+    version: Optional[int] = Query(None, ge=1)
+):
+    """Render a prompt as a sandboxed Jinja2 template.
+    
+    Send ``variables`` for one rendering (422 if it fails), or up to
+    RENDER_MAX_VARIABLE_SETS ``variable_sets`` to render the prompt once
+    per set, each with its own ``content`` or ``error``. Compiled
+    templates are cached per content hash.
+    """
+    if render.variables is not None and render.variable_sets is not None:
+        raise HTTPException(status_code=422, detail="Send either variables or variable_sets, not both")
+    try:
+        prompt_uuid = uuid.UUID(prompt_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    
+    if version is not None:
+        cached = await _load_prompt_version(prompt_uuid, version)
+    else:
+        cached = await _current_prompt(prompt_uuid)
+    
+    variable_sets = render.variable_sets if render.variable_sets is not None else [render.variables or {}]
+    try:
+        rendered = await template_cache.render_async(
+            prompt_uuid, cached.content_hash, cached.content, variable_sets
+        )
+    except RenderError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    if render.variable_sets is None:
+        if isinstance(rendered[0], RenderError):
+            raise HTTPException(status_code=422, detail=str(rendered[0]))
+        return RenderResponse(id=str(prompt_uuid), content_hash=cached.content_hash, content=rendered[0])
+    return RenderResponse(
+        id=str(prompt_uuid),
+        content_hash=cached.content_hash,
+        results=[
+            RenderResult(error=str(result)) if isinstance(result, RenderError) else RenderResult(content=result)
+            for result in rendered
+        ]
+    )
+
+@router.get("/prompts/changes", dependencies=[requires_postgres("The change feed")])
+async def prompt_changes(
+    id: list[str] = Query(..., max_length=BATCH_GET_MAX_IDS),
+    since: int = Query(0, ge=0),
+    limit: int = Query(CHANGES_PAGE_SIZE, ge=1, le=CHANGES_PAGE_SIZE)
+):
+    """Changes to the given prompts since a cursor.
+    
+    Pass each prompt id as a repeated ``id`` parameter (at most
+    BATCH_GET_MAX_IDS) and the ``cursor`` from the previous response as
+    ``since``; start from 0. Deleted prompts are reported with op "delete".
+    Clients fetch new content for upserts with ``/prompts:batchGet``.
+    
+    Replicas apply commits in change_seq order, so a lagging replica
+    returns an older cursor but never skips a change. A cursor older than
+    the retained deletions gets 410 Gone; the client resyncs from 0.
+    """
+    prompt_ids = _parse_ids(id)
+    async with replica_router.session(prompt_ids) as db:
+        try:
+            rows = await list_changes(db, since, limit + 1, prompt_ids)
+        except CursorExpired as e:
+            raise HTTPException(status_code=410, detail=str(e))
+    return changes_response(rows, since, limit)
+
+@router.get("/prompts/events", dependencies=[requires_postgres("Prompt events")])
+async def prompt_events(
+    id: list[str] = Query(..., max_length=BATCH_GET_MAX_IDS),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-sent events for creations, updates and deletions of the given prompts.
+    
+    Each event carries the change feed sequence number as its event id, so
+    a reconnecting client's ``Last-Event-ID`` replays whatever it missed.
+    An ``overflow`` event means the client fell behind and should reconnect.
+    """
+    return event_stream_response(_parse_ids(id), last_event_id)
@@ -0,0 +1,176 @@
+import operator
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional, Union
+
+from jinja2 import StrictUndefined, TemplateError
+from jinja2.sandbox import ImmutableSandboxedEnvironment, SecurityError
+from starlette.concurrency import run_in_threadpool
+
+# Rendering limits from environment variables
+RENDER_CACHE_MAX_ENTRIES = int(os.getenv("RENDER_CACHE_MAX_ENTRIES", "512"))
+RENDER_MAX_VARIABLE_SETS = int(os.getenv("RENDER_MAX_VARIABLE_SETS", "100"))
+RENDER_MAX_OUTPUT_CHARS = int(os.getenv("RENDER_MAX_OUTPUT_CHARS", str(1024 * 1024)))
+
+
+class RenderError(Exception):
+    """A prompt could not be compiled or rendered with the given variables"""
+
+
+class PromptEnvironment(ImmutableSandboxedEnvironment):
+    """Sandboxed Jinja2 environment for Markdown prompts.
+
+    Templates cannot reach unsafe attributes or mutate the variables they
+    are given, undefined variables are errors rather than empty strings,
+    and ``*`` / ``**`` may not build values larger than the output limit.
+    """
+
+    intercepted_binops = frozenset(["*", "**"])
+
+    def __init__(self, max_output: int):
+        super().__init__(undefined=StrictUndefined, autoescape=False, keep_trailing_newline=True)
+        self.max_output = max_output
+
+    def call_binop(self, context, operator_name: str, left, right):
+        if operator_name == "**":
+            if isinstance(right, (int, float)) and right > 64 and abs(left) > 1:
+                raise SecurityError("Exponent too large")
+            return operator.pow(left, right)
+        for sequence, count in ((left, right), (right, left)):
+            if isinstance(sequence, (str, list, tuple)) and isinstance(count, int):
+                if len(sequence) * count > self.max_output:
+                    raise SecurityError("Repeated value too large")
+        return operator.mul(left, right)
+
+
+class TemplateCache:
+    """LRU of compiled prompt templates keyed by content hash.
+
+    A prompt's template is parsed once per content version and shared by
+    every prompt with the same body; templates that fail to compile are
+    cached too, so they are not re-parsed on every request.
+    """
+
+    def __init__(self, max_entries: int, max_output: int):
+        self.max_entries = max_entries
+        self.environment = PromptEnvironment(max_output)
+        self._templates: "OrderedDict[str, Any]" = OrderedDict()
+        # prompt id -> content hash of its last compiled template; bounded
+        # by the number of prompts, and a stale hash only costs a recompile
+        self._prompts: dict[uuid.UUID, str] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.renders = 0
+        self.errors = 0
+
+    def template(self, prompt_id: uuid.UUID, content_hash: str, content: str):
+        """Compiled template for ``content`` (blocking); raises RenderError on a syntax error"""
+        with self._lock:
+            compiled = self._templates.get(content_hash)
+            if compiled is not None:
+                self._templates.move_to_end(content_hash)
+                self._prompts[prompt_id] = content_hash
+                self.hits += 1
+            else:
+                self.misses += 1
+        if compiled is None:
+            try:
+                compiled = self.environment.from_string(content)
+            except TemplateError as e:
+                compiled = RenderError(f"Prompt is not a valid template: {_describe(e)}")
+            self._put(prompt_id, content_hash, compiled)
+        if isinstance(compiled, RenderError):
+            raise compiled
+        return compiled
+
+    def render(
+        self,
+        prompt_id: uuid.UUID,
+        content_hash: str,
+        content: str,
+        variable_sets: list[dict]
+    ) -> list[Union[str, RenderError]]:
+        """Render ``content`` once per variable set (blocking).
+
+        Raises RenderError if the template does not compile; a set that
+        fails to render yields a RenderError in its place.
+        """
+        template = self.template(prompt_id, content_hash, content)
+        results = []
+        for variables in variable_sets:
+            try:
+                rendered = template.render(variables)
+                if len(rendered) > self.environment.max_output:
+                    raise RenderError(f"Rendered prompt is longer than {self.environment.max_output} characters")
+                results.append(rendered)
+            except (TemplateError, RenderError) as e:
+                self.errors += 1
+                results.append(e if isinstance(e, RenderError) else RenderError(_describe(e)))
+            except Exception as e:
+                # Filters applied to the caller's values, e.g. int("abc")
+                self.errors += 1
+                results.append(RenderError(f"{type(e).__name__}: {e}"))
+        self.renders += len(variable_sets)
+        return results
+
+    async def render_async(
+        self,
+        prompt_id: uuid.UUID,
+        content_hash: str,
+        content: str,
+        variable_sets: list[dict]
+    ) -> list[Union[str, RenderError]]:
+        """``render`` in a worker thread, so large prompts do not block the event loop"""
+        return await run_in_threadpool(self.render, prompt_id, content_hash, content, variable_sets)
+
+    def invalidate(self, prompt_id: uuid.UUID) -> None:
+        """Drop the template last compiled for a prompt, e.g. after it is updated"""
+        with self._lock:
+            content_hash = self._prompts.pop(prompt_id, None)
+            if content_hash is not None and self._templates.pop(content_hash, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._templates)
+            self._templates.clear()
+            self._prompts.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "templates": len(self._templates),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "renders": self.renders,
+                "errors": self.errors,
+            }
+
+    def _put(self, prompt_id: uuid.UUID, content_hash: str, compiled) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._templates[content_hash] = compiled
+            self._templates.move_to_end(content_hash)
+            self._prompts[prompt_id] = content_hash
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+                self.evictions += 1
+
+
+def _describe(error: TemplateError) -> str:
+    line = getattr(error, "lineno", None)
+    message = error.message or type(error).__name__
+    return f"line {line}: {message}" if line else message
+
+
+# Shared compiled-template cache used by the render endpoint
+template_cache = TemplateCache(max_entries=RENDER_CACHE_MAX_ENTRIES, max_output=RENDER_MAX_OUTPUT_CHARS)
@@ -0,0 +1,246 @@
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from .database import AsyncSessionLocal, SQL_ECHO, _with_driver
+from .db_profiling import InstrumentedAsyncQueuePool, install_query_profiling
+from .notify import prompt_listener
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated read replica URLs; empty sends every read to the primary
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+# Replicas further behind than this are taken out of rotation, and prompts
+# written within this many seconds are read from the primary
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEALTH_CHECK_SECONDS = float(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "5"))
+REPLICA_CONNECT_TIMEOUT_SECONDS = float(os.getenv("REPLICA_CONNECT_TIMEOUT_SECONDS", "2"))
+
+# Seconds of WAL the replica has yet to replay; 0 when it has replayed
+# everything it received, or when it is not a standby at all
+REPLICA_LAG_SQL = text(
+    "SELECT CASE"
+    " WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())"
+    " END"
+)
+
+
+class Replica:
+    """One read replica, its connection pool and last health check result"""
+
+    def __init__(self, url: str):
+        self.name = make_url(url).render_as_string(hide_password=True)
+        self.engine: AsyncEngine = create_async_engine(
+            _with_driver(url, "asyncpg"),
+            echo=SQL_ECHO,
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=10,
+            max_overflow=20,
+            pool_pre_ping=True,
+            connect_args={"timeout": REPLICA_CONNECT_TIMEOUT_SECONDS},
+        )
+        install_query_profiling(self.engine.sync_engine)
+        # Out of rotation until the first health check passes
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "error": self.error,
+            "checked_seconds_ago": (
+                round(time.monotonic() - self.checked_at, 1) if self.checked_at else None
+            ),
+        }
+
+
+class ReplicaRouter:
+    """Sends public reads to healthy replicas, and everything else to the primary.
+
+    Replicas are health-checked every ``check_interval`` seconds and leave
+    the rotation when unreachable or more than ``max_lag`` seconds behind.
+    Prompts passed to ``note_write`` are read from the primary for the next
+    ``max_lag`` seconds, so a client never reads an older version than the
+    one it just wrote, even from another worker.
+    """
+
+    def __init__(self, urls: list[str], max_lag: float, check_interval: float):
+        self.replicas = [Replica(url) for url in urls]
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self._next = itertools.count()
+        # prompt id -> monotonic time until which it is read from the primary
+        self._recent_writes: dict[uuid.UUID, float] = {}
+        self._lock = threading.Lock()
+        self._task = None
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.failovers = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.replicas)
+
+    def note_write(self, prompt_id: uuid.UUID) -> None:
+        """Read ``prompt_id`` from the primary until replicas have caught up"""
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._recent_writes[prompt_id] = now + self.max_lag
+            # Cheap amortized cleanup; the dict only holds a few seconds of writes
+            if len(self._recent_writes) > 1024:
+                self._recent_writes = {
+                    key: until for key, until in self._recent_writes.items() if until > now
+                }
+
+    def written_recently(self, prompt_ids: Iterable[uuid.UUID]) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            return any(self._recent_writes.get(prompt_id, 0) > now for prompt_id in prompt_ids)
+
+    def pick(self) -> Optional[Replica]:
+        """Next healthy replica in round-robin order, or None"""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return None
+        return healthy[next(self._next) % len(healthy)]
+
+    @asynccontextmanager
+    async def session(self, prompt_ids: Iterable[uuid.UUID] = ()):
+        """Read-only session on a healthy replica, or on the primary.
+
+        The primary is used when no replica is healthy, when connecting to
+        the chosen replica fails, or when any of ``prompt_ids`` was written
+        recently.
+        """
+        replica = None
+        if self.enabled and not self.written_recently(prompt_ids):
+            replica = self.pick()
+
+        if replica is not None:
+            db = AsyncSession(bind=replica.engine, autoflush=False, expire_on_commit=False)
+            try:
+                # Connect up front so an unreachable replica fails over here
+                await db.connection()
+            except Exception as e:
+                await db.close()
+                self._mark_down(replica, e)
+                self.failovers += 1
+            else:
+                self.replica_reads += 1
+                try:
+                    async with db:
+                        yield db
+                except DBAPIError as e:
+                    # Lost mid-request; later reads fail over until it recovers
+                    if e.connection_invalidated:
+                        self._mark_down(replica, e)
+                    raise
+                return
+
+        self.primary_reads += 1
+        async with AsyncSessionLocal() as db:
+            yield db
+
+    def start(self) -> None:
+        """Start health-checking replicas in a background task"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop health checks and close replica connections"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    async def check(self) -> None:
+        """Health-check every replica once"""
+        await asyncio.gather(*(self._check(replica) for replica in self.replicas))
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_lag_seconds": self.max_lag,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "failovers": self.failovers,
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
+    async def _run(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.check_interval)
+
+    async def _check(self, replica: Replica) -> None:
+        try:
+            async with replica.engine.connect() as conn:
+                lag = await asyncio.wait_for(
+                    conn.scalar(REPLICA_LAG_SQL),
+                    timeout=REPLICA_CONNECT_TIMEOUT_SECONDS
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._mark_down(replica, e)
+            return
+
+        replica.checked_at = time.monotonic()
+        # NULL replay timestamp: a standby that has not replayed anything yet
+        replica.lag = float(lag) if lag is not None else None
+        if replica.lag is None or replica.lag > self.max_lag:
+            if replica.healthy:
+                logger.warning(f"Replica {replica.name} is lagging ({replica.lag}s); reading from others")
+            replica.healthy = False
+            replica.error = "lagging"
+        else:
+            if not replica.healthy:
+                logger.info(f"Replica {replica.name} is healthy (lag {replica.lag:.1f}s)")
+            replica.healthy = True
+            replica.error = None
+
+    def _mark_down(self, replica: Replica, error: Exception) -> None:
+        if replica.healthy:
+            logger.warning(f"Replica {replica.name} is unavailable: {error}")
+        replica.healthy = False
+        replica.error = str(error) or type(error).__name__
+        replica.checked_at = time.monotonic()
+
+
+# Shared router used by the public endpoints
+replica_router = ReplicaRouter(
+    urls=DATABASE_REPLICA_URLS,
+    max_lag=REPLICA_MAX_LAG_SECONDS,
+    check_interval=REPLICA_HEALTH_CHECK_SECONDS,
+)
+
+
+@prompt_listener.on_change
+def _route_written_prompt_to_primary(op: str, prompt_id: uuid.UUID, seq: Optional[int]) -> None:
+    replica_router.note_write(prompt_id)
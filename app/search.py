@@ -0,0 +1,101 @@
+import os
+import uuid
+from datetime import datetime
+from typing import NamedTuple, Optional
+from markupsafe import Markup, escape
+from sqlalchemy import select, func, bindparam, type_coerce, Text
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Prompt, PromptBlob, SEARCH_CONFIG
+from .blob_storage import StoredBody
+
+# Number of search results per page
+SEARCH_PAGE_SIZE = int(os.getenv("SEARCH_PAGE_SIZE", "20"))
+
+# ts_headline wraps matches in these control characters so snippets can be
+# HTML-escaped first and highlighted afterwards
+_START_SEL = "\x02"
+_STOP_SEL = "\x03"
+_HEADLINE_OPTIONS = f"StartSel={_START_SEL}, StopSel={_STOP_SEL}, MaxFragments=2, MaxWords=20, MinWords=5"
+
+class SearchResult(NamedTuple):
+    id: uuid.UUID
+    description: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    rank: float
+    snippet: str
+
+async def search_prompts(db: AsyncSession, q: str, limit: int, offset: int = 0) -> list[SearchResult]:
+    """Rank prompts matching a web-style query against description and content.
+
+    Matching and ranking use the GIN-indexed search_vector column; snippets
+    are only built for the rows of the requested page. Postgres cannot read
+    compressed bodies, so those are decompressed here and sent back for
+    their snippets in one extra query.
+    """
+    query = func.websearch_to_tsquery(SEARCH_CONFIG, q)
+    rank = func.ts_rank_cd(Prompt.search_vector, query)
+
+    page = (
+        select(Prompt.id, rank.label("rank"))
+        .where(Prompt.search_vector.op("@@")(query))
+        .order_by(rank.desc(), Prompt.id)
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+
+    result = await db.execute(
+        select(
+            Prompt.id,
+            Prompt.description,
+            Prompt.created_at,
+            Prompt.updated_at,
+            page.c.rank,
+            func.ts_headline(SEARCH_CONFIG, PromptBlob.content, query, _HEADLINE_OPTIONS).label("snippet"),
+            type_coerce(PromptBlob.compressed, StoredBody()).label("compressed_content"),
+        )
+        .join(page, page.c.id == Prompt.id)
+        .join(PromptBlob, PromptBlob.content_hash == Prompt.content_hash)
+        .order_by(page.c.rank.desc(), Prompt.id)
+    )
+    rows = result.all()
+
+    compressed = [row.compressed_content for row in rows if row.compressed_content is not None]
+    headlines = iter(await _headlines(db, query, compressed) if compressed else ())
+    return [
+        SearchResult(
+            id=row.id,
+            description=row.description,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+            rank=row.rank,
+            snippet=next(headlines) if row.compressed_content is not None else row.snippet,
+        )
+        for row in rows
+    ]
+
+async def _headlines(db: AsyncSession, query, documents: list[str]) -> list[str]:
+    """ts_headline snippets for documents passed in from Python, in order"""
+    docs = (
+        func.unnest(bindparam("documents", documents, type_=ARRAY(Text)))
+        .table_valued("doc", with_ordinality="n")
+        .render_derived()
+    )
+    result = await db.execute(
+        select(func.ts_headline(SEARCH_CONFIG, docs.c.doc, query, _HEADLINE_OPTIONS))
+        .order_by(docs.c.n)
+    )
+    return result.scalars().all()
+
+def plain_snippet(snippet: str) -> str:
+    """Snippet text with highlight markers removed"""
+    return snippet.replace(_START_SEL, "").replace(_STOP_SEL, "")
+
+def highlight_snippet(snippet: str) -> Markup:
+    """HTML-escaped snippet with matches wrapped in <mark>"""
+    return Markup(
+        str(escape(snippet)).replace(_START_SEL, "<mark>").replace(_STOP_SEL, "</mark>")
+    )
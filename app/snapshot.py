@@ -0,0 +1,347 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Iterable, Optional, TypeVar
+
+from sqlalchemy import select, func, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .cache import CachedPrompt
+from .database import engine
+from .models import Prompt, PromptTombstone, PromptTombstoneHorizon
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Snapshot serving settings from environment variables
+SNAPSHOT_MODE = os.getenv("SNAPSHOT_MODE", "off").lower()
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "prompts.snapshot")
+SNAPSHOT_REFRESH_SECONDS = float(os.getenv("SNAPSHOT_REFRESH_SECONDS", "60"))
+SNAPSHOT_FALLBACK_TIMEOUT_SECONDS = float(os.getenv("SNAPSHOT_FALLBACK_TIMEOUT_SECONDS", "2"))
+
+# File layout (little-endian):
+#   header   magic, prompt count, change_seq, exported_at, index offset
+#   content  UTF-8 bodies, each distinct body once
+#   index    one entry per prompt, sorted by id bytes:
+#            id, content offset, content length, updated_at (us), sha256
+MAGIC = b"PCMSNAP1"
+HEADER = struct.Struct("<8sQQdQ")
+ENTRY = struct.Struct("<16sQIq32s")
+
+# Only one worker exports at a time; the others pick up its file
+EXPORT_LOCK_SQL = text("SELECT pg_try_advisory_xact_lock(hashtext('prompt_snapshot_export'))")
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _to_micros(value: datetime) -> int:
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(value: int) -> datetime:
+    return EPOCH + timedelta(microseconds=value)
+
+
+def write_snapshot(
+    path: str,
+    rows: Iterable[tuple[uuid.UUID, str, datetime, str]],
+    change_seq: int
+) -> dict:
+    """Write ``(id, content_hash, updated_at, content)`` rows as a snapshot file.
+
+    Rows may come in any order. The file is written next to ``path`` and
+    renamed over it, so readers see either the old or the new snapshot.
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    entries = []
+    # content_hash -> (offset, length)
+    bodies: dict[str, tuple[int, int]] = {}
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(b"\0" * HEADER.size)
+            offset = HEADER.size
+            for prompt_id, content_hash, updated_at, content in rows:
+                body = bodies.get(content_hash)
+                if body is None:
+                    data = content.encode("utf-8")
+                    f.write(data)
+                    body = bodies[content_hash] = (offset, len(data))
+                    offset += len(data)
+                entries.append(ENTRY.pack(
+                    prompt_id.bytes,
+                    body[0],
+                    body[1],
+                    _to_micros(updated_at),
+                    bytes.fromhex(content_hash)
+                ))
+
+            # Entries start with the id, so byte order is id order
+            entries.sort()
+            f.writelines(entries)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, len(entries), change_seq, time.time(), offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # Make the rename itself durable
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+    return {
+        "path": path,
+        "prompts": len(entries),
+        "bodies": len(bodies),
+        "bytes": offset + len(entries) * ENTRY.size,
+        "change_seq": change_seq,
+    }
+
+
+def latest_change_seq(session: Session) -> int:
+    """Highest change_seq of any committed write, including deletions"""
+    return session.scalar(select(func.greatest(
+        select(func.coalesce(func.max(Prompt.change_seq), 0)).scalar_subquery(),
+        select(func.coalesce(func.max(PromptTombstone.change_seq), 0)).scalar_subquery(),
+        # Pruned deletions still count, so the cursor never moves backwards
+        select(func.coalesce(func.max(PromptTombstoneHorizon.pruned_through), 0)).scalar_subquery(),
+    )))
+
+
+def export_snapshot(path: str, if_changed_since: Optional[int] = None) -> Optional[dict]:
+    """Export every prompt from the database to a snapshot file.
+
+    Reads from one REPEATABLE READ transaction, so the file is a consistent
+    point-in-time copy. Returns None without writing if another process is
+    exporting, or if nothing changed since ``if_changed_since``.
+    """
+    with engine.connect().execution_options(isolation_level="REPEATABLE READ") as conn:
+        with Session(bind=conn) as session:
+            if not session.scalar(EXPORT_LOCK_SQL):
+                return None
+            change_seq = latest_change_seq(session)
+            if if_changed_since is not None and change_seq <= if_changed_since:
+                return None
+
+            rows = session.execute(
+                select(Prompt.id, Prompt.content_hash, Prompt.updated_at, Prompt.content)
+                .execution_options(yield_per=1000)
+            )
+            started = time.perf_counter()
+            result = write_snapshot(path, rows, change_seq)
+            result["seconds"] = round(time.perf_counter() - started, 3)
+            return result
+
+
+class Snapshot:
+    """Read-only view of a snapshot file through mmap.
+
+    Lookups binary-search the sorted index in place, so opening a snapshot
+    costs nothing per prompt and pages are shared between worker processes.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.path = path
+        self.file_id = (stat.st_ino, stat.st_mtime_ns)
+        magic, self.count, self.change_seq, self.exported_at, self._index = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or self._index + self.count * ENTRY.size != len(self._mm):
+            self._mm.close()
+            raise ValueError(f"Not a prompt snapshot: {path}")
+
+    @property
+    def size(self) -> int:
+        return len(self._mm)
+
+    def get(self, prompt_id: uuid.UUID) -> Optional[CachedPrompt]:
+        """The prompt as of the snapshot, or None if it was not in it"""
+        key = prompt_id.bytes
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._index + mid * ENTRY.size
+            if self._mm[start:start + 16] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count:
+            return None
+        entry_id, offset, length, updated_at, digest = ENTRY.unpack_from(self._mm, self._index + lo * ENTRY.size)
+        if entry_id != key:
+            return None
+        return CachedPrompt(
+            content=self._mm[offset:offset + length].decode("utf-8"),
+            content_hash=digest.hex(),
+            updated_at=_from_micros(updated_at)
+        )
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class SnapshotFallback(Exception):
+    """A database read failed or timed out and the snapshot should answer instead"""
+
+
+class SnapshotStore:
+    """Currently loaded snapshot, kept fresh by a background task.
+
+    ``mode`` is "off", "fallback" (serve from the snapshot when the database
+    fails or is slower than ``fallback_timeout``) or "exclusive" (serve
+    public reads of current content only from the snapshot). Every
+    ``refresh_interval`` seconds one worker re-exports the file if prompts
+    changed, and every worker reopens it once it has been replaced.
+    """
+
+    def __init__(self, mode: str, path: str, refresh_interval: float, fallback_timeout: float):
+        if mode not in ("off", "fallback", "exclusive"):
+            raise ValueError(f"Unknown SNAPSHOT_MODE: {mode!r}")
+        self.mode = mode
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.fallback_timeout = fallback_timeout
+        self.snapshot: Optional[Snapshot] = None
+        self._task = None
+        self.hits = 0
+        self.fallbacks = 0
+        self.exports = 0
+        self.reloads = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "off"
+
+    @property
+    def exclusive(self) -> bool:
+        return self.mode == "exclusive"
+
+    def get(self, prompt_id: uuid.UUID) -> Optional[CachedPrompt]:
+        """The prompt from the loaded snapshot; None if absent or none is loaded"""
+        snapshot = self.snapshot
+        if snapshot is None:
+            return None
+        prompt = snapshot.get(prompt_id)
+        if prompt is not None:
+            self.hits += 1
+        return prompt
+
+    async def guard(self, read: Awaitable[T]) -> T:
+        """Await a database read, raising SnapshotFallback if it should be served from the snapshot.
+
+        Only in fallback mode with a snapshot loaded; otherwise ``read`` is
+        awaited as is.
+        """
+        if self.mode != "fallback" or self.snapshot is None:
+            return await read
+        try:
+            return await asyncio.wait_for(read, self.fallback_timeout)
+        except (DBAPIError, OSError, asyncio.TimeoutError) as e:
+            self.fallbacks += 1
+            cause = e.orig if isinstance(e, DBAPIError) else e
+            logger.warning(f"Serving prompts from snapshot: {type(cause).__name__}: {cause}")
+            raise SnapshotFallback() from e
+
+    def load(self) -> bool:
+        """Open the snapshot file if it is new; True if one is loaded"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return self.snapshot is not None
+        current = self.snapshot
+        if current is not None and current.file_id == (stat.st_ino, stat.st_mtime_ns):
+            return True
+
+        try:
+            snapshot = Snapshot(self.path)
+        except (OSError, ValueError) as e:
+            self.errors += 1
+            logger.error(f"Failed to open prompt snapshot {self.path}: {e}")
+            return current is not None
+
+        # Requests read the mmap without awaiting, so nothing holds the old one
+        self.snapshot = snapshot
+        if current is not None:
+            current.close()
+        self.reloads += 1
+        logger.info(f"Loaded prompt snapshot {self.path} ({snapshot.count} prompts, change_seq {snapshot.change_seq})")
+        return True
+
+    async def refresh(self) -> None:
+        """Re-export the snapshot if prompts changed, then load the newest file"""
+        current = self.snapshot
+        try:
+            result = await asyncio.to_thread(
+                export_snapshot,
+                self.path,
+                current.change_seq if current is not None else None
+            )
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Prompt snapshot export failed: {e}")
+        else:
+            if result is not None:
+                self.exports += 1
+                logger.info(f"Exported prompt snapshot: {result}")
+        self.load()
+
+    def start(self) -> None:
+        """Start refreshing the snapshot in a background task"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "loaded": snapshot is not None,
+            "prompts": snapshot.count if snapshot else 0,
+            "bytes": snapshot.size if snapshot else 0,
+            "change_seq": snapshot.change_seq if snapshot else None,
+            "age_seconds": round(time.time() - snapshot.exported_at, 1) if snapshot else None,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "exports": self.exports,
+            "reloads": self.reloads,
+            "errors": self.errors,
+        }
+
+    async def _run(self) -> None:
+        while True:
+            # A snapshot loaded at startup may be old
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+
+# Shared snapshot used by the public router
+snapshot_store = SnapshotStore(
+    mode=SNAPSHOT_MODE,
+    path=SNAPSHOT_PATH,
+    refresh_interval=SNAPSHOT_REFRESH_SECONDS,
+    fallback_timeout=SNAPSHOT_FALLBACK_TIMEOUT_SECONDS,
+)
@@ -0,0 +1,53 @@
+import os
+
+from fastapi import Depends, HTTPException
+
+from .base import PromptMeta, PromptStore, PromptWrite, PromptsNotFound, StoredPrompt, StoredVersion
+
+# Where prompts are stored: postgres, sqlite or memory
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "postgres").lower()
+# Database file for the sqlite backend
+SQLITE_PATH = os.getenv("SQLITE_PATH", "prompt_cms.db")
+
+
+def create_store(backend: str = STORAGE_BACKEND) -> PromptStore:
+    """The store for a STORAGE_BACKEND name"""
+    if backend == "postgres":
+        from .postgres import PostgresStore
+        return PostgresStore()
+    if backend == "sqlite":
+        from .sqlite import SQLiteStore
+        return SQLiteStore(SQLITE_PATH)
+    if backend == "memory":
+        from .memory import MemoryStore
+        return MemoryStore()
+    raise ValueError(f"STORAGE_BACKEND must be postgres, sqlite or memory, not {backend!r}")
+
+
+def requires_postgres(feature: str):
+    """Route dependency answering 501 unless prompts are stored in Postgres"""
+    def check():
+        if not store.postgres:
+            raise HTTPException(
+                status_code=501,
+                detail=f"{feature} requires STORAGE_BACKEND=postgres"
+            )
+    return Depends(check)
+
+
+# Store used by the routers
+store = create_store()
+
+__all__ = [
+    "PromptMeta",
+    "PromptStore",
+    "PromptWrite",
+    "PromptsNotFound",
+    "StoredPrompt",
+    "StoredVersion",
+    "STORAGE_BACKEND",
+    "SQLITE_PATH",
+    "create_store",
+    "requires_postgres",
+    "store",
+]
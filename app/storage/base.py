@@ -0,0 +1,145 @@
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+@dataclass(frozen=True)
+class StoredPrompt:
+    """A prompt as returned by a store; ``content`` is None where a listing skips it"""
+    id: uuid.UUID
+    description: Optional[str]
+    content: Optional[str]
+    content_hash: str
+    version: int
+    created_at: datetime
+    updated_at: datetime
+
+
+class PromptMeta(NamedTuple):
+    """Enough of a prompt to answer a conditional request without its body"""
+    content_hash: str
+    updated_at: datetime
+    # UTF-8 size of the body
+    size: int
+
+
+@dataclass(frozen=True)
+class StoredVersion:
+    """Metadata of one entry in a prompt's version history"""
+    version: int
+    content_hash: str
+    description: Optional[str]
+    created_at: datetime
+    # Version this one is a delta against; None for a full snapshot
+    base_version: Optional[int] = None
+    stored_bytes: Optional[int] = None
+
+
+class PromptWrite(NamedTuple):
+    """Description and content to create a prompt with, or replace them with"""
+    id: uuid.UUID
+    description: Optional[str]
+    content: str
+
+
+class PromptsNotFound(LookupError):
+    """Some prompts in a batch update do not exist; nothing was written"""
+
+    def __init__(self, ids: list[uuid.UUID]):
+        super().__init__(f"Prompts not found: {', '.join(str(prompt_id) for prompt_id in ids)}")
+        self.ids = ids
+
+
+class PromptStore(ABC):
+    """Where prompts and their version history live.
+
+    The routers only reach prompts through a store. Every backend supports
+    reads, keyset-paged listing, batched writes and version history; the
+    features built on Postgres itself (full-text search, the change feed,
+    event streams, bulk import/export, replicas and snapshots) are only
+    available with ``PostgresStore``.
+    """
+
+    name: str = ""
+    postgres = False
+
+    async def start(self) -> None:
+        """Create the schema if needed; called once at startup"""
+
+    async def close(self) -> None:
+        """Release connections; called once at shutdown"""
+
+    @abstractmethod
+    async def get(self, prompt_id: uuid.UUID, primary: bool = False) -> Optional[StoredPrompt]:
+        """A prompt with its content, or None.
+
+        ``primary`` skips read replicas, for reads that must see the
+        latest committed write.
+        """
+
+    @abstractmethod
+    async def get_meta(self, prompt_id: uuid.UUID) -> Optional[PromptMeta]:
+        """A prompt's validators and size without loading its body"""
+
+    @abstractmethod
+    async def get_many(self, prompt_ids: list[uuid.UUID]) -> list[StoredPrompt]:
+        """The prompts that exist among ``prompt_ids``, in no particular order"""
+
+    @abstractmethod
+    async def list_prompts(
+        self,
+        sort: str,
+        descending: bool,
+        position: Optional[tuple[datetime, uuid.UUID]],
+        limit: int
+    ) -> list[StoredPrompt]:
+        """One keyset page of prompts without their content.
+
+        Prompts are ordered by ``(sort, id)``, where ``sort`` is
+        "created_at" or "updated_at", starting after ``position``.
+        """
+
+    @abstractmethod
+    async def create_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        """Create prompts at version 1 in one transaction, returned in order"""
+
+    @abstractmethod
+    async def update_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        """Replace description and content in one transaction, returned in order.
+
+        A prompt whose description and content are unchanged keeps its
+        version. Raises PromptsNotFound, writing nothing, if any id does
+        not exist.
+        """
+
+    @abstractmethod
+    async def delete_many(self, prompt_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        """Delete prompts and their history; returns the ids that existed"""
+
+    @abstractmethod
+    async def list_versions(self, prompt_id: uuid.UUID) -> list[StoredVersion]:
+        """Version metadata for a prompt, newest first"""
+
+    @abstractmethod
+    async def load_version(
+        self,
+        prompt_id: uuid.UUID,
+        version: int,
+        primary: bool = False
+    ) -> Optional[tuple[StoredVersion, str]]:
+        """A stored version and its content, or None if it does not exist"""
+
+    async def create(self, description: Optional[str], content: str) -> StoredPrompt:
+        return (await self.create_many([PromptWrite(uuid.uuid4(), description, content)]))[0]
+
+    async def update(self, prompt_id: uuid.UUID, description: Optional[str], content: str) -> Optional[StoredPrompt]:
+        """Replace a prompt's description and content; None if it does not exist"""
+        try:
+            return (await self.update_many([PromptWrite(prompt_id, description, content)]))[0]
+        except PromptsNotFound:
+            return None
+
+    async def delete(self, prompt_id: uuid.UUID) -> bool:
+        return bool(await self.delete_many([prompt_id]))
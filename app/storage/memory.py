@@ -0,0 +1,123 @@
+import uuid
+from dataclasses import replace
+from datetime import datetime, timezone
+from typing import Optional
+
+from ..models import hash_content
+from .base import PromptMeta, PromptStore, PromptWrite, PromptsNotFound, StoredPrompt, StoredVersion
+
+
+class MemoryStore(PromptStore):
+    """Prompts in process memory, gone on restart.
+
+    Every method runs without awaiting, so each call is atomic on the
+    event loop. Each worker process has its own store, so run a single
+    worker; meant for tests, benchmarks and throwaway instances.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._prompts: dict[uuid.UUID, StoredPrompt] = {}
+        # prompt id -> every version's metadata and content, oldest first
+        self._versions: dict[uuid.UUID, list[tuple[StoredVersion, str]]] = {}
+
+    async def get(self, prompt_id: uuid.UUID, primary: bool = False) -> Optional[StoredPrompt]:
+        return self._prompts.get(prompt_id)
+
+    async def get_meta(self, prompt_id: uuid.UUID) -> Optional[PromptMeta]:
+        prompt = self._prompts.get(prompt_id)
+        if prompt is None:
+            return None
+        return PromptMeta(prompt.content_hash, prompt.updated_at, len(prompt.content.encode("utf-8")))
+
+    async def get_many(self, prompt_ids: list[uuid.UUID]) -> list[StoredPrompt]:
+        return [self._prompts[prompt_id] for prompt_id in prompt_ids if prompt_id in self._prompts]
+
+    async def list_prompts(
+        self,
+        sort: str,
+        descending: bool,
+        position: Optional[tuple[datetime, uuid.UUID]],
+        limit: int
+    ) -> list[StoredPrompt]:
+        def key(prompt: StoredPrompt):
+            return getattr(prompt, sort), prompt.id
+
+        prompts = self._prompts.values()
+        if position is not None:
+            prompts = [prompt for prompt in prompts if (key(prompt) < position if descending else key(prompt) > position)]
+        page = sorted(prompts, key=key, reverse=descending)[:limit]
+        return [replace(prompt, content=None) for prompt in page]
+
+    async def create_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        now = datetime.now(timezone.utc)
+        created = [
+            StoredPrompt(
+                id=prompt.id,
+                description=prompt.description,
+                content=prompt.content,
+                content_hash=hash_content(prompt.content),
+                version=1,
+                created_at=now,
+                updated_at=now,
+            )
+            for prompt in prompts
+        ]
+        for prompt in created:
+            self._prompts[prompt.id] = prompt
+            self._versions[prompt.id] = [(self._version(prompt), prompt.content)]
+        return created
+
+    async def update_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        missing = [prompt.id for prompt in prompts if prompt.id not in self._prompts]
+        if missing:
+            raise PromptsNotFound(missing)
+        now = datetime.now(timezone.utc)
+        updated = []
+        for prompt in prompts:
+            current = self._prompts[prompt.id]
+            if (current.description, current.content) != (prompt.description, prompt.content):
+                current = replace(
+                    current,
+                    description=prompt.description,
+                    content=prompt.content,
+                    content_hash=hash_content(prompt.content),
+                    version=current.version + 1,
+                    updated_at=now,
+                )
+                self._prompts[prompt.id] = current
+                self._versions[prompt.id].append((self._version(current), current.content))
+            updated.append(current)
+        return updated
+
+    async def delete_many(self, prompt_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        deleted = [prompt_id for prompt_id in prompt_ids if self._prompts.pop(prompt_id, None) is not None]
+        for prompt_id in deleted:
+            self._versions.pop(prompt_id, None)
+        return deleted
+
+    async def list_versions(self, prompt_id: uuid.UUID) -> list[StoredVersion]:
+        return [version for version, _ in reversed(self._versions.get(prompt_id, []))]
+
+    async def load_version(
+        self,
+        prompt_id: uuid.UUID,
+        version: int,
+        primary: bool = False
+    ) -> Optional[tuple[StoredVersion, str]]:
+        versions = self._versions.get(prompt_id, [])
+        # Versions are numbered from 1 without gaps
+        if 1 <= version <= len(versions):
+            return versions[version - 1]
+        return None
+
+    @staticmethod
+    def _version(prompt: StoredPrompt) -> StoredVersion:
+        return StoredVersion(
+            version=prompt.version,
+            content_hash=prompt.content_hash,
+            description=prompt.description,
+            created_at=prompt.updated_at,
+            stored_bytes=len(prompt.content.encode("utf-8")),
+        )
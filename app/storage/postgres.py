@@ -0,0 +1,207 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import select, delete, tuple_
+from sqlalchemy.orm import defer
+
+from ..blob_storage import body_codec
+from ..database import AsyncSessionLocal, verify_schema, close_db
+from ..models import Prompt
+from ..replicas import replica_router
+from ..bulk import prompt_record, upsert_prompts
+from ..versions import record_version, load_version, list_versions
+from .base import PromptMeta, PromptStore, PromptWrite, PromptsNotFound, StoredPrompt, StoredVersion
+
+
+def _stored(prompt: Prompt, content: bool = True) -> StoredPrompt:
+    return StoredPrompt(
+        id=prompt.id,
+        description=prompt.description,
+        content=prompt.content if content else None,
+        content_hash=prompt.content_hash,
+        version=prompt.version,
+        created_at=prompt.created_at,
+        updated_at=prompt.updated_at,
+    )
+
+
+class PostgresStore(PromptStore):
+    """Prompts in Postgres, with blobs, delta version history and read replicas.
+
+    Public reads go through ``replica_router``; writes and ``primary``
+    reads use the primary.
+    """
+
+    name = "postgres"
+    postgres = True
+
+    async def start(self) -> None:
+        await verify_schema()
+        await body_codec.preload()
+
+    async def close(self) -> None:
+        await close_db()
+
+    def _session(self, prompt_ids: list[uuid.UUID], primary: bool):
+        return AsyncSessionLocal() if primary else replica_router.session(prompt_ids)
+
+    async def get(self, prompt_id: uuid.UUID, primary: bool = False) -> Optional[StoredPrompt]:
+        async with self._session([prompt_id], primary) as db:
+            prompt = await db.scalar(select(Prompt).where(Prompt.id == prompt_id))
+        return _stored(prompt) if prompt else None
+
+    async def get_meta(self, prompt_id: uuid.UUID) -> Optional[PromptMeta]:
+        async with replica_router.session([prompt_id]) as db:
+            row = (await db.execute(
+                select(Prompt.content_hash, Prompt.updated_at, Prompt.content_size)
+                .where(Prompt.id == prompt_id)
+            )).first()
+        return PromptMeta(*row) if row else None
+
+    async def get_many(self, prompt_ids: list[uuid.UUID]) -> list[StoredPrompt]:
+        async with replica_router.session(prompt_ids) as db:
+            prompts = (await db.scalars(select(Prompt).where(Prompt.id.in_(prompt_ids)))).all()
+        return [_stored(prompt) for prompt in prompts]
+
+    async def list_prompts(
+        self,
+        sort: str,
+        descending: bool,
+        position: Optional[tuple[datetime, uuid.UUID]],
+        limit: int
+    ) -> list[StoredPrompt]:
+        # Each sort column has a (column, id) index, so a page is one index range scan
+        column = getattr(Prompt, sort)
+        query = select(Prompt).options(defer(Prompt.content))
+        if position is not None:
+            key = tuple_(column, Prompt.id)
+            query = query.where(key < tuple_(*position) if descending else key > tuple_(*position))
+        if descending:
+            query = query.order_by(column.desc(), Prompt.id.desc())
+        else:
+            query = query.order_by(column.asc(), Prompt.id.asc())
+        async with AsyncSessionLocal() as db:
+            prompts = (await db.scalars(query.limit(limit))).all()
+        return [_stored(prompt, content=False) for prompt in prompts]
+
+    async def create(self, description: Optional[str], content: str) -> StoredPrompt:
+        async with AsyncSessionLocal() as db:
+            prompt = Prompt(description=description, content=content)
+            db.add(prompt)
+            await db.flush()
+            await record_version(db, prompt)
+            await db.commit()
+            await db.refresh(prompt)
+            return _stored(prompt)
+
+    async def update(self, prompt_id: uuid.UUID, description: Optional[str], content: str) -> Optional[StoredPrompt]:
+        async with AsyncSessionLocal() as db:
+            # Lock the row so concurrent edits get consecutive version numbers
+            prompt = await db.scalar(
+                select(Prompt).where(Prompt.id == prompt_id).with_for_update()
+            )
+            if not prompt:
+                return None
+            if prompt.description != description or prompt.content != content:
+                prompt.description = description
+                prompt.content = content
+                prompt.version += 1
+                await record_version(db, prompt)
+                await db.commit()
+                await db.refresh(prompt)
+            return _stored(prompt)
+
+    async def create_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        records = {
+            prompt.id: prompt_record(prompt.id, prompt.description, prompt.content)
+            for prompt in prompts
+        }
+        async with AsyncSessionLocal() as db:
+            written = await upsert_prompts(db, records)
+            await db.commit()
+        rows = {row.id: row for row in written}
+        return [self._written(records[prompt.id], rows[prompt.id]) for prompt in prompts]
+
+    async def update_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        ids = [prompt.id for prompt in prompts]
+        async with AsyncSessionLocal() as db:
+            # Lock every row first, in id order, so concurrent batches cannot
+            # deadlock and all-or-nothing holds even if a prompt is deleted meanwhile
+            current = {
+                row.id: row
+                for row in (await db.execute(
+                    select(Prompt.id, Prompt.version, Prompt.created_at, Prompt.updated_at)
+                    .where(Prompt.id.in_(ids))
+                    .order_by(Prompt.id)
+                    .with_for_update()
+                )).all()
+            }
+            missing = [prompt_id for prompt_id in ids if prompt_id not in current]
+            if missing:
+                raise PromptsNotFound(missing)
+
+            records = {
+                prompt.id: prompt_record(prompt.id, prompt.description, prompt.content)
+                for prompt in prompts
+            }
+            # Edits keep delta history like the admin form; only bulk import stores snapshots
+            written = await upsert_prompts(db, records, deltas=True)
+            await db.commit()
+        # Unchanged prompts report their current version
+        current.update((row.id, row) for row in written)
+        return [self._written(records[prompt_id], current[prompt_id]) for prompt_id in ids]
+
+    async def delete_many(self, prompt_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        async with AsyncSessionLocal() as db:
+            deleted = (await db.scalars(
+                delete(Prompt).where(Prompt.id.in_(prompt_ids)).returning(Prompt.id)
+            )).all()
+            await db.commit()
+        return list(deleted)
+
+    async def list_versions(self, prompt_id: uuid.UUID) -> list[StoredVersion]:
+        async with AsyncSessionLocal() as db:
+            rows = await list_versions(db, prompt_id)
+        return [
+            StoredVersion(
+                version=row.version,
+                content_hash=row.content_hash,
+                description=row.description,
+                created_at=row.created_at,
+                base_version=row.base_version,
+                stored_bytes=row.stored_bytes,
+            )
+            for row in rows
+        ]
+
+    async def load_version(
+        self,
+        prompt_id: uuid.UUID,
+        version: int,
+        primary: bool = False
+    ) -> Optional[tuple[StoredVersion, str]]:
+        async with self._session([prompt_id], primary) as db:
+            loaded = await load_version(db, prompt_id, version)
+        if loaded is None:
+            return None
+        stored, content = loaded
+        return StoredVersion(
+            version=stored.version,
+            content_hash=stored.content_hash,
+            description=stored.description,
+            created_at=stored.created_at,
+            base_version=stored.base_version,
+        ), content
+
+    @staticmethod
+    def _written(record: dict, row) -> StoredPrompt:
+        return StoredPrompt(
+            id=row.id,
+            description=record["description"],
+            content=record["content"],
+            content_hash=record["content_hash"],
+            version=row.version,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
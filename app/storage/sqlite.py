@@ -0,0 +1,301 @@
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from ..models import hash_content
+from .base import PromptMeta, PromptStore, PromptWrite, PromptsNotFound, StoredPrompt, StoredVersion
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    id TEXT PRIMARY KEY,
+    description TEXT,
+    content TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_prompts_created_at_id ON prompts (created_at, id);
+CREATE INDEX IF NOT EXISTS ix_prompts_updated_at_id ON prompts (updated_at, id);
+CREATE TABLE IF NOT EXISTS prompt_versions (
+    prompt_id TEXT NOT NULL REFERENCES prompts (id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    description TEXT,
+    content TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (prompt_id, version)
+);
+"""
+
+PROMPT_COLUMNS = "id, description, content, content_hash, version, created_at, updated_at"
+LISTING_COLUMNS = "id, description, NULL, content_hash, version, created_at, updated_at"
+
+# Bound parameters per statement; SQLite before 3.32 allows at most 999
+MAX_VARIABLES = 900
+
+# Sort columns accepted by list_prompts
+SORT_COLUMNS = ("created_at", "updated_at")
+
+
+def _timestamp(value: datetime) -> str:
+    # Fixed width, so timestamps compare in time order as text
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f+00:00")
+
+
+def _prompt(row) -> StoredPrompt:
+    return StoredPrompt(
+        id=uuid.UUID(row[0]),
+        description=row[1],
+        content=row[2],
+        content_hash=row[3],
+        version=row[4],
+        created_at=datetime.fromisoformat(row[5]),
+        updated_at=datetime.fromisoformat(row[6]),
+    )
+
+
+def _version(row) -> StoredVersion:
+    return StoredVersion(
+        version=row[0],
+        content_hash=row[1],
+        description=row[2],
+        created_at=datetime.fromisoformat(row[3]),
+        stored_bytes=row[4],
+    )
+
+
+def _chunks(values: list, size: int = MAX_VARIABLES):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class SQLiteStore(PromptStore):
+    """Prompts in a single SQLite file in WAL mode.
+
+    Each worker thread keeps its own connection, so reads never wait for
+    a writer and run in a few microseconds; writers take the database
+    lock up front with BEGIN IMMEDIATE. Calls run in the threadpool so
+    the event loop never blocks on disk. Every version is stored whole.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connections: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode; transactions are begun explicitly
+            connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA foreign_keys = ON")
+            connection.execute("PRAGMA busy_timeout = 5000")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def _read(self, sql: str, params=()) -> list:
+        return self._connection().execute(sql, params).fetchall()
+
+    def _write(self, apply, *args):
+        """Run ``apply(connection, *args)`` in one write transaction"""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = apply(connection, *args)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        return result
+
+    async def start(self) -> None:
+        await run_in_threadpool(self._connection().executescript, SCHEMA)
+
+    async def close(self) -> None:
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
+
+    async def get(self, prompt_id: uuid.UUID, primary: bool = False) -> Optional[StoredPrompt]:
+        rows = await run_in_threadpool(
+            self._read, f"SELECT {PROMPT_COLUMNS} FROM prompts WHERE id = ?", (str(prompt_id),)
+        )
+        return _prompt(rows[0]) if rows else None
+
+    async def get_meta(self, prompt_id: uuid.UUID) -> Optional[PromptMeta]:
+        rows = await run_in_threadpool(
+            self._read,
+            # Casting to BLOB measures the body in UTF-8 bytes
+            "SELECT content_hash, updated_at, length(CAST(content AS BLOB)) FROM prompts WHERE id = ?",
+            (str(prompt_id),)
+        )
+        if not rows:
+            return None
+        content_hash, updated_at, size = rows[0]
+        return PromptMeta(content_hash, datetime.fromisoformat(updated_at), size)
+
+    async def get_many(self, prompt_ids: list[uuid.UUID]) -> list[StoredPrompt]:
+        def fetch():
+            rows = []
+            for chunk in _chunks([str(prompt_id) for prompt_id in prompt_ids]):
+                rows.extend(self._read(
+                    f"SELECT {PROMPT_COLUMNS} FROM prompts WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ))
+            return rows
+        return [_prompt(row) for row in await run_in_threadpool(fetch)]
+
+    async def list_prompts(
+        self,
+        sort: str,
+        descending: bool,
+        position: Optional[tuple[datetime, uuid.UUID]],
+        limit: int
+    ) -> list[StoredPrompt]:
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort column: {sort}")
+        direction = "DESC" if descending else "ASC"
+        sql = f"SELECT {LISTING_COLUMNS} FROM prompts"
+        params: list = []
+        if position is not None:
+            sql += f" WHERE ({sort}, id) {'<' if descending else '>'} (?, ?)"
+            params = [_timestamp(position[0]), str(position[1])]
+        sql += f" ORDER BY {sort} {direction}, id {direction} LIMIT ?"
+        rows = await run_in_threadpool(self._read, sql, [*params, limit])
+        return [_prompt(row) for row in rows]
+
+    async def create_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        now = datetime.now(timezone.utc)
+        created = [
+            StoredPrompt(
+                id=prompt.id,
+                description=prompt.description,
+                content=prompt.content,
+                content_hash=hash_content(prompt.content),
+                version=1,
+                created_at=now,
+                updated_at=now,
+            )
+            for prompt in prompts
+        ]
+
+        def apply(connection: sqlite3.Connection):
+            connection.executemany(
+                f"INSERT INTO prompts ({PROMPT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (str(prompt.id), prompt.description, prompt.content, prompt.content_hash,
+                     prompt.version, _timestamp(prompt.created_at), _timestamp(prompt.updated_at))
+                    for prompt in created
+                ]
+            )
+            self._record_versions(connection, created)
+
+        await run_in_threadpool(self._write, apply)
+        return created
+
+    async def update_many(self, prompts: list[PromptWrite]) -> list[StoredPrompt]:
+        now = datetime.now(timezone.utc)
+
+        def apply(connection: sqlite3.Connection) -> list[StoredPrompt]:
+            current = {}
+            for chunk in _chunks([str(prompt.id) for prompt in prompts]):
+                for row in connection.execute(
+                    f"SELECT {PROMPT_COLUMNS} FROM prompts WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ):
+                    prompt = _prompt(row)
+                    current[prompt.id] = prompt
+            missing = [prompt.id for prompt in prompts if prompt.id not in current]
+            if missing:
+                raise PromptsNotFound(missing)
+
+            changed = []
+            for prompt in prompts:
+                stored = current[prompt.id]
+                if (stored.description, stored.content) == (prompt.description, prompt.content):
+                    continue
+                current[prompt.id] = StoredPrompt(
+                    id=prompt.id,
+                    description=prompt.description,
+                    content=prompt.content,
+                    content_hash=hash_content(prompt.content),
+                    version=stored.version + 1,
+                    created_at=stored.created_at,
+                    updated_at=now,
+                )
+                changed.append(current[prompt.id])
+            connection.executemany(
+                "UPDATE prompts SET description = ?, content = ?, content_hash = ?, version = ?, updated_at = ?"
+                " WHERE id = ?",
+                [
+                    (prompt.description, prompt.content, prompt.content_hash, prompt.version,
+                     _timestamp(prompt.updated_at), str(prompt.id))
+                    for prompt in changed
+                ]
+            )
+            self._record_versions(connection, changed)
+            return [current[prompt.id] for prompt in prompts]
+
+        return await run_in_threadpool(self._write, apply)
+
+    async def delete_many(self, prompt_ids: list[uuid.UUID]) -> list[uuid.UUID]:
+        def apply(connection: sqlite3.Connection) -> list[uuid.UUID]:
+            deleted = []
+            for chunk in _chunks([str(prompt_id) for prompt_id in prompt_ids]):
+                deleted.extend(uuid.UUID(row[0]) for row in connection.execute(
+                    f"DELETE FROM prompts WHERE id IN ({', '.join('?' * len(chunk))}) RETURNING id",
+                    chunk
+                ))
+            return deleted
+
+        deleted = set(await run_in_threadpool(self._write, apply))
+        return [prompt_id for prompt_id in prompt_ids if prompt_id in deleted]
+
+    async def list_versions(self, prompt_id: uuid.UUID) -> list[StoredVersion]:
+        rows = await run_in_threadpool(
+            self._read,
+            "SELECT version, content_hash, description, created_at, length(CAST(content AS BLOB))"
+            " FROM prompt_versions WHERE prompt_id = ? ORDER BY version DESC",
+            (str(prompt_id),)
+        )
+        return [_version(row) for row in rows]
+
+    async def load_version(
+        self,
+        prompt_id: uuid.UUID,
+        version: int,
+        primary: bool = False
+    ) -> Optional[tuple[StoredVersion, str]]:
+        rows = await run_in_threadpool(
+            self._read,
+            "SELECT version, content_hash, description, created_at, length(CAST(content AS BLOB)), content"
+            " FROM prompt_versions WHERE prompt_id = ? AND version = ?",
+            (str(prompt_id), version)
+        )
+        return (_version(rows[0]), rows[0][5]) if rows else None
+
+    @staticmethod
+    def _record_versions(connection: sqlite3.Connection, prompts: list[StoredPrompt]) -> None:
+        connection.executemany(
+            "INSERT INTO prompt_versions (prompt_id, version, description, content, content_hash, created_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (str(prompt.id), prompt.version, prompt.description, prompt.content,
+                 prompt.content_hash, _timestamp(prompt.updated_at))
+                for prompt in prompts
+            ]
+        )
@@ -0,0 +1,78 @@
+import os
+from typing import AsyncIterator, Optional, Union
+
+# Bodies larger than this are streamed in chunks of this many bytes
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", "65536"))
+
+# parse_range result for a Range the body cannot satisfy (416)
+UNSATISFIABLE = "unsatisfiable"
+
+
+def utf8_length(content: str) -> int:
+    """Size of ``content`` encoded as UTF-8, without encoding all of it at once"""
+    # O(1) in CPython: ASCII strings carry a flag
+    if content.isascii():
+        return len(content)
+    step = STREAM_CHUNK_BYTES
+    return sum(len(content[i:i + step].encode("utf-8")) for i in range(0, len(content), step))
+
+
+async def iter_utf8(content: str, start: int, end: int) -> AsyncIterator[bytes]:
+    """Bytes ``start:end`` of ``content`` encoded as UTF-8, in bounded chunks"""
+    if content.isascii():
+        # Character offsets are byte offsets
+        for i in range(start, end, STREAM_CHUNK_BYTES):
+            yield content[i:min(i + STREAM_CHUNK_BYTES, end)].encode("ascii")
+        return
+
+    # Encode a few characters at a time, tracking the byte offset, and
+    # yield the parts that fall inside the range
+    step = max(STREAM_CHUNK_BYTES // 4, 1)
+    position = 0
+    for i in range(0, len(content), step):
+        if position >= end:
+            break
+        data = content[i:i + step].encode("utf-8")
+        if position + len(data) > start:
+            yield data[max(start - position, 0):end - position]
+        position += len(data)
+
+
+def parse_range(header: str, size: int) -> Union[tuple[int, int], str, None]:
+    """Parse a Range header against a body of ``size`` bytes (RFC 9110 section 14.2).
+
+    Returns ``(start, end)`` with ``end`` exclusive, UNSATISFIABLE, or None
+    when the header should be ignored and the full body served: it is
+    malformed, not in bytes, or asks for several ranges.
+    """
+    unit, _, ranges = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in ranges:
+        return None
+    first, dash, last = ranges.strip().partition("-")
+    if not dash:
+        return None
+    try:
+        if not first:
+            # Suffix range: the last N bytes
+            length = int(last)
+            if length < 0:
+                return None
+            if length == 0 or size == 0:
+                return UNSATISFIABLE
+            return max(size - length, 0), size
+        start = int(first)
+        end = int(last) + 1 if last else size
+    except ValueError:
+        return None
+    if start < 0 or (last and end <= start):
+        return None
+    if start >= size:
+        return UNSATISFIABLE
+    return start, min(end, size)
+
+
+def content_range(byte_range: Optional[tuple[int, int]], size: int) -> str:
+    """Content-Range value for a served range, or for a 416 when None"""
+    if byte_range is None:
+        return f"bytes */{size}"
+    return f"bytes {byte_range[0]}-{byte_range[1] - 1}/{size}"
@@ -0,0 +1,206 @@
+import difflib
+import json
+import os
+import uuid
+from typing import Optional
+from sqlalchemy import Integer, String, Text, bindparam, select, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, insert as pg_insert
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import Prompt, PromptVersion
+
+# Store a full snapshot at least every this many versions
+PROMPT_SNAPSHOT_INTERVAL = int(os.getenv("PROMPT_SNAPSHOT_INTERVAL", "20"))
+
+def make_delta(base: str, content: str) -> list:
+    """Line delta turning ``base`` into ``content``.
+
+    Each item is either ``[start, end]``, copying that slice of the base
+    lines, or a string of inserted text.
+    """
+    base_lines = base.splitlines(keepends=True)
+    lines = content.splitlines(keepends=True)
+    delta = []
+    matcher = difflib.SequenceMatcher(None, base_lines, lines)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append("".join(lines[j1:j2]))
+    return delta
+
+def apply_delta(base: str, delta: list) -> str:
+    """Inverse of make_delta"""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for item in delta:
+        if isinstance(item, str):
+            parts.append(item)
+        else:
+            parts.extend(base_lines[item[0]:item[1]])
+    return "".join(parts)
+
+def _version_data(content: str, version: int, snapshot) -> tuple[str, Optional[int]]:
+    """``(data, base_version)`` storing ``content`` as ``version``.
+
+    A delta against ``snapshot`` (a row with version and data, or None)
+    when it is recent enough and saves at least half the size, else the
+    full content as a new snapshot.
+    """
+    if snapshot is not None and version - snapshot.version < PROMPT_SNAPSHOT_INTERVAL:
+        delta = json.dumps(make_delta(snapshot.data, content), separators=(",", ":"))
+        if len(delta) * 2 < len(content):
+            return delta, snapshot.version
+    return content, None
+
+async def record_version(db: AsyncSession, prompt: Prompt) -> PromptVersion:
+    """Store ``prompt`` as its current version, in the caller's transaction.
+
+    Versions are deltas against the most recent snapshot, so any version is
+    rebuilt from at most two rows. A new snapshot is taken every
+    PROMPT_SNAPSHOT_INTERVAL versions, or sooner once the delta stops
+    saving at least half of the content size.
+    """
+    snapshot = (await db.execute(
+        select(PromptVersion.version, PromptVersion.data)
+        .where(
+            PromptVersion.prompt_id == prompt.id,
+            PromptVersion.base_version.is_(None),
+            PromptVersion.version < prompt.version
+        )
+        .order_by(PromptVersion.version.desc())
+        .limit(1)
+    )).first()
+
+    data, base_version = _version_data(prompt.content, prompt.version, snapshot)
+
+    version = PromptVersion(
+        prompt_id=prompt.id,
+        version=prompt.version,
+        base_version=base_version,
+        data=data,
+        content_hash=prompt.content_hash,
+        description=prompt.description
+    )
+    db.add(version)
+    await db.flush()
+    return version
+
+async def record_versions(db: AsyncSession, prompts: list[dict]) -> None:
+    """Store many prompts' current versions like ``record_version``, with one read and one INSERT.
+
+    ``prompts`` are dicts with id, version, content, content_hash and
+    description. Each prompt's latest snapshot is loaded in a single
+    ``DISTINCT ON`` query; the caller holds the prompts' row locks.
+    """
+    if not prompts:
+        return
+    snapshots = {
+        row.prompt_id: row
+        for row in (await db.execute(
+            select(PromptVersion.prompt_id, PromptVersion.version, PromptVersion.data)
+            .where(
+                PromptVersion.prompt_id.in_([prompt["id"] for prompt in prompts]),
+                PromptVersion.base_version.is_(None)
+            )
+            .distinct(PromptVersion.prompt_id)
+            .order_by(PromptVersion.prompt_id, PromptVersion.version.desc())
+        )).all()
+    }
+    stored = [
+        _version_data(prompt["content"], prompt["version"], snapshots.get(prompt["id"]))
+        for prompt in prompts
+    ]
+    await _insert_versions(db, prompts, [data for data, _ in stored], [base for _, base in stored])
+
+async def record_snapshot_versions(db: AsyncSession, prompts: list[dict]) -> None:
+    """Store many prompts' current versions as full snapshots with one INSERT.
+
+    ``prompts`` are dicts with id, version, content, content_hash and
+    description. Used by bulk import, where a snapshot per written version
+    avoids reading each prompt's previous snapshot back.
+    """
+    if not prompts:
+        return
+    await _insert_versions(db, prompts, [prompt["content"] for prompt in prompts], [None] * len(prompts))
+
+async def _insert_versions(db: AsyncSession, prompts: list[dict], data: list[str], base_versions: list) -> None:
+    # Rows are passed as arrays to ``unnest`` so the statement compiles once
+    columns = {
+        "prompt_id": ([prompt["id"] for prompt in prompts], UUID(as_uuid=True)),
+        "version": ([prompt["version"] for prompt in prompts], Integer),
+        "base_version": (base_versions, Integer),
+        "data": (data, Text),
+        "content_hash": ([prompt["content_hash"] for prompt in prompts], String),
+        "description": ([prompt["description"] for prompt in prompts], String),
+    }
+    rows = func.unnest(*(
+        bindparam(f"version_{name}", values, type_=ARRAY(column_type))
+        for name, (values, column_type) in columns.items()
+    )).table_valued(*columns).render_derived(name="version_rows")
+    await db.execute(pg_insert(PromptVersion).from_select(
+        list(columns),
+        select(*(rows.c[name] for name in columns)),
+        include_defaults=False
+    ))
+
+async def load_version(
+    db: AsyncSession,
+    prompt_id: uuid.UUID,
+    version: int
+) -> Optional[tuple[PromptVersion, str]]:
+    """A stored version and its content, or None if it does not exist"""
+    base = aliased(PromptVersion)
+    row = (await db.execute(
+        select(PromptVersion, base.data.label("base_data"))
+        .outerjoin(
+            base,
+            (base.prompt_id == PromptVersion.prompt_id)
+            & (base.version == PromptVersion.base_version)
+        )
+        .where(PromptVersion.prompt_id == prompt_id, PromptVersion.version == version)
+    )).first()
+
+    if row is None:
+        return None
+    stored = row.PromptVersion
+    if stored.base_version is None:
+        return stored, stored.data
+    return stored, apply_delta(row.base_data, json.loads(stored.data))
+
+async def list_versions(db: AsyncSession, prompt_id: uuid.UUID) -> list:
+    """Version metadata for a prompt, newest first"""
+    result = await db.execute(
+        select(
+            PromptVersion.version,
+            PromptVersion.base_version,
+            PromptVersion.content_hash,
+            PromptVersion.description,
+            PromptVersion.created_at,
+            func.octet_length(PromptVersion.data).label("stored_bytes")
+        )
+        .where(PromptVersion.prompt_id == prompt_id)
+        .order_by(PromptVersion.version.desc())
+    )
+    return result.all()
+
+def diff_lines(old: str, new: str) -> list[tuple[str, str]]:
+    """Unified diff of two contents as (kind, line) pairs for display.
+
+    ``kind`` is "add", "remove", "hunk" or "context".
+    """
+    lines = []
+    diff = list(difflib.unified_diff(old.splitlines(), new.splitlines(), lineterm="", n=3))
+    # Skip the ---/+++ file headers
+    for line in diff[2:]:
+        if line.startswith("@@"):
+            kind = "hunk"
+        elif line.startswith("+"):
+            kind = "add"
+        elif line.startswith("-"):
+            kind = "remove"
+        else:
+            kind = "context"
+        lines.append((kind, line))
+    return lines
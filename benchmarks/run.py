@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Prompt CMS - Load/benchmark runner
+
+Seeds prompts through the admin endpoints, then drives each scenario at a
+fixed concurrency for a fixed duration and reports requests/sec and latency
+percentiles as JSON.
+
+    # Against a running server
+    python -m benchmarks.run --base-url http://localhost:8000
+
+    # Start uvicorn against $DATABASE_URL for the run
+    python -m benchmarks.run --spawn --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+SCENARIOS = ["prompt", "prompt_revalidate", "batch", "dashboard", "create", "update"]
+BATCH_SIZE = 20
+
+_EDIT_LINK = re.compile(r'/admin/prompt/([0-9a-f-]{36})/edit')
+_NEXT_LINK = re.compile(r'href="(/admin\?sort=created_desc&after=[^"]+)"')
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def make_content(size: int, seed: int) -> str:
+    """Markdown-ish body of roughly ``size`` bytes"""
+    line = f"- Step {seed}: follow the instructions carefully and cite sources.\n"
+    return (f"# Benchmark prompt {seed}\n\n" + line * (size // len(line) + 1))[:size]
+
+
+class Scenario:
+    """One benchmarked request type"""
+
+    def __init__(self, name: str, client: httpx.AsyncClient, prompt_ids: list, sizes: list):
+        self.name = name
+        self.client = client
+        self.prompt_ids = prompt_ids
+        self.sizes = sizes
+        self.etags = {}
+        self.counter = 0
+
+    async def prepare(self) -> None:
+        if self.name == "prompt_revalidate":
+            for prompt_id in self.prompt_ids:
+                response = await self.client.get(f"/prompt/{prompt_id}")
+                self.etags[prompt_id] = response.headers.get("etag", "")
+
+    async def request(self) -> httpx.Response:
+        self.counter += 1
+        prompt_id = random.choice(self.prompt_ids)
+        if self.name == "prompt":
+            return await self.client.get(f"/prompt/{prompt_id}")
+        if self.name == "prompt_revalidate":
+            return await self.client.get(
+                f"/prompt/{prompt_id}",
+                headers={"If-None-Match": self.etags[prompt_id]}
+            )
+        if self.name == "batch":
+            ids = random.sample(self.prompt_ids, min(BATCH_SIZE, len(self.prompt_ids)))
+            return await self.client.post("/prompts:batchGet", json={"ids": ids})
+        if self.name == "dashboard":
+            return await self.client.get("/admin/")
+        if self.name == "create":
+            return await self.client.post("/admin/prompt/new", data={
+                "description": f"bench-create-{self.counter}",
+                "content": make_content(random.choice(self.sizes), self.counter),
+            })
+        if self.name == "update":
+            return await self.client.post(f"/admin/prompt/{prompt_id}/edit", data={
+                "description": f"bench-update-{self.counter}",
+                "content": make_content(random.choice(self.sizes), self.counter),
+            })
+        raise ValueError(f"Unknown scenario: {self.name}")
+
+
+async def run_scenario(scenario: Scenario, concurrency: int, duration: float) -> dict:
+    """Drive one scenario with ``concurrency`` workers for ``duration`` seconds"""
+    await scenario.prepare()
+    latencies = []
+    statuses = {}
+    response_bytes = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal response_bytes, errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await scenario.request()
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            response_bytes += len(response.content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "bytes_per_request": round(response_bytes / len(latencies)) if latencies else 0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+    }
+
+
+async def login(client: httpx.AsyncClient, password: str) -> None:
+    response = await client.post("/admin/login", data={"password": password})
+    if response.status_code != 302:
+        raise SystemExit("Admin login failed; pass --password or set ADMIN_PASSWORD")
+
+
+async def seed_prompts(client: httpx.AsyncClient, count: int, sizes: list, concurrency: int) -> list:
+    """Create ``count`` prompts and return their ids (newest first)"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def create(i):
+        async with semaphore:
+            await client.post("/admin/prompt/new", data={
+                "description": f"bench-seed-{i}",
+                "content": make_content(sizes[i % len(sizes)], i),
+            })
+
+    await asyncio.gather(*(create(i) for i in range(count)))
+
+    # Walk the dashboard newest-first to collect the ids just created
+    prompt_ids = []
+    url = "/admin/?sort=created_desc"
+    while url and len(prompt_ids) < count:
+        page = (await client.get(url)).text
+        prompt_ids.extend(_EDIT_LINK.findall(page))
+        next_link = _NEXT_LINK.search(page)
+        url = next_link.group(1) if next_link else None
+    return prompt_ids[:count]
+
+
+async def delete_prompts(client: httpx.AsyncClient, prompt_ids: list, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def delete(prompt_id):
+        async with semaphore:
+            await client.post(f"/admin/prompt/{prompt_id}/delete")
+
+    await asyncio.gather(*(delete(prompt_id) for prompt_id in prompt_ids))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(port: int, workers: int) -> subprocess.Popen:
+    """Start uvicorn for app.main:app in a subprocess"""
+    return subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning",
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+async def wait_until_healthy(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/health")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise SystemExit(f"Server at {base_url} did not become healthy")
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_comparison(results: dict, baseline: dict) -> None:
+    """Print requests/sec and p99 changes against a previous run"""
+    print(f"{'scenario':<20}{'req/s':>12}{'Δ':>9}{'p99 ms':>12}{'Δ':>9}", file=sys.stderr)
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        rps = current["requests_per_second"]
+        p99 = current["latency_ms"]["p99"]
+        if previous:
+            rps_delta = (rps / previous["requests_per_second"] - 1) * 100 if previous["requests_per_second"] else 0
+            p99_delta = (p99 / previous["latency_ms"]["p99"] - 1) * 100 if previous["latency_ms"]["p99"] else 0
+            print(f"{name:<20}{rps:>12.1f}{rps_delta:>+8.1f}%{p99:>12.3f}{p99_delta:>+8.1f}%", file=sys.stderr)
+        else:
+            print(f"{name:<20}{rps:>12.1f}{'':>9}{p99:>12.3f}{'':>9}", file=sys.stderr)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    sizes = [int(size) for size in args.sizes.split(",")]
+    scenarios = args.scenarios.split(",")
+    for name in scenarios:
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}'; choose from {', '.join(SCENARIOS)}")
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=30) as client:
+        await login(client, args.password)
+        prompt_ids = await seed_prompts(client, args.prompts, sizes, args.concurrency)
+        if not prompt_ids:
+            raise SystemExit("Seeding produced no prompts")
+
+        results = {}
+        try:
+            for name in scenarios:
+                scenario = Scenario(name, client, prompt_ids, sizes)
+                results[name] = await run_scenario(scenario, args.concurrency, args.duration)
+                print(
+                    f"{name}: {results[name]['requests_per_second']} req/s, "
+                    f"p50 {results[name]['latency_ms']['p50']} ms, "
+                    f"p99 {results[name]['latency_ms']['p99']} ms",
+                    file=sys.stderr
+                )
+        finally:
+            if args.cleanup:
+                await delete_prompts(client, prompt_ids, args.concurrency)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "base_url": args.base_url,
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "prompts": len(prompt_ids),
+            "sizes": sizes,
+        },
+        "scenarios": results,
+    }
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the Prompt CMS hot paths")
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Server to benchmark")
+    parser.add_argument("--spawn", action="store_true", help="Start uvicorn against $DATABASE_URL for the run")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when using --spawn")
+    parser.add_argument("--password", default=os.getenv("ADMIN_PASSWORD", "admin123"), help="Admin password")
+    parser.add_argument("--prompts", type=int, default=100, help="Number of prompts to seed")
+    parser.add_argument("--sizes", default="1024,16384,131072", help="Comma-separated prompt sizes in bytes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent in-flight requests")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    parser.add_argument("--compare", help="Previous JSON results to compare against")
+    parser.add_argument("--no-cleanup", dest="cleanup", action="store_false", help="Keep seeded prompts")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+
+    server = None
+    if args.spawn:
+        port = free_port()
+        args.base_url = f"http://127.0.0.1:{port}"
+        server = spawn_server(port, args.workers)
+    try:
+        asyncio.run(wait_until_healthy(args.base_url))
+        results = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Prompt CMS - Maintenance commands
+
+    # Compress stored prompt bodies above BLOB_COMPRESSION_MIN_BYTES
+    python manage.py compress-blobs [--dictionary-id N] [--recompress]
+
+    # Train a zstd dictionary on stored bodies, then compress with it
+    python manage.py train-dictionary --size 112640
+    python manage.py compress-blobs --dictionary-id 1 --recompress
+
+    # Compression ratio and storage used by prompt bodies
+    python manage.py blob-stats
+
+    # Store every body as text again (required before downgrading)
+    python manage.py decompress-blobs
+
+    # Write all prompts to a snapshot file for SNAPSHOT_MODE serving
+    python manage.py export-snapshot [--path prompts.snapshot]
+
+    # Back up or migrate every prompt as NDJSON (gzipped for a .gz path)
+    python manage.py export-prompts --output prompts.ndjson.gz
+    python manage.py import-prompts prompts.ndjson.gz
+
+    # Drop change feed deletions older than TOMBSTONE_RETENTION_DAYS (run daily)
+    python manage.py prune-tombstones [--days 30]
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from sqlalchemy import select, update, func, text, type_coerce
+
+from app.database import AsyncSessionLocal, close_db
+from app.models import PromptBlob, PromptBlobDictionary
+from app.blob_storage import EncodedBody, StoredBody, body_codec, zstandard
+from app.snapshot import SNAPSHOT_PATH, export_snapshot
+from app.bulk import BULK_BATCH_SIZE, BulkImportError, export_prompts, import_prompts, iter_lines
+from app.changes import TOMBSTONE_RETENTION_DAYS, prune_tombstones
+
+# Stored body of a blob, decompressed on load
+_BODY = type_coerce(
+    func.coalesce(PromptBlob.compressed, func.convert_to(PromptBlob.content, "UTF8")),
+    StoredBody()
+).label("body")
+
+
+async def _rewrite_blobs(select_batch, encode, batch_size: int) -> dict:
+    """Re-encode blobs in committed batches of ``batch_size``, in hash order"""
+    totals = {"examined": 0, "rewritten": 0, "bytes_before": 0, "bytes_after": 0}
+    last_hash = ""
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select_batch
+                .where(PromptBlob.content_hash > last_hash)
+                .order_by(PromptBlob.content_hash)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            last_hash = rows[-1].content_hash
+
+            changes = []
+            for row in rows:
+                totals["examined"] += 1
+                encoded = encode(row.body)
+                # Text that stays text (small or incompressible)
+                if encoded.compressed is None and not row.is_compressed:
+                    continue
+                totals["rewritten"] += 1
+                totals["bytes_before"] += row.stored_bytes
+                totals["bytes_after"] += len(encoded.compressed) if encoded.compressed is not None else encoded.size
+                changes.append({
+                    "content_hash": row.content_hash,
+                    "content": encoded.content,
+                    "compressed": encoded.compressed,
+                    "dictionary_id": encoded.dictionary_id,
+                })
+            if changes:
+                await db.execute(update(PromptBlob), changes)
+                await db.commit()
+        print(f"{totals['examined']} blobs examined, {totals['rewritten']} rewritten", file=sys.stderr)
+    return totals
+
+
+def _batch_query():
+    return select(
+        PromptBlob.content_hash,
+        PromptBlob.size,
+        PromptBlob.dictionary_id,
+        (PromptBlob.compressed.isnot(None)).label("is_compressed"),
+        func.coalesce(func.octet_length(PromptBlob.compressed), PromptBlob.size).label("stored_bytes"),
+        _BODY,
+    )
+
+
+async def compress_blobs(args: argparse.Namespace) -> dict:
+    if zstandard is None:
+        raise SystemExit("compress-blobs requires the zstandard package")
+    query = _batch_query().where(PromptBlob.size >= body_codec.min_bytes)
+    if args.recompress:
+        query = query.where(
+            PromptBlob.compressed.is_(None)
+            | PromptBlob.dictionary_id.is_distinct_from(args.dictionary_id)
+        )
+    else:
+        query = query.where(PromptBlob.compressed.is_(None))
+    return await _rewrite_blobs(
+        query,
+        lambda body: body_codec.compress(body, args.dictionary_id),
+        args.batch_size
+    )
+
+
+async def decompress_blobs(args: argparse.Namespace) -> dict:
+    return await _rewrite_blobs(
+        _batch_query().where(PromptBlob.compressed.isnot(None)),
+        lambda body: EncodedBody(body, None, None, len(body.encode("utf-8"))),
+        args.batch_size
+    )
+
+
+async def train_dictionary(args: argparse.Namespace) -> dict:
+    if zstandard is None:
+        raise SystemExit("train-dictionary requires the zstandard package")
+    async with AsyncSessionLocal() as db:
+        samples = (await db.execute(
+            select(_BODY).order_by(func.random()).limit(args.samples)
+        )).scalars().all()
+        dictionary_id = (await db.scalar(select(func.max(PromptBlobDictionary.id)))) or 0
+        dictionary_id += 1
+
+        try:
+            dictionary = zstandard.train_dictionary(
+                args.size,
+                [sample.encode("utf-8") for sample in samples],
+                dict_id=dictionary_id,
+                level=body_codec.level
+            )
+        except zstandard.ZstdError as e:
+            raise SystemExit(f"Dictionary training failed ({len(samples)} samples): {e}")
+
+        db.add(PromptBlobDictionary(id=dictionary_id, data=dictionary.as_bytes()))
+        await db.commit()
+    return {
+        "dictionary_id": dictionary_id,
+        "bytes": len(dictionary.as_bytes()),
+        "samples": len(samples),
+        "next": f"set BLOB_COMPRESSION_DICTIONARY_ID={dictionary_id}, restart, then run "
+                f"`python manage.py compress-blobs --dictionary-id {dictionary_id} --recompress`",
+    }
+
+
+async def blob_stats(args: argparse.Namespace) -> dict:
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(select(
+            func.count().label("blobs"),
+            func.count(PromptBlob.compressed).label("compressed_blobs"),
+            func.coalesce(func.sum(PromptBlob.refcount), 0).label("prompts"),
+            func.coalesce(func.sum(PromptBlob.size), 0).label("content_bytes"),
+            func.coalesce(func.sum(PromptBlob.size).filter(PromptBlob.compressed.isnot(None)), 0).label("compressed_content_bytes"),
+            func.coalesce(func.sum(func.octet_length(PromptBlob.compressed)), 0).label("compressed_bytes"),
+        ))).one()
+        by_dictionary = (await db.execute(
+            select(
+                PromptBlob.dictionary_id,
+                func.count().label("blobs"),
+                func.sum(PromptBlob.size).label("content_bytes"),
+                func.sum(func.octet_length(PromptBlob.compressed)).label("compressed_bytes"),
+            )
+            .where(PromptBlob.compressed.isnot(None))
+            .group_by(PromptBlob.dictionary_id)
+            .order_by(PromptBlob.dictionary_id)
+        )).all()
+        table_bytes = await db.scalar(text("SELECT pg_total_relation_size('prompt_blobs')"))
+
+    def ratio(content_bytes, compressed_bytes):
+        return round(content_bytes / compressed_bytes, 3) if compressed_bytes else None
+
+    return {
+        "blobs": row.blobs,
+        "compressed_blobs": row.compressed_blobs,
+        # Prompts per stored body, from content-addressed deduplication
+        "dedup_ratio": round(row.prompts / row.blobs, 3) if row.blobs else None,
+        "content_bytes": row.content_bytes,
+        "compressed_content_bytes": row.compressed_content_bytes,
+        "compressed_bytes": row.compressed_bytes,
+        "compression_ratio": ratio(row.compressed_content_bytes, row.compressed_bytes),
+        "by_dictionary": [
+            {
+                "dictionary_id": item.dictionary_id,
+                "blobs": item.blobs,
+                "compression_ratio": ratio(item.content_bytes, item.compressed_bytes),
+            }
+            for item in by_dictionary
+        ],
+        # Includes TOAST and indexes
+        "table_bytes": table_bytes,
+    }
+
+
+async def export_snapshot_file(args: argparse.Namespace) -> dict:
+    result = await asyncio.to_thread(export_snapshot, args.path)
+    if result is None:
+        raise SystemExit("Another process is exporting the snapshot")
+    return result
+
+
+def _open_ndjson(path: str, mode: str, gzipped: bool):
+    return gzip.open(path, mode, compresslevel=6) if gzipped else open(path, mode)
+
+
+async def export_prompts_file(args: argparse.Namespace) -> dict:
+    started = time.perf_counter()
+    tmp_path = f"{args.output}.{os.getpid()}.tmp"
+    prompts = 0
+    try:
+        with _open_ndjson(tmp_path, "wb", args.output.endswith(".gz")) as f:
+            async for chunk in export_prompts(args.batch_size):
+                prompts += chunk.count(b"\n")
+                f.write(chunk)
+        os.replace(tmp_path, args.output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {
+        "path": args.output,
+        "prompts": prompts,
+        "bytes": os.path.getsize(args.output),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+async def import_prompts_file(args: argparse.Namespace) -> dict:
+    async def chunks():
+        with _open_ndjson(args.path, "rb", args.path.endswith(".gz")) as f:
+            while chunk := f.read(1024 * 1024):
+                yield chunk
+
+    try:
+        return await import_prompts(iter_lines(chunks()), args.batch_size)
+    except BulkImportError as e:
+        raise SystemExit(f"Import rolled back: {e}")
+
+
+async def prune_tombstones_older(args: argparse.Namespace) -> dict:
+    async with AsyncSessionLocal() as db:
+        result = await prune_tombstones(db, args.days)
+        await db.commit()
+    return result
+
+
+COMMANDS = {
+    "compress-blobs": compress_blobs,
+    "decompress-blobs": decompress_blobs,
+    "train-dictionary": train_dictionary,
+    "blob-stats": blob_stats,
+    "export-snapshot": export_snapshot_file,
+    "export-prompts": export_prompts_file,
+    "import-prompts": import_prompts_file,
+    "prune-tombstones": prune_tombstones_older,
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Prompt CMS maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compress = commands.add_parser("compress-blobs", help="zstd-compress stored prompt bodies")
+    compress.add_argument("--dictionary-id", type=int, help="Compress with this trained dictionary")
+    compress.add_argument("--recompress", action="store_true", help="Also re-encode bodies compressed with another dictionary")
+    compress.add_argument("--batch-size", type=int, default=500, help="Blobs per committed batch")
+
+    decompress = commands.add_parser("decompress-blobs", help="Store every prompt body as text")
+    decompress.add_argument("--batch-size", type=int, default=500, help="Blobs per committed batch")
+
+    train = commands.add_parser("train-dictionary", help="Train a zstd dictionary on stored bodies")
+    train.add_argument("--size", type=int, default=112640, help="Dictionary size in bytes")
+    train.add_argument("--samples", type=int, default=2000, help="Number of bodies to sample")
+
+    commands.add_parser("blob-stats", help="Show prompt body storage and compression ratio")
+
+    snapshot = commands.add_parser("export-snapshot", help="Write all prompts to a snapshot file")
+    snapshot.add_argument("--path", default=SNAPSHOT_PATH, help="Snapshot file to replace")
+
+    export = commands.add_parser("export-prompts", help="Write every prompt to an NDJSON file")
+    export.add_argument("--output", default="prompts.ndjson", help="File to write; gzipped if it ends in .gz")
+    export.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="Rows fetched per round trip")
+
+    load = commands.add_parser("import-prompts", help="Upsert prompts by id from an NDJSON file in one transaction")
+    load.add_argument("path", help="NDJSON file, or gzipped NDJSON ending in .gz")
+    load.add_argument("--batch-size", type=int, default=BULK_BATCH_SIZE, help="Prompts per INSERT statement")
+
+    prune = commands.add_parser("prune-tombstones", help="Delete change feed tombstones past the retention window")
+    prune.add_argument("--days", type=int, default=TOMBSTONE_RETENTION_DAYS, help="Keep deletions this many days")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    try:
+        await body_codec.preload()
+        return await COMMANDS[args.command](args)
+    finally:
+        await close_db()
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
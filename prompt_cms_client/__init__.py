@@ -0,0 +1,25 @@
+"""
+Prompt CMS - Python client
+
+Caches prompts in process (and optionally on disk), revalidates them with
+conditional requests and serves stale content while refreshing in the
+background. Requires httpx (``uv sync --extra client``).
+
+    from prompt_cms_client import PromptClient
+
+    client = PromptClient("http://localhost:8000", prefetch=[PROMPT_ID])
+    content = client.get(PROMPT_ID)
+"""
+
+from .cache import CachedPrompt, DiskCache, MemoryCache
+from .client import AsyncPromptClient, PromptClient, PromptCMSError, PromptNotFound
+
+__all__ = [
+    "AsyncPromptClient",
+    "CachedPrompt",
+    "DiskCache",
+    "MemoryCache",
+    "PromptClient",
+    "PromptCMSError",
+    "PromptNotFound",
+]
@@ -0,0 +1,86 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+class CachedPrompt(NamedTuple):
+    """A prompt body and the validator used to revalidate it"""
+    content: str
+    etag: Optional[str]
+    # Wall-clock time of the last successful fetch or revalidation
+    fetched_at: float
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+class MemoryCache:
+    """Thread-safe LRU of prompts keyed by id; ``max_entries`` of 0 means unbounded"""
+
+    def __init__(self, max_entries: int = 0):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPrompt]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prompt_id: str) -> Optional[CachedPrompt]:
+        with self._lock:
+            entry = self._entries.get(prompt_id)
+            if entry is not None:
+                self._entries.move_to_end(prompt_id)
+            return entry
+
+    def put(self, prompt_id: str, entry: CachedPrompt) -> None:
+        with self._lock:
+            self._entries[prompt_id] = entry
+            self._entries.move_to_end(prompt_id)
+            if self.max_entries:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+    def delete(self, prompt_id: str) -> None:
+        with self._lock:
+            self._entries.pop(prompt_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DiskCache:
+    """One JSON file per prompt under ``directory``, so restarts begin warm.
+
+    Files are written to a temporary name and renamed into place, so
+    processes sharing the directory never read a partial entry.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, prompt_id: str) -> Optional[CachedPrompt]:
+        try:
+            with open(self._path(prompt_id), encoding="utf-8") as f:
+                data = json.load(f)
+            return CachedPrompt(data["content"], data["etag"], data["fetched_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def put(self, prompt_id: str, entry: CachedPrompt) -> None:
+        path = self._path(prompt_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry._asdict(), f)
+        os.replace(tmp_path, path)
+
+    def delete(self, prompt_id: str) -> None:
+        try:
+            os.remove(self._path(prompt_id))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, prompt_id: str) -> str:
+        # Normalized so ids can never escape the directory
+        return os.path.join(self.directory, f"{uuid.UUID(prompt_id)}.json")
@@ -0,0 +1,369 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+import httpx
+
+from .cache import CachedPrompt, DiskCache, MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# Server default for BATCH_GET_MAX_IDS
+BATCH_SIZE = 100
+
+# Cache entry states
+FRESH = "fresh"
+STALE = "stale"
+EXPIRED = "expired"
+
+
+class PromptCMSError(Exception):
+    """The Prompt CMS could not be reached or returned an error"""
+
+
+class PromptNotFound(PromptCMSError):
+    """No prompt exists with the requested id"""
+
+
+def _key(prompt_id) -> str:
+    """Canonical cache key for a prompt id; raises PromptNotFound if malformed"""
+    try:
+        return str(uuid.UUID(str(prompt_id)))
+    except ValueError:
+        raise PromptNotFound(f"Invalid prompt id: {prompt_id!r}")
+
+
+def _etag(content: str) -> str:
+    """The ETag the server sends for ``content`` (its SHA-256)"""
+    return f'"{hashlib.sha256(content.encode("utf-8")).hexdigest()}"'
+
+
+class _PromptClientBase:
+    """Cache policy shared by the sync and async clients.
+
+    Entries younger than ``max_age`` seconds are served without a request.
+    Older ones are served as is for another ``stale_while_revalidate``
+    seconds while a background request revalidates them; after that a
+    lookup waits for the server. Revalidation sends If-None-Match, so an
+    unchanged prompt costs a 304 with no body. If the server cannot be
+    reached, the last known content is served however old it is.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_age: float,
+        stale_while_revalidate: float,
+        cache_dir: Optional[str],
+        max_entries: int,
+        batch_size: int,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_age = max_age
+        self.stale_while_revalidate = stale_while_revalidate
+        self.memory = MemoryCache(max_entries)
+        self.disk = DiskCache(cache_dir) if cache_dir else None
+        self.batch_size = batch_size
+        self.hits = 0
+        self.stale_hits = 0
+        self.fetches = 0
+        self.revalidations = 0
+        self.errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.memory),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "fetches": self.fetches,
+            "not_modified": self.revalidations,
+            "errors": self.errors,
+        }
+
+    def invalidate(self, prompt_id) -> None:
+        """Drop a prompt from the memory and disk caches"""
+        self._forget(_key(prompt_id))
+
+    def _lookup(self, key: str) -> tuple[Optional[CachedPrompt], str]:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.put(key, entry)
+        if entry is None:
+            return None, EXPIRED
+        age = entry.age()
+        if age < self.max_age:
+            return entry, FRESH
+        if age < self.max_age + self.stale_while_revalidate:
+            return entry, STALE
+        return entry, EXPIRED
+
+    def _cached_content(self, entry: Optional[CachedPrompt], state: str) -> Optional[str]:
+        """Content to return without waiting for the server, counting the hit"""
+        if state == FRESH:
+            self.hits += 1
+            return entry.content
+        if state == STALE:
+            self.stale_hits += 1
+            return entry.content
+        return None
+
+    @staticmethod
+    def _request_headers(entry: Optional[CachedPrompt]) -> dict:
+        if entry is not None and entry.etag:
+            return {"If-None-Match": entry.etag}
+        return {}
+
+    def _store(self, key: str, content: str, etag: Optional[str]) -> CachedPrompt:
+        entry = CachedPrompt(content, etag, time.time())
+        self.memory.put(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+        return entry
+
+    def _forget(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def _handle_response(self, key: str, entry: Optional[CachedPrompt], response: httpx.Response) -> str:
+        if response.status_code == 304 and entry is not None:
+            self.revalidations += 1
+            # Refresh the disk copy too, or it looks expired after a restart
+            return self._store(key, entry.content, entry.etag).content
+        if response.status_code == 200:
+            return self._store(key, response.text, response.headers.get("etag")).content
+        if response.status_code == 404:
+            self._forget(key)
+            raise PromptNotFound(f"Prompt {key} not found")
+        raise PromptCMSError(f"GET /prompt/{key} returned {response.status_code}")
+
+    def _handle_error(self, key: str, entry: Optional[CachedPrompt], error: Exception) -> str:
+        """Last known content when the server is unreachable or failing"""
+        self.errors += 1
+        if entry is None:
+            if isinstance(error, PromptCMSError):
+                raise error
+            raise PromptCMSError(f"GET /prompt/{key} failed: {error}") from error
+        logger.warning(f"Serving cached prompt {key} ({entry.age():.0f}s old): {error}")
+        return entry.content
+
+    def _batches(self, prompt_ids: Iterable) -> list[list[str]]:
+        keys = list(dict.fromkeys(_key(prompt_id) for prompt_id in prompt_ids))
+        return [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+
+    def _store_batch(self, response: httpx.Response) -> list[str]:
+        """Cache a batchGet response; returns the missing ids"""
+        if response.status_code != 200:
+            raise PromptCMSError(f"POST /prompts:batchGet returned {response.status_code}")
+        result = response.json()
+        for key, content in result["prompts"].items():
+            self._store(key, content, _etag(content))
+        for key in result["missing"]:
+            self._forget(key)
+        return result["missing"]
+
+
+class PromptClient(_PromptClientBase):
+    """Blocking client with a local prompt cache.
+
+    ``get`` returns cached content without any I/O in the common case;
+    stale entries are refreshed on a small thread pool. Pass ``prefetch``
+    to load a known set of prompts up front with batched requests, and
+    ``cache_dir`` to keep prompts on disk across restarts.
+
+        client = PromptClient("http://prompt-cms:8000", prefetch=[SYSTEM_PROMPT_ID])
+        system_prompt = client.get(SYSTEM_PROMPT_ID)
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        max_age: float = 10.0,
+        stale_while_revalidate: float = 300.0,
+        cache_dir: Optional[str] = None,
+        max_entries: int = 0,
+        prefetch: Iterable = (),
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        refresh_workers: int = 4,
+        batch_size: int = BATCH_SIZE,
+        http_client: Optional[httpx.Client] = None,
+    ):
+        super().__init__(base_url, max_age, stale_while_revalidate, cache_dir, max_entries, batch_size)
+        # One pooled client, reused across threads; an injected one is left open
+        self._owns_http = http_client is None
+        self.http = http_client or httpx.Client(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="prompt-refresh")
+        self._refreshing: set[str] = set()
+        self._lock = threading.Lock()
+        if prefetch:
+            self.prefetch(prefetch)
+
+    def get(self, prompt_id) -> str:
+        """Prompt content; raises PromptNotFound or PromptCMSError"""
+        key = _key(prompt_id)
+        entry, state = self._lookup(key)
+        content = self._cached_content(entry, state)
+        if content is None:
+            return self._fetch(key, entry)
+        if state == STALE:
+            self._refresh_in_background(key)
+        return content
+
+    def prefetch(self, prompt_ids: Iterable) -> list[str]:
+        """Load prompts into the cache with batched requests; returns the missing ids"""
+        missing = []
+        for batch in self._batches(prompt_ids):
+            try:
+                response = self.http.post("/prompts:batchGet", json={"ids": batch})
+            except httpx.HTTPError as e:
+                raise PromptCMSError(f"POST /prompts:batchGet failed: {e}") from e
+            missing.extend(self._store_batch(response))
+        return missing
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        if self._owns_http:
+            self.http.close()
+
+    def __enter__(self) -> "PromptClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _fetch(self, key: str, entry: Optional[CachedPrompt]) -> str:
+        self.fetches += 1
+        try:
+            response = self.http.get(f"/prompt/{key}", headers=self._request_headers(entry))
+        except httpx.HTTPError as e:
+            return self._handle_error(key, entry, e)
+        if response.status_code >= 500:
+            return self._handle_error(key, entry, PromptCMSError(f"GET /prompt/{key} returned {response.status_code}"))
+        return self._handle_response(key, entry, response)
+
+    def _refresh_in_background(self, key: str) -> None:
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        try:
+            self._executor.submit(self._refresh, key)
+        except RuntimeError:
+            # Closed while a lookup was in flight
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _refresh(self, key: str) -> None:
+        try:
+            self._fetch(key, self.memory.get(key))
+        except PromptCMSError as e:
+            logger.warning(f"Background refresh of prompt {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+
+class AsyncPromptClient(_PromptClientBase):
+    """asyncio client with a local prompt cache; see PromptClient.
+
+    Stale entries are refreshed in background tasks. The ``prefetch`` ids
+    are loaded on ``async with`` entry, or call ``prefetch`` directly.
+
+        async with AsyncPromptClient("http://prompt-cms:8000", prefetch=ids) as client:
+            system_prompt = await client.get(SYSTEM_PROMPT_ID)
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        *,
+        max_age: float = 10.0,
+        stale_while_revalidate: float = 300.0,
+        cache_dir: Optional[str] = None,
+        max_entries: int = 0,
+        prefetch: Iterable = (),
+        timeout: float = 5.0,
+        max_connections: int = 20,
+        batch_size: int = BATCH_SIZE,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
+        super().__init__(base_url, max_age, stale_while_revalidate, cache_dir, max_entries, batch_size)
+        self._owns_http = http_client is None
+        self.http = http_client or httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+        self._prefetch_ids = list(prefetch)
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    async def get(self, prompt_id) -> str:
+        """Prompt content; raises PromptNotFound or PromptCMSError"""
+        key = _key(prompt_id)
+        entry, state = self._lookup(key)
+        content = self._cached_content(entry, state)
+        if content is None:
+            return await self._fetch(key, entry)
+        if state == STALE and key not in self._refreshing:
+            task = asyncio.create_task(self._refresh(key))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda _task: self._refreshing.pop(key, None))
+        return content
+
+    async def prefetch(self, prompt_ids: Iterable) -> list[str]:
+        """Load prompts into the cache with concurrent batched requests; returns the missing ids"""
+        async def fetch_batch(batch):
+            try:
+                return await self.http.post("/prompts:batchGet", json={"ids": batch})
+            except httpx.HTTPError as e:
+                raise PromptCMSError(f"POST /prompts:batchGet failed: {e}") from e
+
+        responses = await asyncio.gather(*(fetch_batch(batch) for batch in self._batches(prompt_ids)))
+        missing = []
+        for response in responses:
+            missing.extend(self._store_batch(response))
+        return missing
+
+    async def aclose(self) -> None:
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+        if self._owns_http:
+            await self.http.aclose()
+
+    async def __aenter__(self) -> "AsyncPromptClient":
+        if self._prefetch_ids:
+            await self.prefetch(self._prefetch_ids)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _fetch(self, key: str, entry: Optional[CachedPrompt]) -> str:
+        self.fetches += 1
+        try:
+            response = await self.http.get(f"/prompt/{key}", headers=self._request_headers(entry))
+        except httpx.HTTPError as e:
+            return self._handle_error(key, entry, e)
+        if response.status_code >= 500:
+            return self._handle_error(key, entry, PromptCMSError(f"GET /prompt/{key} returned {response.status_code}"))
+        return self._handle_response(key, entry, response)
+
+    async def _refresh(self, key: str) -> None:
+        try:
+            await self._fetch(key, self.memory.get(key))
+        except PromptCMSError as e:
+            logger.warning(f"Background refresh of prompt {key} failed: {e}")